@@ -4,7 +4,7 @@ from sqlalchemy.orm import Session
 from datetime import timedelta
 import re
 
-from app.database import get_db
+from app.database import get_db, run_db
 from app.schemas.user import UserCreate, UserResponse, Token, LoginRequest
 from app.crud.user import create_user, authenticate_user, get_user_by_username, get_user_by_email
 from app.auth.jwt import create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
@@ -17,9 +17,11 @@ def validate_email_format(email: str) -> bool:
     return re.match(pattern, email) is not None
 
 @router.post("/register", response_model=Token)
-def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: Session = Depends(get_db)):
     """
     Register a new user, then return JWT + user (same as login).
+    DB calls go through run_db (async driver or threadpool) and bcrypt to
+    the hashing pool, so neither holds a worker while the other runs.
     """
     # Additional server-side email validation
     if not validate_email_format(user.email):
@@ -29,7 +31,7 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Check if username exists
-    db_user = get_user_by_username(db, username=user.username)
+    db_user = await run_db(db, get_user_by_username, username=user.username)
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -37,7 +39,7 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Check if email exists
-    db_user = get_user_by_email(db, email=user.email)
+    db_user = await run_db(db, get_user_by_email, email=user.email)
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -53,7 +55,7 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Create the new user
-    new_user = create_user(db=db, user=user)
+    new_user = await create_user(db=db, user=user)
 
     # Issue token (same as login)
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -64,7 +66,7 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
     return {"access_token": access_token, "token_type": "bearer", "user": new_user}
 
 @router.post("/login", response_model=Token)
-def login(form_data: LoginRequest, db: Session = Depends(get_db)):
+async def login(form_data: LoginRequest, db: Session = Depends(get_db)):
     """
     Authenticate user and return JWT token
     """
@@ -81,7 +83,7 @@ def login(form_data: LoginRequest, db: Session = Depends(get_db)):
             detail="Invalid credentials"
         )
     
-    user = authenticate_user(db, form_data.email, form_data.password)
+    user = await authenticate_user(db, form_data.email, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -0,0 +1,41 @@
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.auth.dependencies import require_internal_access
+from app.crud.movie import export_movies_query
+from app.crud.rating import export_ratings_query
+from app.export import as_utc, export_response
+
+# Bulk dumps of user data: closed unless an internal token is configured
+router = APIRouter(
+    prefix="/api/export",
+    tags=["export"],
+    dependencies=[Depends(require_internal_access)],
+)
+
+FORMAT_PATTERN = "^(ndjson|csv)$"
+
+@router.get("/movies")
+async def export_movies(
+    format: str = Query("ndjson", pattern=FORMAT_PATTERN, description="ndjson or csv"),
+    since: datetime = Query(None, description="Only movies created or updated at or after this time"),
+    db: Session = Depends(get_db)
+):
+    """
+    Stream every movie (or those changed since `since`) as NDJSON or CSV
+    """
+    return export_response(db, export_movies_query(as_utc(since)), format, "movies")
+
+@router.get("/ratings")
+async def export_ratings(
+    format: str = Query("ndjson", pattern=FORMAT_PATTERN, description="ndjson or csv"),
+    since: datetime = Query(None, description="Only ratings created or updated at or after this time"),
+    db: Session = Depends(get_db)
+):
+    """
+    Stream every rating (or those changed since `since`) as NDJSON or CSV
+    """
+    return export_response(db, export_ratings_query(as_utc(since)), format, "ratings")
@@ -0,0 +1,68 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import FileResponse, PlainTextResponse
+
+from app.database import pool_metrics, replica_set, serving_pool, sqlite_write_gate
+from app.auth.dependencies import require_internal_access
+from app.profiling import profile_spool
+from app.leaderboard import leaderboard
+from app.read_cache import read_cache
+from app.single_flight import single_flight
+from app.slow_queries import slow_query_log
+
+router = APIRouter(
+    prefix="/internal",
+    tags=["internal"],
+    dependencies=[Depends(require_internal_access)],
+)
+
+@router.get("/pool")
+def pool_status():
+    """
+    Live connection pool state: checked-out and overflow connections from
+    the pool itself, checkout wait times and timeouts from pool events
+    """
+    snapshot = pool_metrics.snapshot(serving_pool())
+    if sqlite_write_gate is not None:
+        snapshot["sqlite_write_gate"] = sqlite_write_gate.stats()
+    return snapshot
+
+@router.get("/replicas")
+def replica_status():
+    """Read replica health and how many sessions were routed to them"""
+    if replica_set is None:
+        return {"replicas": [], "routed": 0, "fallbacks": 0, "ejections": 0}
+    return replica_set.stats()
+
+@router.get("/cache")
+def cache_status():
+    """Read-through cache size, hit ratio, evictions and invalidations, request coalescing and leaderboards"""
+    return {**read_cache.stats(), "single_flight": single_flight.stats(), "leaderboard": leaderboard.stats()}
+
+@router.get("/slow-queries")
+def slow_queries(
+    limit: int = Query(50, ge=1, le=1000),
+    format: str = Query("json", pattern="^(json|jsonl)$", description="jsonl dumps the whole buffer, oldest first")
+):
+    """Recent statements over the slow-query threshold, newest first, with their plans"""
+    if format == "jsonl":
+        return PlainTextResponse(slow_query_log.to_jsonl(), media_type="application/x-ndjson")
+    return {
+        "threshold_ms": slow_query_log.threshold_ms,
+        "queries": slow_query_log.entries(limit),
+    }
+
+@router.get("/profiles")
+def list_profiles():
+    """Request profiles in the spool, newest first"""
+    return {"profiles": profile_spool.list()}
+
+@router.get("/profiles/{profile_id}")
+def download_profile(profile_id: str):
+    """
+    A spooled profile: `.prof` files load with pstats or snakeviz, `.folded`
+    files are collapsed stacks for flamegraph.pl or speedscope
+    """
+    path = profile_spool.path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return FileResponse(path, filename=path.rsplit("/", 1)[-1], media_type="application/octet-stream")
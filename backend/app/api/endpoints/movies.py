@@ -1,15 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Path
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Path, Request
 from sqlalchemy.orm import Session
 import re
-import math
 
-from app.database import get_db
-from app.schemas.movie import MovieCreate, MovieResponse, MovieListResponse
+from app.database import get_db, run_db, statement_timeout, DB_LIST_STATEMENT_TIMEOUT_MS
+from app.schemas.movie import (
+    MovieCreate, MovieResponse, MovieListResponse, MovieHistogramResponse, TopMoviesResponse, BulkImportResponse
+)
 from app.schemas.rating import RatingCreate, RatingResponse, RatingListResponse
-from app.crud.movie import get_movies, get_movie_by_id, create_movie, delete_movie
-from app.crud.rating import create_or_update_rating, get_ratings_by_movie, update_movie_ratings_stats
+from app.crud.movie import get_movies, get_movies_after, get_movie_by_id, get_movie_version, get_movie_histogram, create_movie, create_movies, delete_movie
+from app.crud.rating import create_or_update_rating, get_ratings_by_movie
 from app.auth.dependencies import get_current_user
-from app.models.user import User
+from app.pagination import count_pages
+from app.fields import FieldSet, sparse_fields
+from app.counting import filter_key
+from app.read_cache import list_tags, movie_tag
+from app.conditional import (
+    CACHE_CONTROL_MOVIE, CACHE_CONTROL_MOVIE_LIST, CACHE_CONTROL_MOVIE_RATINGS, CACHE_CONTROL_TOP_MOVIES,
+    Versioned, conditional_read, entity_tag, not_modified, not_modified_response, page_version, representation,
+    validator_headers
+)
+from app.single_flight import single_flight
+from app.responses import (
+    ModelResponse, json_response, histogram_adapter, movie_adapter, movie_list_adapter, rating_adapter, rating_list_adapter,
+    top_movies_adapter
+)
+from app.bulk_import import body_format, import_movies
+from app.leaderboard import LEADERBOARD_SIZE, leaderboard
+from app.schemas.user import UserResponse
 
 router = APIRouter(prefix="/api/movies", tags=["movies"])
 
@@ -22,10 +39,10 @@ def sanitize_search_query(search: str) -> str:
     return sanitized.strip()
 
 @router.post("/", response_model=MovieResponse)
-def add_movie(
+async def add_movie(
     movie: MovieCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserResponse = Depends(get_current_user)
 ):
     """
     Add a new movie with validation
@@ -37,20 +54,58 @@ def add_movie(
             detail="Movie title cannot be empty"
         )
     
-    return create_movie(db=db, movie=movie, user_id=current_user.id)
+    return json_response(movie_adapter, await run_db(db, create_movie, movie=movie, user_id=current_user.id))
 
-@router.get("/", response_model=MovieListResponse)
-def list_movies(
+@router.post("/bulk", response_model=BulkImportResponse)
+async def bulk_import(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: UserResponse = Depends(get_current_user)
+):
+    """
+    Import movies from a streamed NDJSON (`application/x-ndjson`) or CSV
+    (`text/csv`, header row first) body. Rows are validated like single
+    movies; invalid ones are skipped and listed in the report.
+    """
+    import_format = body_format(request.headers.get("content-type"))
+    if import_format is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Send application/x-ndjson or text/csv"
+        )
+
+    async def write(batch):
+        return await run_db(db, create_movies, movies=batch, user_id=current_user.id)
+
+    try:
+        report = await import_movies(request.stream(), import_format, write)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    return report.as_dict()
+
+@router.get("/", response_model=MovieListResponse, dependencies=[Depends(statement_timeout(DB_LIST_STATEMENT_TIMEOUT_MS))])
+async def list_movies(
+    request: Request,
     genre: str = Query(None, description="Filter by genre", max_length=50),
     min_year: int = Query(None, description="Minimum release year", ge=1888, le=2100),
     max_year: int = Query(None, description="Maximum release year", ge=1888, le=2100),
-    search: str = Query(None, description="Search in title or description", max_length=100),
+    search: str = Query(None, description="Full-text search in title and description", max_length=100),
     page: int = Query(1, ge=1, description="Page number"),
     limit: int = Query(10, ge=1, le=100, description="Items per page"),
+    sort: str = Query(None, pattern="^-?(id|title|release_year)$", description="Sort field, prefix with - for descending; searches default to relevance"),
+    cursor: str = Query(None, max_length=512, description="Opaque cursor from next_cursor; pass an empty value to start cursor pagination"),
+    include_total: bool = Query(True, description="Compute the total count; false skips counting"),
+    fieldset: FieldSet = Depends(sparse_fields(MovieResponse)),
     db: Session = Depends(get_db)
 ):
     """
-    List movies with comprehensive input validation
+    List movies with comprehensive input validation.
+
+    Passing `cursor` switches to keyset pagination: `page` is ignored, no
+    total is computed, and `next_cursor` points at the following page.
     """
     # Validate year range
     if min_year and max_year and min_year > max_year:
@@ -61,57 +116,177 @@ def list_movies(
     
     # Sanitize search query
     sanitized_search = sanitize_search_query(search) if search else None
+    fields = fieldset.names if fieldset else None
+    adapter = fieldset.envelope(MovieListResponse, "movies") if fieldset else movie_list_adapter
     
-    skip = (page - 1) * limit
-    result = get_movies(
-        db=db,
-        skip=skip,
-        limit=limit,
-        genre=genre,
-        min_year=min_year,
-        max_year=max_year,
-        search=sanitized_search
+    key = (
+        filter_key("movies", genre=genre, min_year=min_year, max_year=max_year, search=sanitized_search),
+        cursor, None if cursor is not None else page, limit, sort, include_total, fields
     )
-    total_pages = math.ceil(result["total"] / result["limit"]) if result["limit"] else 1
-    return MovieListResponse(
-        movies=result["movies"],
-        total=result["total"],
-        page=result["page"],
-        limit=result["limit"],
-        total_pages=total_pages
+
+    async def fetch(fields):
+        if cursor is not None:
+            try:
+                return await run_db(
+                    db,
+                    get_movies_after,
+                    cursor=cursor,
+                    limit=limit,
+                    genre=genre,
+                    min_year=min_year,
+                    max_year=max_year,
+                    search=sanitized_search,
+                    sort=sort,
+                    fields=fields
+                )
+            except ValueError as e:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=str(e)
+                )
+
+        return await run_db(
+            db,
+            get_movies,
+            skip=(page - 1) * limit,
+            limit=limit,
+            genre=genre,
+            min_year=min_year,
+            max_year=max_year,
+            search=sanitized_search,
+            sort=sort,
+            include_total=include_total,
+            fields=fields
+        )
+
+    def version_of(result):
+        # The count strategy is in the body, so it is part of the page's version
+        count_strategy = "none" if cursor is not None else result["count_strategy"]
+        return page_version(result["movies"], result.get("total"), result.get("next_cursor"), count_strategy)
+
+    async def load_page():
+        result = await fetch(fields)
+        if cursor is not None:
+            movies_page = adapter.validate_python({
+                "movies": result["movies"],
+                "limit": result["limit"],
+                "next_cursor": result["next_cursor"],
+                "count_strategy": "none"
+            }, from_attributes=True)
+        else:
+            movies_page = adapter.validate_python({
+                "movies": result["movies"],
+                "total": result["total"],
+                "page": result["page"],
+                "limit": result["limit"],
+                "total_pages": count_pages(result["total"], result["limit"]),
+                "count_strategy": result["count_strategy"]
+            }, from_attributes=True)
+        return Versioned(movies_page, *version_of(result))
+
+    async def probe():
+        # Only ids and versions: enough to recompute the page's ETag
+        return version_of(await fetch(("id",)))
+
+    return await conditional_read(
+        request, key, adapter, load_page, probe, lambda entry: list_tags(entry.model.movies), CACHE_CONTROL_MOVIE_LIST,
+        bypass=db.info.get("read_your_writes", False), from_replica="replica" in db.info
     )
 
+@router.get("/top", response_model=TopMoviesResponse)
+async def top_movies(
+    genre: str = Query(None, description="Rank within this genre only", max_length=50),
+    limit: int = Query(10, ge=1, le=LEADERBOARD_SIZE, description="Number of movies"),
+    db: Session = Depends(get_db)
+):
+    """
+    Top rated movies by Bayesian average, served from the in-memory leaderboard
+    """
+    if leaderboard.needs_rebuild():
+        # Concurrent requests share one rebuild
+        await single_flight.do(("leaderboard",), lambda: run_db(db, leaderboard.rebuild))
+    return json_response(top_movies_adapter, {
+        "genre": genre,
+        "movies": leaderboard.top(genre, limit),
+        "mean_rating": round(leaderboard.mean, 4),
+        "prior_votes": leaderboard.prior_votes,
+    }, headers={"cache-control": CACHE_CONTROL_TOP_MOVIES})
+
 @router.get("/{movie_id}", response_model=MovieResponse)
-def get_movie(movie_id: int = Path(..., ge=1, description="Movie ID"), db: Session = Depends(get_db)):
+async def get_movie(
+    request: Request,
+    movie_id: int = Path(..., ge=1, description="Movie ID"),
+    fieldset: FieldSet = Depends(sparse_fields(MovieResponse)),
+    db: Session = Depends(get_db)
+):
     """
     Get movie details with ID validation
     """
-    movie = get_movie_by_id(db, movie_id=movie_id)
-    if not movie:
+    fields = fieldset.names if fieldset else None
+    adapter = fieldset.adapter if fieldset else movie_adapter
+
+    async def load_movie():
+        movie = await run_db(db, get_movie_by_id, movie_id=movie_id, fields=fields)
+        if not movie:
+            return None
+        return Versioned(adapter.validate_python(movie, from_attributes=True), movie.version, movie.updated_at)
+
+    async def probe():
+        return await run_db(db, get_movie_version, movie_id)
+
+    response = await conditional_read(
+        request, ("movie", movie_id, fields), adapter, load_movie, probe, lambda entry: {movie_tag(movie_id)},
+        CACHE_CONTROL_MOVIE, bypass=db.info.get("read_your_writes", False), from_replica="replica" in db.info
+    )
+    if response is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Movie not found"
         )
-    return movie
+    return response
 
-@router.post("/{movie_id}/ratings", response_model=RatingResponse)
-def add_rating(
+@router.get("/{movie_id}/histogram", response_model=MovieHistogramResponse)
+async def get_movie_histogram_endpoint(
+    request: Request,
     movie_id: int = Path(..., ge=1, description="Movie ID"),
-    rating: RatingCreate = ...,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: Session = Depends(get_db)
 ):
     """
-    Add or update rating with comprehensive validation
+    1-5 star breakdown of a movie's ratings, kept up to date by the rating triggers
     """
-    # Check if movie exists
-    movie = get_movie_by_id(db, movie_id)
-    if not movie:
+    async def load_histogram():
+        histogram = await run_db(db, get_movie_histogram, movie_id)
+        if histogram is None:
+            return None
+        return Versioned(
+            histogram_adapter.validate_python(histogram), histogram["version"], histogram["updated_at"]
+        )
+
+    async def probe():
+        return await run_db(db, get_movie_version, movie_id)
+
+    response = await conditional_read(
+        request, ("histogram", movie_id), histogram_adapter, load_histogram, probe,
+        lambda entry: {movie_tag(movie_id)}, CACHE_CONTROL_MOVIE, bypass=db.info.get("read_your_writes", False),
+        from_replica="replica" in db.info
+    )
+    if response is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Movie not found"
         )
-    
+    return response
+
+@router.post("/{movie_id}/ratings", response_model=RatingResponse)
+async def add_rating(
+    movie_id: int = Path(..., ge=1, description="Movie ID"),
+    rating: RatingCreate = ...,
+    db: Session = Depends(get_db),
+    current_user: UserResponse = Depends(get_current_user)
+):
+    """
+    Add or update rating with comprehensive validation
+    """
     # Prevent self-rating if user created the movie (optional business rule)
     # if movie.created_by == current_user.id:
     #     raise HTTPException(
@@ -119,69 +294,94 @@ def add_rating(
     #         detail="You cannot rate your own movie"
     #     )
     
-    # Create or update rating
-    new_rating = create_or_update_rating(
-        db=db,
+    # Create or update rating; movie rating statistics move in the same transaction
+    new_rating = await run_db(
+        db,
+        create_or_update_rating,
         rating=rating,
         movie_id=movie_id,
         user_id=current_user.id,
     )
+    if new_rating is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Movie not found"
+        )
     
-    # Update movie rating statistics
-    update_movie_ratings_stats(db, movie_id)
-    
-    return {
-        "id": new_rating.id,
-        "movie_id": new_rating.movie_id,
-        "user_id": new_rating.user_id,
-        "rating": new_rating.rating,
-        "review": new_rating.review,
-        "created_at": new_rating.created_at,
-        "updated_at": new_rating.updated_at,
+    return json_response(rating_adapter, {
+        **new_rating,
         "username": current_user.username,  # ✅ add username
-    }
+    })
 
-@router.get("/{movie_id}/ratings", response_model=RatingListResponse)
-def get_movie_ratings(
+@router.get("/{movie_id}/ratings", response_model=RatingListResponse, dependencies=[Depends(statement_timeout(DB_LIST_STATEMENT_TIMEOUT_MS))])
+async def get_movie_ratings(
+    request: Request,
     movie_id: int = Path(..., ge=1, description="Movie ID"),
     page: int = Query(1, ge=1, description="Page number"),
     limit: int = Query(10, ge=1, le=100, description="Items per page"),
+    include_total: bool = Query(True, description="Compute the total count; false skips counting"),
+    fieldset: FieldSet = Depends(sparse_fields(RatingResponse)),
     db: Session = Depends(get_db)
 ):
     """
     Get paginated ratings for a movie
     """
-    # Verify movie exists
-    movie = get_movie_by_id(db, movie_id)
-    if not movie:
+    fields = fieldset.names if fieldset else None
+    adapter = fieldset.envelope(RatingListResponse, "ratings") if fieldset else rating_list_adapter
+
+    # Verify movie exists; its version moves with every rating write, so it
+    # stamps the ratings pages too
+    stamp = await run_db(db, get_movie_version, movie_id)
+    if stamp is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Movie not found"
         )
-    
-    skip = (page - 1) * limit
-    result = get_ratings_by_movie(db, movie_id=movie_id, skip=skip, limit=limit)
-    total_pages = math.ceil(result["total"] / result["limit"]) if result["limit"] else 1
+    version, last_modified = stamp
+    key = ("ratings", movie_id, page, limit, include_total, fields)
 
-    return RatingListResponse(
-        ratings=result["ratings"],
-        total=result["total"],
-        page=result["page"],
-        limit=result["limit"],
-        total_pages=total_pages
+    def headers_for(count_strategy):
+        etag = entity_tag(key, version, count_strategy, representation(request))
+        return validator_headers(etag, last_modified, CACHE_CONTROL_MOVIE_RATINGS)
 
-    )
+    # The body names its count strategy, so it is in the ETag. An exact total
+    # is the same number whether counted now or reused from the count cache,
+    # so a copy carrying either is still current.
+    for count_strategy in ("exact", "cached") if include_total else ("none",):
+        headers = headers_for(count_strategy)
+        if not_modified(request, headers["etag"], last_modified):
+            return not_modified_response(headers)
+
+    async def load_ratings():
+        skip = (page - 1) * limit
+        result = await run_db(
+            db, get_ratings_by_movie, movie_id=movie_id, skip=skip, limit=limit, include_total=include_total,
+            fields=fields
+        )
+        return adapter.validate_python({
+            "ratings": result["ratings"],
+            "total": result["total"],
+            "page": result["page"],
+            "limit": result["limit"],
+            "total_pages": count_pages(result["total"], result["limit"]),
+            "count_strategy": result["count_strategy"]
+        }, from_attributes=True)
+
+    # Identical concurrent requests share one execution
+    flight = (*key, version, db.info.get("read_your_writes", False))
+    ratings_page = await single_flight.do(flight, load_ratings)
+    return ModelResponse(adapter, ratings_page, headers=headers_for(ratings_page.count_strategy))
 
 @router.delete("/{movie_id}")
-def delete_movie_endpoint(
+async def delete_movie_endpoint(
     movie_id: int = Path(..., ge=1, description="Movie ID"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserResponse = Depends(get_current_user)
 ):
     """
     Delete a movie with ownership validation
     """
-    movie = get_movie_by_id(db, movie_id)
+    movie = await run_db(db, get_movie_by_id, movie_id)
     if not movie:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -195,5 +395,5 @@ def delete_movie_endpoint(
             detail="Not authorized to delete this movie"
         )
     
-    delete_movie(db, movie_id)
+    await run_db(db, delete_movie, movie_id)
     return {"message": "Movie deleted successfully"}
\ No newline at end of file
@@ -1,21 +1,27 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 
-from app.database import get_db
-from app.schemas.rating import RatingListResponse
+from app.database import get_db, run_db
+from app.schemas.rating import RatingListResponse, RatingResponse
 from app.crud.rating import get_ratings_by_user
 from app.auth.dependencies import get_current_user
-from app.models.user import User
+from app.schemas.user import UserResponse
+from app.pagination import count_pages
+from app.fields import FieldSet, sparse_fields
+from app.responses import json_response, rating_list_adapter
+from app.conditional import CACHE_CONTROL_USER_RATINGS
 
 router = APIRouter(prefix="/api/users", tags=["ratings"])
 
 @router.get("/{user_id}/ratings", response_model=RatingListResponse)
-def get_user_ratings(
+async def get_user_ratings(
     user_id: int,
     page: int = Query(1, ge=1, description="Page number"),
     limit: int = Query(10, ge=1, le=100, description="Items per page"),
+    include_total: bool = Query(True, description="Compute the total count; false skips counting"),
+    fieldset: FieldSet = Depends(sparse_fields(RatingResponse)),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserResponse = Depends(get_current_user)
 ):
     # Users can only view their own ratings
     if user_id != current_user.id:
@@ -25,10 +31,16 @@ def get_user_ratings(
         )
     
     skip = (page - 1) * limit
-    result = get_ratings_by_user(db, user_id=user_id, skip=skip, limit=limit)
-    return RatingListResponse(
-        ratings=result["ratings"],
-        total=result["total"],
-        page=result["page"],
-        limit=result["limit"]
-    )
\ No newline at end of file
+    result = await run_db(
+        db, get_ratings_by_user, user_id=user_id, skip=skip, limit=limit, include_total=include_total,
+        fields=fieldset.names if fieldset else None
+    )
+    adapter = fieldset.envelope(RatingListResponse, "ratings") if fieldset else rating_list_adapter
+    return json_response(adapter, {
+        "ratings": result["ratings"],
+        "total": result["total"],
+        "page": result["page"],
+        "limit": result["limit"],
+        "total_pages": count_pages(result["total"], result["limit"]),
+        "count_strategy": result["count_strategy"]
+    }, headers={"cache-control": CACHE_CONTROL_USER_RATINGS})
\ No newline at end of file
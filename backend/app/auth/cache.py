@@ -0,0 +1,133 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app.models.user import User
+
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+# Invalidation only reaches this process, so the TTL bounds how long another
+# worker keeps accepting the token of a deleted or changed user
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "30"))
+
+
+class PrincipalCache:
+    """
+    Bounded LRU of authenticated principals keyed by bearer token. A hit
+    skips both the JWT signature check and the user lookup, so entries
+    never outlive the token's own expiry. Deleting a user or changing their
+    credentials drops their entries in this process only; other workers
+    drop them when the TTL runs out.
+    """
+
+    def __init__(self, maxsize: int = PRINCIPAL_CACHE_SIZE, ttl: float = PRINCIPAL_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._tokens_by_user = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, token: str):
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            principal, expires = entry
+            if expires <= time.time():
+                self._remove(token)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return principal
+
+    def set(self, token: str, principal, token_expires: float = None):
+        expires = time.time() + self.ttl
+        if token_expires is not None:
+            expires = min(expires, token_expires)
+        with self._lock:
+            if token in self._entries:
+                self._remove(token)
+            self._entries[token] = (principal, expires)
+            self._tokens_by_user.setdefault(principal.id, set()).add(token)
+            while len(self._entries) > self.maxsize:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate_user(self, user_id: int):
+        """Forget every cached token of a user, e.g. after deletion or a credential change"""
+        with self._lock:
+            for token in self._tokens_by_user.pop(user_id, set()):
+                self._entries.pop(token, None)
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _remove(self, token: str):
+        principal, _ = self._entries.pop(token)
+        tokens = self._tokens_by_user.get(principal.id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[principal.id]
+
+
+principal_cache = PrincipalCache()
+
+# Fields that change who a cached principal is or whether its token should still work
+CREDENTIAL_FIELDS = ("username", "email", "password_hash")
+
+
+def _changed_credentials(user) -> bool:
+    state = inspect(user)
+    return any(state.attrs[field].history.has_changes() for field in CREDENTIAL_FIELDS)
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_principal_invalidations(session, flush_context, instances):
+    pending = session.info.setdefault("principal_invalidations", set())
+    for user in session.deleted:
+        if isinstance(user, User):
+            pending.add(user.id)
+    for user in session.dirty:
+        if isinstance(user, User) and _changed_credentials(user):
+            pending.add(user.id)
+    # Drop entries straight away too, so this request cannot re-cache old data
+    for user_id in pending:
+        principal_cache.invalidate_user(user_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_principal_invalidations(session):
+    # Again after commit: another request may have cached the pre-commit row
+    for user_id in session.info.pop("principal_invalidations", set()):
+        principal_cache.invalidate_user(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_principal_invalidations(session):
+    session.info.pop("principal_invalidations", None)
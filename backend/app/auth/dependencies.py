@@ -1,13 +1,17 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from app.auth.jwt import verify_token
-from app.database import get_db
+from app.auth.jwt import decode_token
+from app.auth.cache import principal_cache
+from app.database import get_db, run_db
 from app.crud.user import get_user_by_username
+from app.schemas.user import UserResponse
 from sqlalchemy.orm import Session
+import hmac
+import os
 
 security = HTTPBearer(auto_error=False)  # Change to auto_error=False
 
-def get_current_user(
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
 ):
@@ -17,18 +21,45 @@ def get_current_user(
             detail="Not authenticated",
         )
     
-    username = verify_token(credentials.credentials)
+    token = credentials.credentials
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+
+    payload = decode_token(token)
+    username = payload.get("sub") if payload else None
     if username is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    user = get_user_by_username(db, username=username)
+    user = await run_db(db, get_user_by_username, username=username)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    return user
\ No newline at end of file
+    # Cache a detached snapshot rather than the session-bound ORM row
+    principal = UserResponse.model_validate(user)
+    principal_cache.set(token, principal, token_expires=payload.get("exp"))
+    return principal
+
+INTERNAL_API_TOKEN = os.getenv("INTERNAL_API_TOKEN")
+# Development only: serve internal endpoints without a token when none is configured
+INTERNAL_ENDPOINTS_OPEN = os.getenv("INTERNAL_ENDPOINTS_OPEN", "false").lower() == "true"
+
+def internal_token_valid(x_internal_token: str = None) -> bool:
+    """Closed when INTERNAL_API_TOKEN is unset, unless INTERNAL_ENDPOINTS_OPEN is set"""
+    if not INTERNAL_API_TOKEN:
+        return INTERNAL_ENDPOINTS_OPEN
+    return bool(x_internal_token) and hmac.compare_digest(x_internal_token, INTERNAL_API_TOKEN)
+
+def require_internal_access(x_internal_token: str = Header(None)):
+    """Guard operational endpoints"""
+    if not internal_token_valid(x_internal_token):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized for internal endpoints",
+        )
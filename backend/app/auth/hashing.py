@@ -0,0 +1,114 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from app.auth.jwt import get_password_hash, verify_password
+
+# "thread" is the default: bcrypt releases the GIL, so threads hash in parallel.
+# "process" keeps bcrypt off the API process entirely; its workers are spawned,
+# never forked, since forking a threaded server can deadlock on inherited locks
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread").lower()
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Requests allowed to wait for a worker before we start shedding load
+PASSWORD_HASH_QUEUE_SIZE = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", "32"))
+
+
+class HashingSaturated(Exception):
+    """Raised instead of queueing when every worker and queue slot is taken"""
+
+
+class PasswordHasher:
+    """Bounded executor for bcrypt hashing and verification"""
+
+    def __init__(
+        self,
+        mode: str = PASSWORD_HASH_EXECUTOR,
+        workers: int = PASSWORD_HASH_WORKERS,
+        queue_size: int = PASSWORD_HASH_QUEUE_SIZE,
+    ):
+        self.mode = mode
+        self.workers = workers
+        self.queue_size = queue_size
+        self._executor = None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+
+    @property
+    def capacity(self) -> int:
+        return self.workers + self.queue_size
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                if self.mode == "process":
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                    )
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix="password-hash"
+                    )
+            return self._executor
+
+    async def _run(self, fn, *args):
+        with self._lock:
+            if self.in_flight >= self.capacity:
+                self.rejected += 1
+                raise HashingSaturated("Password hashing capacity exhausted")
+            self.in_flight += 1
+
+        start = time.perf_counter()
+        succeeded = False
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._get_executor(), fn, *args)
+            succeeded = True
+            return result
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.in_flight -= 1
+                if succeeded:
+                    self.completed += 1
+                    self._latency_total += elapsed
+                    self._latency_max = max(self._latency_max, elapsed)
+                else:
+                    self.failed += 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, password, hashed_password)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "workers": self.workers,
+                "capacity": self.capacity,
+                "in_flight": self.in_flight,
+                "queue_depth": max(0, self.in_flight - self.workers),
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "failed": self.failed,
+                "latency_avg_ms": self._latency_total / self.completed * 1000 if self.completed else 0.0,
+                "latency_max_ms": self._latency_max * 1000,
+            }
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hasher = PasswordHasher()
@@ -27,11 +27,17 @@ def create_access_token(data: dict, expires_delta: timedelta = None) -> str:
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_token(token: str) -> str | None:
-    """Verify a JWT token and return the username if valid"""
+def decode_token(token: str) -> dict | None:
+    """Verify a JWT token and return its claims if valid"""
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        return username
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except JWTError:
         return None
+
+def verify_token(token: str) -> str | None:
+    """Verify a JWT token and return the username if valid"""
+    payload = decode_token(token)
+    if payload is None:
+        return None
+    username: str = payload.get("sub")
+    return username
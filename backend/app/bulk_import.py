@@ -0,0 +1,278 @@
+"""
+Streaming bulk import of movies.
+
+The request body (NDJSON, or CSV with a header row) is read chunk by chunk,
+split into records and validated with the MovieCreate rules as it arrives.
+Valid rows are buffered up to BULK_IMPORT_BATCH_SIZE and handed to the
+writer, one multi-row INSERT and one commit per batch, so memory stays
+bounded by the batch size however large the upload is. Invalid rows are
+skipped and reported by position; the report lists the first
+BULK_IMPORT_MAX_ERRORS of them and counts the rest. Lines (and CSV records
+spanning lines) longer than BULK_IMPORT_MAX_LINE_LENGTH characters are
+dropped and reported as a row error rather than buffered.
+
+Batches are committed as they fill: an import cut short keeps what was
+written before the failure.
+"""
+import codecs
+import csv
+import json
+import os
+import time
+
+from pydantic import ValidationError
+
+from app.schemas.movie import MovieCreate
+
+BULK_IMPORT_BATCH_SIZE = int(os.getenv("BULK_IMPORT_BATCH_SIZE", "1000"))
+BULK_IMPORT_MAX_ERRORS = int(os.getenv("BULK_IMPORT_MAX_ERRORS", "1000"))
+BULK_IMPORT_MAX_LINE_LENGTH = int(os.getenv("BULK_IMPORT_MAX_LINE_LENGTH", "65536"))
+
+BODY_FORMATS = {
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "text/csv": "csv",
+}
+
+REQUIRED_CSV_COLUMNS = {name for name, field in MovieCreate.model_fields.items() if field.is_required()}
+
+
+def body_format(content_type: str):
+    """"ndjson" or "csv" for a Content-Type header, None when unsupported"""
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    return BODY_FORMATS.get(media_type)
+
+
+class RowError(Exception):
+    """A record that cannot be turned into a movie"""
+
+    def __init__(self, errors: list):
+        super().__init__(errors)
+        self.errors = errors
+
+
+def too_long(max_length: int) -> RowError:
+    return RowError([{"loc": [], "msg": f"Longer than {max_length} characters", "type": "line_too_long"}])
+
+
+async def lines(chunks, max_length: int = BULK_IMPORT_MAX_LINE_LENGTH):
+    """
+    Text lines from an async iterator of UTF-8 byte chunks (a leading BOM is
+    dropped). A line longer than `max_length` is skipped up to the next
+    newline and yielded as a RowError instead.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    skipping = False
+
+    def line_or_error(line: str):
+        line = line.removesuffix("\r")
+        return too_long(max_length) if len(line) > max_length else line
+
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *complete, buffer = buffer.split("\n")
+        for line in complete:
+            if skipping:
+                # The tail of an over-long line already reported
+                skipping = False
+                continue
+            yield line_or_error(line)
+        if len(buffer) > max_length:
+            if not skipping:
+                yield too_long(max_length)
+                skipping = True
+            buffer = ""
+    buffer += decoder.decode(b"", final=True)
+    if buffer and not skipping:
+        yield line_or_error(buffer)
+
+
+async def ndjson_records(lines):
+    """One JSON object per non-blank line; a RowError in place of an unreadable one"""
+    async for line in lines:
+        if isinstance(line, RowError):
+            yield line
+            continue
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield RowError([{"loc": [], "msg": f"Invalid JSON: {e}", "type": "json_invalid"}])
+            continue
+        if not isinstance(record, dict):
+            yield RowError([{"loc": [], "msg": "Expected a JSON object", "type": "model_type"}])
+            continue
+        yield record
+
+
+class FeedEmpty(Exception):
+    """The reader asked for a line that has not arrived yet"""
+
+
+class LineFeed:
+    """
+    Line source of one csv.reader. The reader pulls lines until its record
+    is complete; when it runs dry inside a quoted value, the lines read so
+    far are kept and replayed once the next line arrives.
+    """
+
+    def __init__(self):
+        self.lines = []
+        self.position = 0
+        self.length = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        if self.position == len(self.lines):
+            raise FeedEmpty
+        self.position += 1
+        return self.lines[self.position - 1]
+
+    def push(self, line: str):
+        self.lines.append(line + "\n")
+        self.length += len(line) + 1
+
+    def consumed(self):
+        del self.lines[:self.position]
+        self.position = 0
+        self.length = sum(map(len, self.lines))
+
+    def rewind(self):
+        self.position = 0
+
+    def clear(self):
+        self.lines, self.position, self.length = [], 0, 0
+
+
+async def csv_records(lines, max_length: int = BULK_IMPORT_MAX_LINE_LENGTH):
+    """
+    Rows of a CSV body as dicts keyed by its header. One csv.reader tracks
+    quoting across the body, so quoted values may span lines and quotes
+    inside unquoted values are literal; empty cells are treated as missing.
+    Raises ValueError when the header lacks a required column.
+    """
+    header = None
+    feed = LineFeed()
+    reader = csv.reader(feed)
+    skipping = False
+    async for line in lines:
+        if isinstance(line, RowError):
+            # An unreadable line also ends any record it was part of
+            feed.clear()
+            yield line
+            continue
+        if skipping:
+            # Drop the rest of an over-long quoted value, up to the line closing it
+            skipping = '"' not in line
+            continue
+        waiting = bool(feed.lines)
+        feed.push(line)
+        if waiting and feed.length > max_length:
+            feed.clear()
+            skipping = True
+            yield too_long(max_length)
+            continue
+        # Only a quote can close a quoted value that is still open
+        if waiting and '"' not in line:
+            continue
+        try:
+            values = next(reader)
+        except FeedEmpty:
+            feed.rewind()
+            continue
+        except csv.Error as e:
+            feed.clear()
+            yield RowError([{"loc": [], "msg": f"Invalid CSV: {e}", "type": "csv_invalid"}])
+            continue
+        feed.consumed()
+        if not values or (len(values) == 1 and not values[0].strip()):
+            continue
+        if header is None:
+            header = [name.strip() for name in values]
+            missing = REQUIRED_CSV_COLUMNS - set(header)
+            if missing:
+                raise ValueError(f"CSV header is missing columns: {', '.join(sorted(missing))}")
+            continue
+        if len(values) != len(header):
+            yield RowError([{
+                "loc": [], "msg": f"Expected {len(header)} columns, got {len(values)}", "type": "csv_columns"
+            }])
+            continue
+        yield {name: value for name, value in zip(header, values) if value != ""}
+    if feed.lines:
+        yield RowError([{"loc": [], "msg": "Unterminated quoted value", "type": "csv_quote"}])
+
+
+RECORD_READERS = {
+    "ndjson": ndjson_records,
+    "csv": csv_records,
+}
+
+
+class ImportReport:
+    """Counts, per-row errors and throughput of one import"""
+
+    def __init__(self, max_errors: int = BULK_IMPORT_MAX_ERRORS):
+        self.max_errors = max_errors
+        self.rows = 0
+        self.inserted = 0
+        self.failed = 0
+        self.batches = 0
+        self.errors = []
+        self.started = time.perf_counter()
+
+    def error(self, row: int, errors: list):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"row": row, "errors": errors})
+
+    def as_dict(self) -> dict:
+        elapsed = time.perf_counter() - self.started
+        return {
+            "rows": self.rows,
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "batches": self.batches,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+            "elapsed_seconds": round(elapsed, 3),
+            "rows_per_second": round(self.rows / elapsed, 1) if elapsed > 0 else 0.0,
+        }
+
+
+async def import_movies(chunks, body_format: str, write, batch_size: int = BULK_IMPORT_BATCH_SIZE) -> ImportReport:
+    """
+    Validate the records of a streamed body and `await write(batch)` every
+    `batch_size` valid rows (dicts of MovieCreate fields). `write` returns
+    the number of rows stored. Rows are numbered from 1 in body order,
+    skipping blank lines and the CSV header.
+    """
+    report = ImportReport()
+    batch = []
+
+    async def flush():
+        report.inserted += await write(batch)
+        report.batches += 1
+        batch.clear()
+
+    async for record in RECORD_READERS[body_format](lines(chunks)):
+        report.rows += 1
+        if isinstance(record, RowError):
+            report.error(report.rows, record.errors)
+            continue
+        try:
+            movie = MovieCreate.model_validate(record)
+        except ValidationError as e:
+            report.error(report.rows, e.errors(include_url=False, include_context=False, include_input=False))
+            continue
+        batch.append(movie.model_dump())
+        if len(batch) >= batch_size:
+            await flush()
+    if batch:
+        await flush()
+    return report
@@ -0,0 +1,215 @@
+"""
+Negotiated response compression.
+
+Bodies of compressible types are encoded with brotli or gzip, whichever the
+client prefers in Accept-Encoding (brotli wins ties). Whole responses under
+COMPRESSION_MIN_SIZE are sent as they are, since headers and CPU would cost
+more than the bytes saved. Streaming responses are compressed incrementally
+and flushed after every chunk, so each chunk still reaches the client as
+soon as it is produced. brotli is optional; without it only gzip is offered.
+
+A strong ETag names one exact byte sequence, so a compressed response gets
+its ETag suffixed with the coding (`"abc"` -> `"abc-br"`). The suffix is
+stripped from If-None-Match on the way in, letting the routes compare
+against the identity tag, and put back on a 304 for the same coding.
+"""
+import os
+import zlib
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+# Quality 4 keeps brotli near gzip's CPU cost while still beating its ratio on JSON
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+COMPRESSIBLE_TYPES = (
+    "application/json", "application/x-ndjson", "application/msgpack", "text/",
+)
+
+
+def parse_qvalues(header: str) -> dict[str, float]:
+    """`gzip;q=0.8, br` -> {"gzip": 0.8, "br": 1.0}"""
+    values = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        values[name.strip().lower()] = q
+    return values
+
+
+def choose_encoding(accept_encoding: str):
+    """Best supported content coding for an Accept-Encoding header, or None"""
+    offered = parse_qvalues(accept_encoding)
+    wildcard = offered.get("*", 0.0)
+    best, best_q = None, 0.0
+    for encoding in ("br", "gzip") if brotli is not None else ("gzip",):
+        q = offered.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class Encoder:
+    """Incremental gzip or brotli encoder"""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY)
+        else:
+            self._zlib = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, flush: bool = False) -> bytes:
+        if self.encoding == "br":
+            out = self._brotli.process(data)
+            return out + self._brotli.flush() if flush else out
+        out = self._zlib.compress(data)
+        return out + self._zlib.flush(zlib.Z_SYNC_FLUSH) if flush else out
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.finish()
+        return self._zlib.flush(zlib.Z_FINISH)
+
+
+def encode(encoding: str, data: bytes) -> bytes:
+    encoder = Encoder(encoding)
+    return encoder.compress(data) + encoder.finish()
+
+
+def _header(headers, name: bytes):
+    for key, value in headers:
+        if key.lower() == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _add_vary(headers: list, value: str) -> list:
+    vary = _header(headers, b"vary")
+    if vary is None:
+        return headers + [(b"vary", value.encode("latin-1"))]
+    if value.lower() in vary.lower():
+        return headers
+    return [(k, v) for k, v in headers if k.lower() != b"vary"] + [(b"vary", f"{vary}, {value}".encode("latin-1"))]
+
+
+ENCODING_SUFFIXES = ("-br\"", "-gzip\"")
+
+
+def suffix_etag(etag: str, encoding: str) -> str:
+    """Coding-specific variant of a strong ETag; weak ones are left alone"""
+    if etag.startswith("W/") or not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def strip_etag_suffixes(if_none_match: str) -> tuple[str, set]:
+    """If-None-Match with coding suffixes removed, and the codings that were seen"""
+    tags, seen = [], set()
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        for suffix in ENCODING_SUFFIXES:
+            if tag.endswith(suffix):
+                seen.add(suffix[1:-1])
+                tag = tag[:-len(suffix)] + '"'
+                break
+        tags.append(tag)
+    return ", ".join(tags), seen
+
+
+def _replace_header(headers: list, name: bytes, value: str) -> list:
+    return [(k, v) for k, v in headers if k.lower() != name] + [(name, value.encode("latin-1"))]
+
+
+class CompressionMiddleware:
+    """ASGI middleware applying the negotiated content coding to response bodies"""
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not COMPRESSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = scope.get("headers", [])
+        encoding = choose_encoding(_header(request_headers, b"accept-encoding") or "")
+        revalidated = set()
+        if_none_match = _header(request_headers, b"if-none-match")
+        if if_none_match is not None:
+            if_none_match, revalidated = strip_etag_suffixes(if_none_match)
+            scope = {**scope, "headers": _replace_header(list(request_headers), b"if-none-match", if_none_match)}
+        start = None
+        encoder = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, encoder, passthrough
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                etag = _header(headers, b"etag")
+                if message["status"] == 304 and etag and encoding in revalidated:
+                    # The client holds the compressed variant it is revalidating
+                    headers = _add_vary(_replace_header(headers, b"etag", suffix_etag(etag, encoding)), "Accept-Encoding")
+                    message = {**message, "headers": headers}
+                    passthrough = True
+                    await send(message)
+                    return
+                content_type = _header(headers, b"content-type") or ""
+                if _header(headers, b"content-encoding") or not content_type.startswith(COMPRESSIBLE_TYPES):
+                    passthrough = True
+                    await send(message)
+                    return
+                # Hold the start until the first body chunk shows the size
+                start = {**message, "headers": _add_vary(headers, "Accept-Encoding")}
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start is not None:
+                headers = start["headers"]
+                if encoding is None or (not more_body and len(body) < self.minimum_size):
+                    await send(start)
+                    start, passthrough = None, True
+                    await send(message)
+                    return
+                encoder = Encoder(encoding)
+                headers = [(k, v) for k, v in headers if k.lower() != b"content-length"]
+                headers.append((b"content-encoding", encoding.encode("latin-1")))
+                etag = _header(headers, b"etag")
+                if etag:
+                    headers = _replace_header(headers, b"etag", suffix_etag(etag, encoding))
+                if not more_body:
+                    body = encoder.compress(body) + encoder.finish()
+                    headers.append((b"content-length", str(len(body)).encode("latin-1")))
+                    await send({**start, "headers": headers})
+                    await send({"type": "http.response.body", "body": body})
+                    start, passthrough = None, True
+                    return
+                await send({**start, "headers": headers})
+                start = None
+
+            if more_body:
+                await send({"type": "http.response.body", "body": encoder.compress(body, flush=True), "more_body": True})
+            else:
+                await send({"type": "http.response.body", "body": encoder.compress(body) + encoder.finish()})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,149 @@
+"""
+Conditional GETs and per-route caching policy.
+
+Read responses carry a strong ETag derived from the version stamps of the
+rows they were built from (movies.version moves with every write to a movie
+or its ratings) and from everything else that shapes the body: the query,
+the field selection, the count strategy of the total and JSON vs
+MessagePack. Responses about one movie also carry Last-Modified from
+movies.updated_at; list pages revalidate by ETag only. Routes compare
+If-None-Match (or, without it, If-Modified-Since) against a version probe
+that reads only ids and versions, and answer 304 before loading and
+serializing full rows.
+
+Each route sends its own Cache-Control; `no-cache` lets browsers and
+proxies keep a copy but revalidate it on every use, which is what the
+ETags make cheap.
+"""
+import hashlib
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import NamedTuple
+
+from fastapi import Request, Response
+
+from app.read_cache import cached, read_cache
+from app.responses import ModelResponse, wants_msgpack
+
+CACHE_CONTROL_MOVIE = os.getenv("CACHE_CONTROL_MOVIE", "public, no-cache")
+CACHE_CONTROL_MOVIE_LIST = os.getenv("CACHE_CONTROL_MOVIE_LIST", "public, max-age=5")
+CACHE_CONTROL_MOVIE_RATINGS = os.getenv("CACHE_CONTROL_MOVIE_RATINGS", "public, no-cache")
+CACHE_CONTROL_USER_RATINGS = os.getenv("CACHE_CONTROL_USER_RATINGS", "private, no-cache")
+CACHE_CONTROL_TOP_MOVIES = os.getenv("CACHE_CONTROL_TOP_MOVIES", "public, max-age=30")
+
+
+class Versioned(NamedTuple):
+    """A read model with the stamp its ETag is computed from"""
+    model: object
+    version: object
+    last_modified: datetime = None
+
+
+def page_version(movies, *extra) -> tuple:
+    """
+    Version stamp of a page of movie rows, and no Last-Modified: the newest
+    updated_at on a page does not move when a row is deleted or others
+    shift onto it, so pages revalidate by ETag only.
+    """
+    return (tuple((movie.id, movie.version) for movie in movies), *extra), None
+
+
+def representation(request: Request) -> str:
+    return "msgpack" if wants_msgpack(request.headers.get("accept", "")) else "json"
+
+
+def entity_tag(*parts) -> str:
+    """Strong ETag over everything that determines a response body"""
+    return '"' + hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest() + '"'
+
+
+def _utc(value: datetime) -> datetime:
+    # SQLite hands back naive timestamps; they are stored in UTC
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def http_date(value: datetime) -> str:
+    return format_datetime(_utc(value), usegmt=True)
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match uses the weak comparison: W/ prefixes are ignored"""
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def is_conditional(request: Request) -> bool:
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+
+def not_modified(request: Request, etag: str, last_modified: datetime = None) -> bool:
+    """Whether the client's copy is current; If-Modified-Since only counts without If-None-Match"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        return False
+    return _utc(last_modified).replace(microsecond=0) <= since
+
+
+def validator_headers(etag: str, last_modified: datetime = None, cache_control: str = None) -> dict:
+    headers = {"etag": etag}
+    if last_modified is not None:
+        headers["last-modified"] = http_date(last_modified)
+    if cache_control:
+        headers["cache-control"] = cache_control
+    return headers
+
+
+def not_modified_response(headers: dict) -> Response:
+    # A 304 repeats the validators and caching headers a 200 would have sent
+    return Response(status_code=304, headers={**headers, "vary": "Accept"})
+
+
+async def conditional_read(request: Request, key, adapter, load, probe, tags, cache_control: str,
+                           bypass: bool = False, from_replica: bool = False):
+    """
+    Response for a cached read of `key`, or None when `load` finds nothing.
+
+    `load` returns a Versioned model. A conditional request that misses the
+    cache is first checked against `await probe()`, a (version,
+    last_modified) pair (None when the row is gone), and gets a 304 without
+    `load` running; a cache hit is checked against the cached entry's stamp.
+    The cached model is served as stored, so a hit sends the same bytes as
+    the response that filled the cache; `X-Cache: hit|miss` tells them apart.
+    `bypass` is the session's read-your-writes flag: it skips the cache and
+    keeps the load out of flights other sessions may be serving from a replica.
+    `from_replica` says the session reads a replica, see `cached()`.
+    """
+    def headers_for(entry: Versioned):
+        etag = entity_tag(key, entry.version, representation(request))
+        return etag, validator_headers(etag, entry.last_modified, cache_control)
+
+    entry = None if bypass else read_cache.get(key)
+    if entry is None and is_conditional(request):
+        stamp = await probe()
+        if stamp is not None:
+            entry = Versioned(None, *stamp)
+    if entry is not None:
+        etag, headers = headers_for(entry)
+        if not_modified(request, etag, entry.last_modified):
+            return not_modified_response(headers)
+    hit = entry is not None and entry.model is not None
+    if not hit:
+        # The cache was already consulted above
+        entry = await cached(
+            key, load, tags, bypass=True, read_your_writes=bypass, from_replica=from_replica
+        )
+        if entry is None:
+            return None
+    headers = {**headers_for(entry)[1], "x-cache": "hit" if hit else "miss"}
+    return ModelResponse(adapter, entry.model, headers=headers)
@@ -0,0 +1,165 @@
+"""
+Count strategies for paginated list endpoints.
+
+Totals come from the cheapest source that is good enough:
+  - "none":      the caller asked for no total (include_total=false)
+  - "estimated": unfiltered table, answered from planner statistics on
+                 PostgreSQL or trigger-maintained counters on SQLite
+  - "cached":    exact count served from the in-process cache
+  - "exact":     COUNT(*) was run for this request
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+COUNT_CACHE_TTL = float(os.getenv("COUNT_CACHE_TTL", "60"))
+COUNT_CACHE_SIZE = int(os.getenv("COUNT_CACHE_SIZE", "1024"))
+# Below this many rows the planner estimate is too coarse to be worth it
+COUNT_ESTIMATE_MIN_ROWS = int(os.getenv("COUNT_ESTIMATE_MIN_ROWS", "10000"))
+
+# Columns whose value on a written row tells us which cached counts it can affect
+COUNT_SCOPE_COLUMNS = {
+    "ratings": ("movie_id", "user_id"),
+}
+
+
+def filter_key(table: str, **filters) -> tuple:
+    """Normalize list filters into a hashable cache key"""
+    normalized = []
+    for name, value in sorted(filters.items()):
+        if value is None or value == "":
+            continue
+        if isinstance(value, str):
+            value = value.strip().lower()
+        normalized.append((name, value))
+    return (table, tuple(normalized))
+
+
+class CountCache:
+    """Thread-safe LRU of exact counts with a TTL per entry"""
+
+    def __init__(self, maxsize: int = COUNT_CACHE_SIZE, ttl: float = COUNT_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def generation(self, table: str) -> int:
+        """Bumped on every invalidation so in-flight counts can detect a race"""
+        with self._lock:
+            return self._generations.get(table, 0)
+
+    def get(self, key: tuple):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            total, expires = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return total
+
+    def set(self, key: tuple, total: int, generation: int = None):
+        with self._lock:
+            # A write committed while we were counting; the result may be stale
+            if generation is not None and generation != self._generations.get(key[0], 0):
+                return
+            self._entries[key] = (total, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, table: str, **scope):
+        """
+        Drop cached counts a write to `table` may have changed. An entry
+        survives only if one of its filters provably excludes the written row.
+        """
+        with self._lock:
+            self._generations[table] = self._generations.get(table, 0) + 1
+            for key in list(self._entries):
+                entry_table, filters = key
+                if entry_table != table:
+                    continue
+                if all(scope.get(name, value) == value for name, value in filters):
+                    del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+count_cache = CountCache()
+
+
+def estimate_rows(db: Session, table: str):
+    """Cheap row count for a whole table, or None if no estimate is available"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        estimate = db.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)"),
+            {"table": table}
+        ).scalar()
+        if estimate is None or estimate < COUNT_ESTIMATE_MIN_ROWS:
+            return None
+        return int(estimate)
+    if dialect == "sqlite":
+        return db.execute(
+            text("SELECT row_count FROM row_counts WHERE table_name = :table"),
+            {"table": table}
+        ).scalar()
+    return None
+
+
+def count_rows(db: Session, query, table: str, filters: dict, include_total: bool = True):
+    """Return (total, strategy) for a filtered list query"""
+    if not include_total:
+        return None, "none"
+
+    if not any(value not in (None, "") for value in filters.values()):
+        estimate = estimate_rows(db, table)
+        if estimate is not None:
+            return estimate, "estimated"
+
+    key = filter_key(table, **filters)
+    total = count_cache.get(key)
+    if total is not None:
+        return total, "cached"
+
+    generation = count_cache.generation(table)
+    total = query.count()
+    count_cache.set(key, total, generation)
+    return total, "exact"
+
+
+def row_scope(instance) -> tuple:
+    """(table, scope) describing which cached counts a written row can affect"""
+    table = instance.__tablename__
+    scope = {name: getattr(instance, name) for name in COUNT_SCOPE_COLUMNS.get(table, ())}
+    return table, scope
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_count_invalidations(session, flush_context):
+    # Capture scopes now; deleted rows are detached by the time we commit
+    pending = session.info.setdefault("count_invalidations", [])
+    for instance in list(session.new) + list(session.deleted):
+        if hasattr(instance, "__tablename__"):
+            pending.append(row_scope(instance))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_count_invalidations(session):
+    for table, scope in session.info.pop("count_invalidations", []):
+        count_cache.invalidate(table, **scope)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_count_invalidations(session):
+    session.info.pop("count_invalidations", None)
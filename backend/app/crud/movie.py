@@ -1,48 +1,146 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
+from datetime import datetime
+from sqlalchemy import insert, or_, select
+from sqlalchemy.orm import Session, load_only
 from app.models.movie import Movie
+from app.models.rating import STARS
 from app.schemas.movie import MovieCreate
+from app.pagination import encode_cursor, keyset_filter, order_columns, parse_sort
+from app.counting import count_cache, count_rows
+from app.read_cache import LIST_TAG, read_cache
+from app.search import apply_search, search_ranking
 
-def get_movies(
-    db: Session, 
-    skip: int = 0, 
-    limit: int = 100,
+SORT_COLUMNS = {
+    "id": Movie.id,
+    "title": Movie.title,
+    "release_year": Movie.release_year,
+}
+
+def filter_movies(
+    query,
     genre: str = None,
     min_year: int = None,
     max_year: int = None,
     search: str = None
 ):
-    query = db.query(Movie)
-    
+    """Apply the shared list filters to a movies query"""
     if genre:
         query = query.filter(Movie.genre.ilike(f"%{genre}%"))
-    
+
     if min_year:
         query = query.filter(Movie.release_year >= min_year)
-    
+
     if max_year:
         query = query.filter(Movie.release_year <= max_year)
-    
+
     if search:
-        query = query.filter(
-            or_(
-                Movie.title.ilike(f"%{search}%"),
-                Movie.description.ilike(f"%{search}%")
-            )
-        )
-    
-    total = query.count()
-    movies = query.offset(skip).limit(limit).all()
-    
+        query = apply_search(query, query.session.get_bind().dialect.name, search)
+    return query
+
+# Always loaded: response validators (ETag, Last-Modified) are derived from them
+VERSION_COLUMNS = ("version", "updated_at")
+
+def load_fields(query, fields: tuple = None, *extra: str):
+    """Load only the selected columns (plus `extra` ones the caller reads itself)"""
+    if fields is None:
+        return query
+    return query.options(load_only(*(getattr(Movie, name) for name in {*fields, *extra, *VERSION_COLUMNS})))
+
+def get_movies(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    genre: str = None,
+    min_year: int = None,
+    max_year: int = None,
+    search: str = None,
+    sort: str = None,
+    include_total: bool = True,
+    fields: tuple = None
+):
+    """
+    Offset pagination. Without an explicit sort, searches are ordered by
+    relevance and everything else by id.
+    """
+    query = filter_movies(db.query(Movie), genre, min_year, max_year, search)
+
+    total, count_strategy = count_rows(
+        db, query, "movies",
+        {"genre": genre, "min_year": min_year, "max_year": max_year, "search": search},
+        include_total=include_total
+    )
+    ordering = order_columns(SORT_COLUMNS, sort or "id")
+    if search and sort is None:
+        ordering = search_ranking(db.get_bind().dialect.name, search) + ordering
+    movies = load_fields(query, fields).order_by(*ordering).offset(skip).limit(limit).all()
+
     return {
         "movies": movies,
         "total": total,
+        "count_strategy": count_strategy,
         "page": skip // limit + 1 if limit > 0 else 1,
         "limit": limit
     }
 
-def get_movie_by_id(db: Session, movie_id: int):
-    return db.query(Movie).filter(Movie.id == movie_id).first()
+def get_movies_after(
+    db: Session,
+    cursor: str = None,
+    limit: int = 100,
+    genre: str = None,
+    min_year: int = None,
+    max_year: int = None,
+    search: str = None,
+    sort: str = None,
+    fields: tuple = None
+):
+    """
+    Keyset pagination: seek past the cursor position instead of OFFSET,
+    so every page costs the same regardless of how deep it is.
+    Raises ValueError for a malformed cursor or unknown sort.
+    """
+    sort = sort or "id"
+    field, _ = parse_sort(sort)
+    query = filter_movies(db.query(Movie), genre, min_year, max_year, search)
+    if cursor:
+        query = query.filter(keyset_filter(SORT_COLUMNS, sort, cursor))
+
+    # Fetch one extra row to learn whether another page exists
+    # The sort key is read back for the next cursor, so it is always loaded
+    query = load_fields(query, fields, field)
+    rows = query.order_by(*order_columns(SORT_COLUMNS, sort)).limit(limit + 1).all()
+    movies = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        last = movies[-1]
+        next_cursor = encode_cursor(sort, getattr(last, field), last.id)
+
+    return {
+        "movies": movies,
+        "next_cursor": next_cursor,
+        "limit": limit
+    }
+
+def get_movie_by_id(db: Session, movie_id: int, fields: tuple = None):
+    return load_fields(db.query(Movie), fields).filter(Movie.id == movie_id).first()
+
+def get_movie_version(db: Session, movie_id: int):
+    """(version, updated_at) of a movie, or None; a primary key lookup of two columns"""
+    return db.query(Movie.version, Movie.updated_at).filter(Movie.id == movie_id).first()
+
+HISTOGRAM_COLUMNS = ("id", "ratings_count", "ratings_avg", *(f"ratings_{star}" for star in STARS))
+
+def get_movie_histogram(db: Session, movie_id: int):
+    """A movie's star counts as {"movie_id", "ratings_count", "ratings_avg", "histogram"}, or None"""
+    movie = load_fields(db.query(Movie), HISTOGRAM_COLUMNS).filter(Movie.id == movie_id).first()
+    if movie is None:
+        return None
+    return {
+        "movie_id": movie.id,
+        "ratings_count": movie.ratings_count or 0,
+        "ratings_avg": movie.ratings_avg or 0.0,
+        "histogram": {star: getattr(movie, f"ratings_{star}") or 0 for star in STARS},
+        "version": movie.version,
+        "updated_at": movie.updated_at,
+    }
 
 def create_movie(db: Session, movie: MovieCreate, user_id: int):
     db_movie = Movie(**movie.model_dump(), created_by=user_id)
@@ -51,9 +149,37 @@ def create_movie(db: Session, movie: MovieCreate, user_id: int):
     db.refresh(db_movie)
     return db_movie
 
+def create_movies(db: Session, movies: list[dict], user_id: int) -> int:
+    """
+    Insert a batch of validated movies in one executemany INSERT (sent as
+    multi-row VALUES pages on PostgreSQL) and one commit, without loading
+    the rows back. Returns the number inserted.
+    """
+    if not movies:
+        return 0
+    db.execute(insert(Movie), [{**movie, "created_by": user_id} for movie in movies])
+    db.commit()
+
+    # Core statements bypass the ORM flush hooks; new rows change every list
+    count_cache.invalidate("movies")
+    read_cache.invalidate(LIST_TAG)
+    return len(movies)
+
+EXPORT_COLUMNS = (
+    "id", "title", "genre", "release_year", "description", "created_by",
+    "created_at", "updated_at", "ratings_count", "ratings_avg",
+)
+
+def export_movies_query(since: datetime = None):
+    """Movies in id order, optionally only those created or changed since `since`"""
+    query = select(*(Movie.__table__.c[name] for name in EXPORT_COLUMNS)).order_by(Movie.id)
+    if since is not None:
+        query = query.where(or_(Movie.created_at >= since, Movie.updated_at >= since))
+    return query
+
 def delete_movie(db: Session, movie_id: int):
     movie = db.query(Movie).filter(Movie.id == movie_id).first()
     if movie:
         db.delete(movie)
         db.commit()
-    return movie
\ No newline at end of file
+    return movie
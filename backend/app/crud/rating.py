@@ -1,8 +1,14 @@
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func
-from app.models.rating import Rating
+from sqlalchemy.orm import Session, joinedload, load_only, noload
+from datetime import datetime
+from sqlalchemy import Float, Integer, String, case, cast, func, literal, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from app.models.rating import Rating, STARS
 from app.models.movie import Movie
+from app.models.user import User
 from app.schemas.rating import RatingCreate
+from app.counting import count_cache, count_rows
+from app.read_cache import movie_tag, read_cache
+from app.leaderboard import leaderboard, leaderboard_row
 
 
 def get_rating_by_user_and_movie(db: Session, user_id: int, movie_id: int):
@@ -11,72 +17,154 @@ def get_rating_by_user_and_movie(db: Session, user_id: int, movie_id: int):
         Rating.movie_id == movie_id
     ).first()
 
+UPSERT_DIALECTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
 def create_or_update_rating(db: Session, rating: RatingCreate, movie_id: int, user_id: int):
-    # Check if rating exists
-    existing_rating = get_rating_by_user_and_movie(db, user_id, movie_id)
-    
-    if existing_rating:
-        # Update existing rating
-        existing_rating.rating = rating.rating
-        existing_rating.review = rating.review
-        db.commit()
-        db.refresh(existing_rating)
-        return existing_rating
-    else:
-        # Create new rating
-        db_rating = Rating(**rating.model_dump(), movie_id=movie_id, user_id=user_id)
-        db.add(db_rating)
-        db.commit()
-        db.refresh(db_rating)
-        return db_rating
+    """
+    Insert or update the user's rating for a movie in a single statement and
+    a single commit. The INSERT selects from movies so a missing movie
+    inserts nothing (returns None), ON CONFLICT resolves concurrent
+    first-ratings inside the database, and triggers on ratings move the
+    movie's aggregates in the same transaction.
+    """
+    insert = UPSERT_DIALECTS[db.get_bind().dialect.name]
+    source = select(
+        Movie.id,
+        literal(user_id, Integer),
+        literal(rating.rating, Integer),
+        literal(rating.review, String),
+    ).where(Movie.id == movie_id)
+    stmt = insert(Rating).from_select(["movie_id", "user_id", "rating", "review"], source)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Rating.movie_id, Rating.user_id],
+        set_={
+            "rating": stmt.excluded.rating,
+            "review": stmt.excluded.review,
+            "updated_at": func.now(),
+        },
+    ).returning(
+        Rating.id, Rating.movie_id, Rating.user_id, Rating.rating,
+        Rating.review, Rating.created_at, Rating.updated_at,
+    )
+    row = db.execute(stmt).mappings().first()
+    # The triggers have moved the movie's aggregates; re-score it from them
+    board_row = leaderboard_row(db, movie_id) if row is not None and leaderboard.active else None
+    db.commit()
+
+    # Core statements bypass the ORM flush hooks; a fresh row changes counts
+    if row is not None and row["updated_at"] is None:
+        count_cache.invalidate("ratings", movie_id=movie_id, user_id=user_id)
+    if row is not None:
+        read_cache.invalidate(movie_tag(movie_id))
+    if board_row is not None:
+        leaderboard.update(board_row)
+    return row
 
-def get_ratings_by_movie(db: Session, movie_id: int, skip: int = 0, limit: int = 100):
-    query = db.query(Rating).options(joinedload(Rating.user)).filter(Rating.movie_id == movie_id)
-    total = query.count()
-    ratings = query.offset(skip).limit(limit).all()
+RATING_FIELDS = ("id", "movie_id", "user_id", "username", "rating", "review", "created_at", "updated_at")
+
+def rating_row(r: Rating, fields: tuple = None) -> dict:
+    """Response row for a rating whose user was eager-loaded (when username is wanted)"""
+    return {
+        name: r.user.username if name == "username" else getattr(r, name)  # 👈 add username here
+        for name in fields or RATING_FIELDS
+    }
+
+def rating_options(fields: tuple = None):
+    """
+    Loader options for a ratings page: only the selected columns, and the
+    user join only when username is selected
+    """
+    if fields is None:
+        # Serializing username would otherwise lazy-load the user once per row
+        return [joinedload(Rating.user)]
+    columns = [getattr(Rating, name) for name in fields if name in Rating.__table__.columns]
+    user = joinedload(Rating.user).load_only(User.username) if "username" in fields else noload(Rating.user)
+    return [load_only(*columns), user]
+
+def get_ratings_by_movie(
+    db: Session, movie_id: int, skip: int = 0, limit: int = 100, include_total: bool = True, fields: tuple = None
+):
+    query = db.query(Rating).filter(Rating.movie_id == movie_id)
+    total, count_strategy = count_rows(
+        db, query, "ratings", {"movie_id": movie_id}, include_total=include_total
+    )
+    ratings = query.options(*rating_options(fields)).offset(skip).limit(limit).all()
     
     return {
-        "ratings": [
-            {
-                "id": r.id,
-                "movie_id": r.movie_id,
-                "user_id": r.user_id,
-                "username": r.user.username,  # 👈 add username here
-                "rating": r.rating,
-                "review": r.review,
-                "created_at": r.created_at,
-                "updated_at": r.updated_at,
-            }
-            for r in ratings
-        ],
+        "ratings": [rating_row(r, fields) for r in ratings],
         "total": total,
+        "count_strategy": count_strategy,
         "page": skip // limit + 1 if limit > 0 else 1,
         "limit": limit
     }
 
-def get_ratings_by_user(db: Session, user_id: int, skip: int = 0, limit: int = 100):
+def get_ratings_by_user(
+    db: Session, user_id: int, skip: int = 0, limit: int = 100, include_total: bool = True, fields: tuple = None
+):
     query = db.query(Rating).filter(Rating.user_id == user_id)
-    total = query.count()
-    ratings = query.offset(skip).limit(limit).all()
+    total, count_strategy = count_rows(
+        db, query, "ratings", {"user_id": user_id}, include_total=include_total
+    )
+    ratings = query.options(*rating_options(fields)).offset(skip).limit(limit).all()
     
     return {
-        "ratings": ratings,
+        "ratings": [rating_row(r, fields) for r in ratings],
         "total": total,
+        "count_strategy": count_strategy,
         "page": skip // limit + 1 if limit > 0 else 1,
         "limit": limit
     }
 
-def update_movie_ratings_stats(db: Session, movie_id: int):
-    """Update aggregated rating statistics for a movie"""
-    from sqlalchemy import func
-    
-    stats = db.query(
-        func.count(Rating.id).label('count'),
-        func.avg(Rating.rating).label('avg')
-    ).filter(Rating.movie_id == movie_id).first()
-    
-    movie = db.query(Movie).filter(Movie.id == movie_id).first()
-    if movie:
-        movie.ratings_count = stats.count or 0
-        movie.ratings_avg = float(stats.avg or 0.0)
-        db.commit()
\ No newline at end of file
+def export_ratings_query(since: datetime = None):
+    """Ratings in id order, optionally only those created or changed since `since`"""
+    query = select(*(Rating.__table__.c[name] for name in RATING_FIELDS if name != "username")).order_by(Rating.id)
+    if since is not None:
+        query = query.where(or_(Rating.created_at >= since, Rating.updated_at >= since))
+    return query
+
+def reconcile_movie_ratings_stats(db: Session):
+    """
+    Recompute every movie's rating aggregates and star histogram from the
+    ratings table in one set-based pass, repairing any drift in the
+    incrementally kept values (and backfilling them).
+    Returns the number of movies whose aggregates were rewritten.
+    """
+    stats = (
+        select(
+            Rating.movie_id.label("movie_id"),
+            func.count(Rating.id).label("count"),
+            func.sum(Rating.rating).label("sum"),
+            *(func.sum(case((Rating.rating == star, 1), else_=0)).label(f"ratings_{star}") for star in STARS),
+        )
+        .group_by(Rating.movie_id)
+        .subquery()
+    )
+    rated = db.execute(
+        update(Movie)
+        .where(Movie.id == stats.c.movie_id)
+        .values(
+            ratings_count=stats.c.count,
+            ratings_sum=stats.c.sum,
+            ratings_avg=cast(stats.c.sum, Float) / stats.c.count,
+            **{f"ratings_{star}": stats.c[f"ratings_{star}"] for star in STARS},
+            version=Movie.version + 1,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    unrated = db.execute(
+        update(Movie)
+        .where(~Movie.id.in_(select(Rating.movie_id)))
+        .values(
+            ratings_count=0, ratings_sum=0, ratings_avg=0.0,
+            **{f"ratings_{star}": 0 for star in STARS},
+            version=Movie.version + 1,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    read_cache.clear()
+    leaderboard.mark_stale()
+    return rated.rowcount + unrated.rowcount
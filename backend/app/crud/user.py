@@ -1,7 +1,8 @@
 from sqlalchemy.orm import Session
 from app.models.user import User
 from app.schemas.user import UserCreate
-from app.auth.jwt import get_password_hash, verify_password
+from app.auth.hashing import password_hasher
+from app.database import run_db
 
 def get_user_by_username(db: Session, username: str):
     return db.query(User).filter(User.username == username).first()
@@ -9,28 +10,30 @@ def get_user_by_username(db: Session, username: str):
 def get_user_by_email(db: Session, email: str):
     return db.query(User).filter(User.email == email).first()
 
-def create_user(db: Session, user: UserCreate):
-    hashed_password = get_password_hash(user.password)
+def save_user(db: Session, user: UserCreate, password_hash: str):
     db_user = User(
         username=user.username,
         email=user.email,
-        password_hash=hashed_password
+        password_hash=password_hash
     )
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
     return db_user
 
-def authenticate_user(db: Session, username_or_email: str, password: str):
-    # Try username first
-    user = get_user_by_username(db, username_or_email)
+async def create_user(db: Session, user: UserCreate):
+    # bcrypt runs on the password hashing pool, the insert through run_db
+    hashed_password = await password_hasher.hash(user.password)
+    return await run_db(db, save_user, user, hashed_password)
 
-    # If not found, try email
-    if not user:
-        user = get_user_by_email(db, username_or_email)
-        
+def find_user(db: Session, username_or_email: str):
+    # Try username first, then email
+    return get_user_by_username(db, username_or_email) or get_user_by_email(db, username_or_email)
+
+async def authenticate_user(db: Session, username_or_email: str, password: str):
+    user = await run_db(db, find_user, username_or_email)
     if not user:
         return False
-    if not verify_password(password, user.password_hash):
+    if not await password_hasher.verify(password, user.password_hash):
         return False
-    return user
\ No newline at end of file
+    return user
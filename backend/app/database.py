@@ -1,8 +1,20 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from fastapi import Depends, Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlalchemy.util import await_only
+from starlette.concurrency import run_in_threadpool
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
+from app.profiling import profiled
+from app.routing import DB_REPLICA_URLS, ReplicaSet, RoutingSession, route_request
+from app.sqlite import configure_sqlite, write_owner
+
 # Load environment variables
 load_dotenv()
 # Database configuration
@@ -11,26 +23,266 @@ DB_PASSWORD = os.getenv("DB_PASSWORD", "password")
 DB_HOST = os.getenv("DB_HOST", "localhost")
 DB_PORT = os.getenv("DB_PORT", "5432")
 DB_NAME = os.getenv("DB_NAME", "movie_platform")
+# Serve requests through an AsyncEngine (asyncpg / aiosqlite) instead of the threadpool
+USE_ASYNC_DB = os.getenv("USE_ASYNC_DB", "false").lower() == "true"
+
+# Connection pool configuration
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# Default per-statement timeout in milliseconds (0 disables it)
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+# Tighter budget for public list/search endpoints
+DB_LIST_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_LIST_STATEMENT_TIMEOUT_MS", "5000"))
+
+
+class PoolMetrics:
+    """Counters fed by pool events and by timing checkouts"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.checkins = 0
+            self.connects = 0
+            self.invalidations = 0
+            self.timeouts = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+
+    def record_wait(self, elapsed: float, timed_out: bool = False):
+        with self._lock:
+            self.wait_total += elapsed
+            self.wait_max = max(self.wait_max, elapsed)
+            if timed_out:
+                self.timeouts += 1
+
+    def incr(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def snapshot(self, pool) -> dict:
+        with self._lock:
+            snapshot = {
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "wait_total_ms": self.wait_total * 1000,
+                "wait_avg_ms": self.wait_total / self.checkouts * 1000 if self.checkouts else 0.0,
+                "wait_max_ms": self.wait_max * 1000,
+            }
+        if isinstance(pool, QueuePool):
+            snapshot.update({
+                "size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+                "overflow": max(0, pool.overflow()),
+                "max_overflow": pool._max_overflow,
+                "timeout": pool.timeout(),
+            })
+        return snapshot
+
+
+pool_metrics = PoolMetrics()
+
+
+class _TimedCheckout:
+    """Pool mixin that records how long callers wait for a connection"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            pool_metrics.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        pool_metrics.record_wait(time.perf_counter() - start)
+        return connection
+
+
+class InstrumentedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_options(poolclass=InstrumentedQueuePool) -> dict:
+    return {
+        "poolclass": poolclass,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
 
 # Choose database based on environment
 if os.getenv("USE_SQLITE", "false").lower() == "true":
     # SQLite for development/testing
     SQLALCHEMY_DATABASE_URL = "sqlite:///./movie_platform.db"
     engine = create_engine(
-        SQLALCHEMY_DATABASE_URL, 
-        connect_args={"check_same_thread": False}
+        SQLALCHEMY_DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        **pool_options()
     )
 else:
     # PostgreSQL for production
     SQLALCHEMY_DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-    engine = create_engine(SQLALCHEMY_DATABASE_URL)
+    engine = create_engine(SQLALCHEMY_DATABASE_URL, **pool_options())
+
+def async_url(url: str) -> str:
+    """Same database, reached through the asyncio driver of its dialect"""
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+
+async_engine = None
+AsyncSessionLocal = None
+if USE_ASYNC_DB:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    async_engine = create_async_engine(
+        async_url(SQLALCHEMY_DATABASE_URL),
+        **pool_options(InstrumentedAsyncQueuePool)
+    )
+    # Attributes must stay loaded after commit: lazy refreshes cannot run
+    # outside the greenlet bridge, e.g. during response serialization
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# Tuned pragmas and a writer queue for file-backed SQLite, see app/sqlite.py
+sqlite_write_gate = None
+if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
+    sqlite_write_gate = configure_sqlite(engine)
+    if async_engine is not None:
+        sqlite_write_gate = configure_sqlite(async_engine.sync_engine)
+
+def serving_pool():
+    """The pool request traffic is served from"""
+    return async_engine.pool if async_engine is not None else engine.pool
+
+for _pool in {engine.pool, serving_pool()}:
+    event.listen(_pool, "connect", lambda *args: pool_metrics.incr("connects"))
+    event.listen(_pool, "checkout", lambda *args: pool_metrics.incr("checkouts"))
+    event.listen(_pool, "checkin", lambda *args: pool_metrics.incr("checkins"))
+    event.listen(_pool, "invalidate", lambda *args: pool_metrics.incr("invalidations"))
+
+def replica_engine(url: str):
+    """Engine for a read replica, sync or async to match the primary"""
+    connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+    if async_engine is not None:
+        replica = create_async_engine(async_url(url), **pool_options(AsyncAdaptedQueuePool)).sync_engine
+    else:
+        replica = create_engine(url, connect_args=connect_args, **pool_options(QueuePool))
+    if url.startswith("sqlite"):
+        configure_sqlite(replica, serialize_writes=False)
+    return replica
+
+replica_set = ReplicaSet([replica_engine(url) for url in DB_REPLICA_URLS]) if DB_REPLICA_URLS else None
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=RoutingSession)
+if async_engine is not None:
+    AsyncSessionLocal.configure(sync_session_class=RoutingSession)
 Base = declarative_base()
 
-def get_db():
+def get_sync_db(request: Request):
     db = SessionLocal()
+    route_request(db, request, replica_set)
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db(request: Request):
+    async with AsyncSessionLocal() as db:
+        route_request(db, request, replica_set)
+        yield db
+
+# Request dependency; endpoints handle either session type through run_db()
+get_db = get_async_db if USE_ASYNC_DB else get_sync_db
+
+async def run_db(db, fn, *args, **kwargs):
+    """
+    Call a crud function `fn(session, *args, **kwargs)` without blocking the
+    event loop. An AsyncSession runs it through run_sync(), so its queries go
+    out on the async driver; a plain Session runs it on the threadpool.
+    Each call is its own holder of the SQLite write gate, whichever pooled
+    thread it lands on.
+    """
+    token = write_owner.set(object())
+    try:
+        if isinstance(db, Session):
+            return await run_in_threadpool(profiled(fn), db, *args, **kwargs)
+        return await db.run_sync(fn, *args, **kwargs)
+    finally:
+        write_owner.reset(token)
+
+
+# Statement timeouts. A session carries its timeout in `info`; it is applied
+# to the connection whenever that session starts a transaction.
+def set_statement_timeout(db: Session, timeout_ms: int):
+    """Override the statement timeout for the rest of this session's work"""
+    db.info["statement_timeout_ms"] = timeout_ms
+    if db.in_transaction():
+        apply_statement_timeout(db.connection(), timeout_ms)
+
+def statement_timeout(timeout_ms: int):
+    """Route dependency giving every statement of the request a timeout"""
+    async def dependency(db: Session = Depends(get_db)):
+        await run_db(db, set_statement_timeout, timeout_ms)
+    return dependency
+
+def apply_statement_timeout(connection, timeout_ms: int):
+    if connection.dialect.name == "postgresql":
+        # SET LOCAL lasts until the end of the current transaction only
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout_ms)}")
+    else:
+        connection.info["statement_timeout_ms"] = timeout_ms
+
+@event.listens_for(Session, "after_begin")
+def _begin_with_statement_timeout(session, transaction, connection):
+    timeout_ms = session.info.get("statement_timeout_ms", DB_STATEMENT_TIMEOUT_MS)
+    if timeout_ms or connection.info.get("statement_timeout_ms"):
+        apply_statement_timeout(connection, timeout_ms)
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _arm_sqlite_statement_timeout(conn, cursor, statement, parameters, context, executemany):
+    # SQLite has no statement_timeout; a progress handler that aborts past
+    # the deadline makes the statement fail with "interrupted" instead
+    if conn.dialect.name != "sqlite":
+        return
+    timeout_ms = conn.info.get("statement_timeout_ms")
+    if not timeout_ms and not conn.info.get("progress_handler_armed"):
+        return
+    raw = conn.connection.driver_connection
+    if timeout_ms:
+        deadline = time.monotonic() + timeout_ms / 1000
+        _set_progress_handler(raw, lambda: time.monotonic() > deadline, 10000)
+    else:
+        _set_progress_handler(raw, None, 0)
+    conn.info["progress_handler_armed"] = bool(timeout_ms)
+
+def _set_progress_handler(raw, handler, n):
+    result = raw.set_progress_handler(handler, n)
+    if result is not None:
+        # aiosqlite proxies the call to its worker thread; we are inside the greenlet bridge here
+        await_only(result)
+
+@event.listens_for(Engine, "checkin")
+def _reset_statement_timeout(dbapi_connection, connection_record):
+    connection_record.info.pop("statement_timeout_ms", None)
+
+def is_statement_timeout(exc: Exception) -> bool:
+    """True if a DBAPI error was raised by a statement timeout"""
+    orig = getattr(exc, "orig", exc)
+    if getattr(orig, "pgcode", None) == "57014":  # query_canceled
+        return True
+    return "interrupted" in str(orig)
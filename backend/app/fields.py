@@ -0,0 +1,74 @@
+"""
+Sparse fieldsets (`?fields=title,genre`).
+
+A selection is checked against the read model's fields, normalized to the
+model's declaration order and cached, so every spelling of the same set
+shares one narrowed model and one compiled TypeAdapter. The crud layer gets
+the field names and loads only those columns.
+"""
+import os
+from functools import lru_cache
+
+from fastapi import HTTPException, Query, status
+from pydantic import BaseModel, ConfigDict, TypeAdapter, create_model
+
+SPARSE_FIELDSET_CACHE = int(os.getenv("SPARSE_FIELDSET_CACHE", "256"))
+
+
+class FieldSet:
+    """A validated selection of read model fields with its compiled serializers"""
+
+    def __init__(self, model: type[BaseModel], names: tuple[str, ...]):
+        self.names = names
+        self.model = create_model(
+            f"{model.__name__}Fields",
+            __config__=ConfigDict(from_attributes=True),
+            **{name: (model.model_fields[name].annotation, model.model_fields[name]) for name in names},
+        )
+        self.adapter = TypeAdapter(self.model)
+        self._envelopes = {}
+
+    def envelope(self, envelope_model: type[BaseModel], field: str) -> TypeAdapter:
+        """Adapter for a list response whose `field` holds narrowed items"""
+        adapter = self._envelopes.get(envelope_model)
+        if adapter is None:
+            narrowed = create_model(envelope_model.__name__, __base__=envelope_model, **{field: (list[self.model], ...)})
+            adapter = self._envelopes[envelope_model] = TypeAdapter(narrowed)
+        return adapter
+
+
+@lru_cache(maxsize=SPARSE_FIELDSET_CACHE)
+def field_set(model: type[BaseModel], names: tuple[str, ...]) -> FieldSet:
+    return FieldSet(model, names)
+
+
+def parse_fields(model: type[BaseModel], value: str):
+    """FieldSet for a comma-separated selection, None for no selection; ValueError for unknown fields"""
+    if value is None:
+        return None
+    requested = {name.strip() for name in value.split(",") if name.strip()}
+    if not requested:
+        raise ValueError("fields must name at least one field")
+    unknown = requested - model.model_fields.keys()
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    # id is always returned: it identifies the row and backs pagination cursors
+    requested.add("id")
+    return field_set(model, tuple(name for name in model.model_fields if name in requested))
+
+
+def sparse_fields(model: type[BaseModel]):
+    """Dependency factory parsing `?fields=` against `model`"""
+    allowed = ", ".join(model.model_fields)
+
+    def dependency(
+        fields: str = Query(None, max_length=500, description=f"Comma-separated subset of: {allowed}")
+    ):
+        try:
+            return parse_fields(model, fields)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+    return dependency
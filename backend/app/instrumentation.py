@@ -0,0 +1,136 @@
+"""
+Per-request SQL instrumentation.
+
+Cursor-level engine hooks count every statement and its time against the
+request that issued it, tracked through a context variable that follows the
+request onto the threadpool and into AsyncSession.run_sync(). The totals are
+returned in a `Server-Timing` header, and requests that issue too many
+queries, spend too long in SQL or repeat one statement (the N+1 pattern) are
+logged as warnings.
+"""
+import logging
+import os
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+SQL_INSTRUMENTATION = os.getenv("SQL_INSTRUMENTATION", "true").lower() == "true"
+SQL_WARN_QUERY_COUNT = int(os.getenv("SQL_WARN_QUERY_COUNT", "20"))
+SQL_WARN_TIME_MS = float(os.getenv("SQL_WARN_TIME_MS", "200"))
+# Same statement this many times in one request is reported as a likely N+1
+SQL_REPEAT_THRESHOLD = int(os.getenv("SQL_REPEAT_THRESHOLD", "5"))
+
+logger = logging.getLogger("app.sql")
+
+_current = ContextVar("request_sql_stats", default=None)
+
+_PARAMETER = re.compile(r"%\(\w+\)s|%s|\$\d+")
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    """Statement with literals and IN lists collapsed, so repeats of one query compare equal"""
+    statement = _PARAMETER.sub("?", statement)
+    statement = _STRING_LITERAL.sub("?", statement)
+    statement = _NUMBER_LITERAL.sub("?", statement)
+    statement = _IN_LIST.sub("(?)", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+class RequestSQLStats:
+    """Statements issued on behalf of one request"""
+
+    def __init__(self, scope=None):
+        self.scope = scope
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def record(self, statement: str, elapsed: float):
+        self.count += 1
+        self.duration += elapsed
+        self.fingerprints[fingerprint(statement)] += 1
+
+    def repeated(self, threshold: int = SQL_REPEAT_THRESHOLD) -> list[tuple[str, int]]:
+        return [(sql, n) for sql, n in self.fingerprints.most_common() if n >= threshold]
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.duration * 1000:.2f};desc="{self.count} queries"'
+
+
+def current_sql_stats():
+    return _current.get()
+
+
+def current_route():
+    """Method and route template of the request issuing SQL, if any"""
+    stats = _current.get()
+    if stats is None or stats.scope is None:
+        return None
+    route = stats.scope.get("route")
+    return f'{stats.scope.get("method")} {getattr(route, "path", None) or stats.scope.get("path")}'
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info["query_start"] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _record_query(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    start = conn.info.pop("query_start", None)
+    if stats is not None and start is not None:
+        stats.record(statement, time.perf_counter() - start)
+
+
+class SQLInstrumentationMiddleware:
+    """ASGI middleware that scopes SQL stats to a request and reports them"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not SQL_INSTRUMENTATION:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestSQLStats(scope)
+        token = _current.set(stats)
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                app_ms = (time.perf_counter() - start) * 1000
+                headers = list(message.get("headers", []))
+                headers.append((
+                    b"server-timing",
+                    f"{stats.server_timing()}, app;dur={app_ms:.2f}".encode("latin-1"),
+                ))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            report(scope, stats)
+
+
+def report(scope, stats: RequestSQLStats):
+    """Log a warning for requests over the query budget or with repeated statements"""
+    route = f'{scope.get("method")} {scope.get("path")}'
+    if stats.count > SQL_WARN_QUERY_COUNT or stats.duration * 1000 > SQL_WARN_TIME_MS:
+        logger.warning(
+            "%s issued %d queries taking %.1f ms", route, stats.count, stats.duration * 1000
+        )
+    for sql, n in stats.repeated():
+        logger.warning("Possible N+1 in %s: statement ran %d times: %s", route, n, sql)
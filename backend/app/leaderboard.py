@@ -0,0 +1,271 @@
+"""
+In-memory "top rated" leaderboards.
+
+Movies are ranked by a Bayesian average, which pulls movies with few
+ratings toward the mean of all ratings:
+
+    score = (ratings_sum + m * C) / (ratings_count + m)
+
+where C is the mean rating across the catalogue and m is
+LEADERBOARD_PRIOR_VOTES. A movie needs at least LEADERBOARD_MIN_RATINGS
+ratings to be ranked at all.
+
+One board is kept for the whole catalogue and one per genre (compared
+case-insensitively). Each board holds the best LEADERBOARD_SIZE movies plus
+as many runners-up, so a leader that drops out can be replaced without a
+query. A full rebuild streams the rated movies once, keeping only bounded
+heaps. After that, each rating written through the API re-scores its movie
+in place, and requests are answered from the boards without touching the
+database. Incremental updates keep C fixed; rebuilds refresh it and the
+runners-up. A rebuild happens on the first request, after
+LEADERBOARD_REBUILD_SECONDS, and after writes the boards cannot follow
+(ORM rating writes, movie edits and deletes, the reconciliation job).
+Rows carry movies.version, which the rating triggers bump, so a late or
+replayed update never overwrites a newer score. Boards are per process, so another worker's ratings show up at its next
+rebuild.
+"""
+import heapq
+import os
+import threading
+import time
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from app.models.movie import Movie
+
+LEADERBOARD_SIZE = int(os.getenv("LEADERBOARD_SIZE", "100"))
+LEADERBOARD_PRIOR_VOTES = float(os.getenv("LEADERBOARD_PRIOR_VOTES", "10"))
+LEADERBOARD_MIN_RATINGS = max(1, int(os.getenv("LEADERBOARD_MIN_RATINGS", "1")))
+LEADERBOARD_REBUILD_SECONDS = float(os.getenv("LEADERBOARD_REBUILD_SECONDS", "600"))
+
+# Columns a board entry is built from, in the order rows are read
+LEADERBOARD_COLUMNS = (
+    Movie.id, Movie.title, Movie.genre, Movie.release_year, Movie.ratings_count, Movie.ratings_sum, Movie.version,
+)
+
+
+def genre_key(genre: str):
+    return genre.strip().lower() if genre else None
+
+
+class Board:
+    """Top movies of one board, with runners-up, and its ranked snapshot"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.capacity = 2 * size
+        self.entries = {}
+        self.ranked = ()
+
+    def load(self, entries):
+        self.entries = {entry["id"]: entry for entry in entries}
+        self.rank()
+
+    def put(self, entry: dict):
+        """Insert or re-score a movie; False when it does not make the board"""
+        if entry["id"] not in self.entries and len(self.entries) >= self.capacity:
+            lowest = min(self.entries.values(), key=rank_key, default=None)
+            if lowest is None or rank_key(entry) <= rank_key(lowest):
+                return False
+            del self.entries[lowest["id"]]
+        self.entries[entry["id"]] = entry
+        self.rank()
+        return True
+
+    def discard(self, movie_id: int):
+        if self.entries.pop(movie_id, None) is not None:
+            self.rank()
+
+    def rank(self):
+        self.ranked = tuple(sorted(self.entries.values(), key=rank_key, reverse=True)[:self.size])
+
+
+def rank_key(entry: dict) -> tuple:
+    # Higher score first; more ratings, then the older id, break ties
+    return entry["score"], entry["ratings_count"], -entry["id"]
+
+
+class Leaderboard:
+    """Global and per-genre boards kept up to date from rating writes"""
+
+    def __init__(
+        self,
+        size: int = LEADERBOARD_SIZE,
+        prior_votes: float = LEADERBOARD_PRIOR_VOTES,
+        min_ratings: int = LEADERBOARD_MIN_RATINGS,
+        rebuild_seconds: float = LEADERBOARD_REBUILD_SECONDS,
+    ):
+        self.size = size
+        self.prior_votes = prior_votes
+        self.min_ratings = min_ratings
+        self.rebuild_seconds = rebuild_seconds
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.boards = {}
+            self.mean = 0.0
+            self.built_at = None
+            self.stale = False
+            self.stale_marks = 0
+            self.genres = {}
+            self.versions = {}
+            self._rebuilding = None
+            self.rebuilds = 0
+            self.updates = 0
+
+    @property
+    def active(self) -> bool:
+        """Whether rating writes need to be reported (a board exists or is being built)"""
+        return self.built_at is not None or self._rebuilding is not None
+
+    def needs_rebuild(self) -> bool:
+        if self.built_at is None or self.stale:
+            return True
+        return self.rebuild_seconds > 0 and time.monotonic() - self.built_at > self.rebuild_seconds
+
+    def mark_stale(self):
+        with self._lock:
+            self.stale = True
+            self.stale_marks += 1
+
+    def entry(self, row, mean: float):
+        """Board entry for a LEADERBOARD_COLUMNS row"""
+        movie_id, title, genre, release_year, count, total, _ = row
+        count, total = count or 0, total or 0
+        if count < self.min_ratings:
+            return None
+        return {
+            "id": movie_id,
+            "title": title,
+            "genre": genre,
+            "release_year": release_year,
+            "ratings_count": count,
+            "ratings_avg": round(total / count, 2),
+            "score": round((total + self.prior_votes * mean) / (count + self.prior_votes), 4),
+        }
+
+    def rebuild(self, db: Session):
+        """Rebuild every board from one streamed pass over the rated movies"""
+        with self._lock:
+            self._rebuilding = {}
+            # Writes marked stale after this point may be missing from the pass
+            marks = self.stale_marks
+        try:
+            total, count = db.execute(select(func.sum(Movie.ratings_sum), func.sum(Movie.ratings_count))).one()
+            mean = (total or 0) / count if count else 0.0
+            heaps = {}
+            genres = {}
+            versions = {}
+            rows = db.execute(
+                select(*LEADERBOARD_COLUMNS)
+                .where(Movie.ratings_count >= self.min_ratings)
+                .execution_options(yield_per=1000)
+            )
+            for row in rows:
+                entry = self.entry(row, mean)
+                for key in (None, genre_key(entry["genre"])):
+                    heap = heaps.setdefault(key, [])
+                    item = (rank_key(entry), entry["id"], entry)
+                    if len(heap) < 2 * self.size:
+                        heapq.heappush(heap, item)
+                    elif item > heap[0]:
+                        heapq.heapreplace(heap, item)
+                genres[entry["id"]] = genre_key(entry["genre"])
+                versions[entry["id"]] = row.version
+        except BaseException:
+            with self._lock:
+                self._rebuilding = None
+            raise
+
+        boards = {}
+        for key, heap in heaps.items():
+            boards[key] = Board(self.size)
+            boards[key].load(entry for _, _, entry in heap)
+        with self._lock:
+            # Ratings written while the pass ran may be missing from it
+            pending, self._rebuilding = self._rebuilding, None
+            self.boards, self.mean, self.genres, self.versions = boards, mean, genres, versions
+            self.built_at = time.monotonic()
+            self.stale = self.stale_marks != marks
+            self.rebuilds += 1
+            for row in pending.values():
+                self._apply(row)
+
+    def update(self, row):
+        """Re-score one movie after a rating write, from its fresh LEADERBOARD_COLUMNS row"""
+        with self._lock:
+            if self._rebuilding is not None:
+                held = self._rebuilding.get(row[0])
+                if held is None or held[-1] < row[-1]:
+                    self._rebuilding[row[0]] = row
+            if self.built_at is not None and self._apply(row):
+                self.updates += 1
+
+    def _apply(self, row):
+        movie_id, version = row[0], row[-1]
+        if version <= self.versions.get(movie_id, 0):
+            # An older (or already applied) state of the movie
+            return False
+        self.versions[movie_id] = version
+        entry = self.entry(row, self.mean)
+        previous = self.genres.get(movie_id)
+        for key in {None, previous}:
+            if key in self.boards:
+                self.boards[key].discard(movie_id)
+        if entry is None:
+            self.genres.pop(movie_id, None)
+            return True
+        key = genre_key(entry["genre"])
+        self.genres[movie_id] = key
+        self.boards.setdefault(None, Board(self.size)).put(entry)
+        self.boards.setdefault(key, Board(self.size)).put(entry)
+        return True
+
+    def top(self, genre: str = None, limit: int = None) -> list:
+        board = self.boards.get(genre_key(genre))
+        if board is None:
+            return []
+        return list(board.ranked[:limit])
+
+    def stats(self) -> dict:
+        return {
+            "boards": len(self.boards),
+            "size": self.size,
+            "prior_votes": self.prior_votes,
+            "mean_rating": round(self.mean, 4),
+            "age_seconds": round(time.monotonic() - self.built_at, 1) if self.built_at is not None else None,
+            "rebuilds": self.rebuilds,
+            "updates": self.updates,
+        }
+
+
+leaderboard = Leaderboard()
+
+
+def leaderboard_row(db: Session, movie_id: int):
+    """The LEADERBOARD_COLUMNS row of one movie, read inside the current transaction"""
+    return db.execute(select(*LEADERBOARD_COLUMNS).where(Movie.id == movie_id)).first()
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_leaderboard_changes(session, flush_context):
+    # ORM writes carry no fresh aggregates; have the next request rebuild
+    changed = list(session.deleted) + list(session.dirty) + [
+        instance for instance in session.new if getattr(instance, "__tablename__", None) == "ratings"
+    ]
+    if any(getattr(instance, "__tablename__", None) in ("movies", "ratings") for instance in changed):
+        session.info["leaderboard_stale"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_leaderboard_changes(session):
+    if session.info.pop("leaderboard_stale", False):
+        leaderboard.mark_stale()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_leaderboard_changes(session):
+    session.info.pop("leaderboard_stale", None)
@@ -1,14 +1,23 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import ValidationError
+from sqlalchemy.exc import OperationalError
 
-from app.database import engine, Base
-from app.models import user, movie, rating
-from app.api.endpoints import auth, movies, ratings
+from app.database import engine, Base, is_statement_timeout
+from app.models import user, movie, rating, row_count
+from app.api.endpoints import auth, movies, ratings, internal, export
+from app.auth.hashing import HashingSaturated, password_hasher
+from app.auth.dependencies import internal_token_valid, require_internal_access
+from app.compression import CompressionMiddleware
+from app.instrumentation import SQLInstrumentationMiddleware
+from app.metrics import MetricsMiddleware, render_metrics
+from app.profiling import ProfilingMiddleware
+from app.slow_queries import SLOW_QUERY_DUMP_PATH, slow_query_log
 
 import os
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
 
@@ -21,10 +30,19 @@ user.Base.metadata.create_all(bind=engine)
 movie.Base.metadata.create_all(bind=engine)
 rating.Base.metadata.create_all(bind=engine)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    password_hasher.shutdown()
+    if SLOW_QUERY_DUMP_PATH:
+        slow_query_log.dump(SLOW_QUERY_DUMP_PATH)
+    slow_query_log.shutdown()
+
 app = FastAPI(
     title="Movie Rating Platform",
     description="A platform for users to add and rate movies",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Define allowed origins (your frontend URL)
@@ -40,8 +58,18 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],             # Allow all HTTP methods
     allow_headers=["*"],             # Allow all headers
+    expose_headers=["Server-Timing"],
 )
 
+# Opt-in cProfile / stack sampling of single requests (REQUEST_PROFILING)
+app.add_middleware(ProfilingMiddleware, authorize=internal_token_valid)
+# Per-request query count and SQL time in Server-Timing, N+1 warnings in the log
+app.add_middleware(SQLInstrumentationMiddleware)
+# gzip / brotli by Accept-Encoding, above everything that writes the body
+app.add_middleware(CompressionMiddleware)
+# Outermost, so latency covers everything above the socket
+app.add_middleware(MetricsMiddleware)
+
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request, exc):
     """Custom validation error handler"""
@@ -62,6 +90,37 @@ async def validation_exception_handler(request, exc):
         }
     )
 
+@app.exception_handler(HashingSaturated)
+async def hashing_saturated_handler(request, exc):
+    """Shed login/registration load instead of queueing behind bcrypt"""
+    return JSONResponse(
+        status_code=503,
+        content={
+            "detail": "Authentication service is busy, please retry shortly",
+            "error_type": "overloaded"
+        },
+        headers={"Retry-After": "1"}
+    )
+
+@app.exception_handler(OperationalError)
+async def database_error_handler(request, exc):
+    """Report statement timeouts as retryable instead of a bare 500"""
+    if is_statement_timeout(exc):
+        return JSONResponse(
+            status_code=503,
+            content={
+                "detail": "Database query timed out",
+                "error_type": "statement_timeout"
+            }
+        )
+    return JSONResponse(
+        status_code=500,
+        content={
+            "detail": "Internal server error",
+            "error_type": "database_error"
+        }
+    )
+
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
     """Custom HTTP exception handler"""
@@ -77,6 +136,8 @@ async def http_exception_handler(request, exc):
 app.include_router(auth.router)
 app.include_router(movies.router)
 app.include_router(ratings.router)
+app.include_router(internal.router)
+app.include_router(export.router)
 
 @app.get("/")
 def read_root():
@@ -86,6 +147,11 @@ def read_root():
 def health_check():
     return {"status": "healthy", "database": "postgresql" if os.getenv("USE_SQLITE", "false").lower() == "false" else "sqlite"}
 
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(require_internal_access)])
+def metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
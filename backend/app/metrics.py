@@ -0,0 +1,253 @@
+"""
+In-process Prometheus metrics.
+
+Writes never take a lock: each thread updates its own shard, and a scrape
+sums the shards. Request metrics are labelled by route template so
+`/api/movies/1` and `/api/movies/2` share a series. Pool, password hashing
+and cache figures are read from their existing stats at scrape time.
+"""
+import bisect
+import threading
+import time
+
+from app.auth.cache import principal_cache
+from app.auth.hashing import password_hasher
+from app.database import pool_metrics, serving_pool
+from app.leaderboard import leaderboard
+from app.read_cache import read_cache
+from app.single_flight import single_flight
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Shard:
+    def __init__(self):
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+
+
+class MetricsRegistry:
+    """Counters, gauges and histograms keyed by (name, labels), sharded per thread"""
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            # Only shard creation is locked; a thread's shard is written by that thread alone
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def inc(self, name: str, labels: tuple = (), value: float = 1):
+        counters = self._shard().counters
+        key = (name, labels)
+        counters[key] = counters.get(key, 0) + value
+
+    def add_gauge(self, name: str, labels: tuple = (), value: float = 1):
+        gauges = self._shard().gauges
+        key = (name, labels)
+        gauges[key] = gauges.get(key, 0) + value
+
+    def observe(self, name: str, labels: tuple, value: float):
+        histograms = self._shard().histograms
+        key = (name, labels)
+        series = histograms.get(key)
+        if series is None:
+            # Per-bucket counts (not cumulative), then +Inf, sum
+            series = histograms[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def collect(self) -> tuple[dict, dict, dict]:
+        """Sum every shard; dict() and list() copies are atomic under the GIL"""
+        counters, gauges, histograms = {}, {}, {}
+        with self._shards_lock:
+            shards = list(self._shards)
+        for shard in shards:
+            for key, value in dict(shard.counters).items():
+                counters[key] = counters.get(key, 0) + value
+            for key, value in dict(shard.gauges).items():
+                gauges[key] = gauges.get(key, 0) + value
+            for key, series in dict(shard.histograms).items():
+                series = list(series)
+                total = histograms.setdefault(key, [0] * len(series[:-1]) + [0.0])
+                for i, value in enumerate(series):
+                    total[i] += value
+        return counters, gauges, histograms
+
+    def clear(self):
+        with self._shards_lock:
+            for shard in self._shards:
+                shard.counters.clear()
+                shard.gauges.clear()
+                shard.histograms.clear()
+
+
+registry = MetricsRegistry()
+
+REQUEST_LABELS = ("method", "route")
+HELP = {
+    "http_requests_total": ("counter", "HTTP requests by route template and status code"),
+    "http_request_duration_seconds": ("histogram", "HTTP request latency by route template"),
+    "http_requests_in_progress": ("gauge", "HTTP requests currently being served"),
+}
+
+
+def route_template(scope) -> str:
+    route = scope.get("route")
+    # Unmatched paths share one label so scanners cannot blow up cardinality
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status and in-flight requests per route"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        # The route is only known after routing; count in-flight by method until then
+        registry.add_gauge("http_requests_in_progress", (method,), 1)
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            registry.add_gauge("http_requests_in_progress", (method,), -1)
+            labels = (method, route_template(scope))
+            registry.observe("http_request_duration_seconds", labels, time.perf_counter() - start)
+            registry.inc("http_requests_total", labels + (str(status_code),))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_float(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+LABEL_NAMES = {
+    "http_requests_total": REQUEST_LABELS + ("status",),
+    "http_request_duration_seconds": REQUEST_LABELS,
+    "http_requests_in_progress": ("method",),
+}
+
+
+def process_gauges() -> list[tuple[str, str, str, float]]:
+    """(name, type, help, value) read from the pool, hashing pool, principal and read caches"""
+    pool = pool_metrics.snapshot(serving_pool())
+    hashing = password_hasher.stats()
+    principals = principal_cache.stats()
+    samples = [
+        ("db_pool_checkouts_total", "counter", "Connections checked out of the pool", pool["checkouts"]),
+        ("db_pool_timeouts_total", "counter", "Checkouts that timed out waiting for a connection", pool["timeouts"]),
+        ("db_pool_wait_seconds_total", "counter", "Time spent waiting for a pool connection", pool["wait_total_ms"] / 1000),
+        ("db_pool_invalidations_total", "counter", "Pooled connections invalidated", pool["invalidations"]),
+        ("password_hash_in_flight", "gauge", "Password hashing jobs running or queued", hashing["in_flight"]),
+        ("password_hash_queue_depth", "gauge", "Password hashing jobs waiting for a worker", hashing["queue_depth"]),
+        ("password_hash_capacity", "gauge", "Password hashing workers plus queue slots", hashing["capacity"]),
+        ("password_hash_completed_total", "counter", "Password hashing jobs completed", hashing["completed"]),
+        ("password_hash_rejected_total", "counter", "Password hashing jobs shed at capacity", hashing["rejected"]),
+        ("password_hash_failed_total", "counter", "Password hashing jobs that raised", hashing["failed"]),
+        ("password_hash_latency_avg_seconds", "gauge", "Mean password hashing latency", hashing["latency_avg_ms"] / 1000),
+        ("principal_cache_hits_total", "counter", "Principal cache hits", principals["hits"]),
+        ("principal_cache_misses_total", "counter", "Principal cache misses", principals["misses"]),
+        ("principal_cache_size", "gauge", "Cached principals", principals["size"]),
+    ]
+    flights = single_flight.stats()
+    samples += [
+        ("single_flight_leaders_total", "counter", "Reads executed on behalf of coalesced requests", flights["leaders"]),
+        ("single_flight_coalesced_total", "counter", "Requests served by another request's read", flights["coalesced"]),
+        ("single_flight_timeouts_total", "counter", "Coalesced requests that gave up waiting and read themselves", flights["timeouts"]),
+    ]
+    boards = leaderboard.stats()
+    samples += [
+        ("leaderboard_rebuilds_total", "counter", "Full leaderboard rebuilds", boards["rebuilds"]),
+        ("leaderboard_updates_total", "counter", "Movies re-scored in place after a rating", boards["updates"]),
+    ]
+    cache = read_cache.stats()
+    for key, name, kind, help_text in (
+        ("hits", "read_cache_hits_total", "counter", "Read cache hits"),
+        ("misses", "read_cache_misses_total", "counter", "Read cache misses"),
+        ("evictions", "read_cache_evictions_total", "counter", "Read cache entries evicted at capacity"),
+        ("expirations", "read_cache_expirations_total", "counter", "Read cache entries dropped after their TTL"),
+        ("invalidations", "read_cache_invalidations_total", "counter", "Read cache entries dropped by writes"),
+        ("size", "read_cache_size", "gauge", "Cached read responses"),
+    ):
+        if key in cache:
+            samples.append((name, kind, help_text, cache[key]))
+    for key, name, help_text in (
+        ("size", "db_pool_size", "Configured pool size"),
+        ("checked_out", "db_pool_checked_out", "Connections currently checked out"),
+        ("checked_in", "db_pool_checked_in", "Idle connections in the pool"),
+        ("overflow", "db_pool_overflow", "Overflow connections in use"),
+    ):
+        if key in pool:
+            samples.append((name, "gauge", help_text, pool[key]))
+    return samples
+
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+    counters, gauges, histograms = registry.collect()
+    lines = []
+
+    def header(name):
+        kind, help_text = HELP[name]
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    for samples in (counters, gauges):
+        for name in sorted({name for name, _ in samples}):
+            header(name)
+            for (series, labels), value in sorted(samples.items()):
+                if series == name:
+                    lines.append(f"{name}{_labels(LABEL_NAMES[name], labels)} {_format_float(value)}")
+
+    for name in sorted({name for name, _ in histograms}):
+        header(name)
+        for (series, labels), values in sorted(histograms.items()):
+            if series != name:
+                continue
+            label_names = LABEL_NAMES[name]
+            cumulative = 0
+            for bound, count in zip(registry.buckets + ("+Inf",), values[:-1]):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{name}_bucket{_labels(label_names, labels, le)} {cumulative}")
+            lines.append(f"{name}_sum{_labels(label_names, labels)} {_format_float(values[-1])}")
+            lines.append(f"{name}_count{_labels(label_names, labels)} {cumulative}")
+
+    for name, kind, help_text, value in process_gauges():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.append(f"{name} {_format_float(value)}")
+
+    return "\n".join(lines) + "\n"
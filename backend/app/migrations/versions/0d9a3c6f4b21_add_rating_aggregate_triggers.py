@@ -0,0 +1,72 @@
+"""add rating aggregate triggers
+
+Revision ID: 0d9a3c6f4b21
+Revises: f2b6d84e1c57
+Create Date: 2026-10-18 14:02:51.774610
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0d9a3c6f4b21'
+down_revision: Union[str, None] = 'f2b6d84e1c57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def movie_delta_sql(movie_id, sum_delta, count_delta, float_type):
+    new_sum = f"COALESCE(ratings_sum, 0) + {sum_delta}"
+    new_count = f"COALESCE(ratings_count, 0) + {count_delta}"
+    return (
+        f"UPDATE movies SET ratings_sum = {new_sum}, ratings_count = {new_count}, "
+        f"ratings_avg = CASE WHEN {new_count} > 0 "
+        f"THEN CAST({new_sum} AS {float_type}) / ({new_count}) ELSE 0.0 END "
+        f"WHERE id = {movie_id}"
+    )
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.execute(
+            "CREATE OR REPLACE FUNCTION ratings_aggregate() RETURNS trigger AS $$ BEGIN "
+            "IF TG_OP IN ('UPDATE', 'DELETE') THEN "
+            + movie_delta_sql("OLD.movie_id", "-OLD.rating", "-1", "double precision") + "; "
+            "END IF; "
+            "IF TG_OP IN ('INSERT', 'UPDATE') THEN "
+            + movie_delta_sql("NEW.movie_id", "NEW.rating", "1", "double precision") + "; "
+            "END IF; "
+            "RETURN NULL; END $$ LANGUAGE plpgsql"
+        )
+        op.execute(
+            "CREATE TRIGGER ratings_aggregate AFTER INSERT OR UPDATE OF rating, movie_id OR DELETE ON ratings "
+            "FOR EACH ROW EXECUTE FUNCTION ratings_aggregate()"
+        )
+
+    elif dialect == 'sqlite':
+        op.execute(
+            "CREATE TRIGGER ratings_aggregate_insert AFTER INSERT ON ratings BEGIN "
+            + movie_delta_sql("new.movie_id", "new.rating", "1", "REAL") + "; END"
+        )
+        op.execute(
+            "CREATE TRIGGER ratings_aggregate_update AFTER UPDATE OF rating ON ratings BEGIN "
+            + movie_delta_sql("new.movie_id", "new.rating - old.rating", "0", "REAL") + "; END"
+        )
+        op.execute(
+            "CREATE TRIGGER ratings_aggregate_delete AFTER DELETE ON ratings BEGIN "
+            + movie_delta_sql("old.movie_id", "-old.rating", "-1", "REAL") + "; END"
+        )
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.execute("DROP TRIGGER IF EXISTS ratings_aggregate ON ratings")
+        op.execute("DROP FUNCTION IF EXISTS ratings_aggregate()")
+
+    elif dialect == 'sqlite':
+        for trigger in ('ratings_aggregate_insert', 'ratings_aggregate_update', 'ratings_aggregate_delete'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
@@ -0,0 +1,30 @@
+"""default movies.updated_at on insert
+
+Revision ID: 9e3b5a7c1d42
+Revises: d4a8c1f7e259
+Create Date: 2026-10-18 23:12:44.381207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e3b5a7c1d42'
+down_revision: Union[str, None] = 'd4a8c1f7e259'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade():
+    # Rows inserted since b7d2e94a1f36 may have been left without a timestamp
+    op.execute("UPDATE movies SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP) WHERE updated_at IS NULL")
+    if op.get_bind().dialect.name == 'postgresql':
+        op.alter_column('movies', 'updated_at', server_default=sa.func.now())
+    # SQLite cannot change a column default without rebuilding the table (and
+    # the counter and search triggers on it); the model sets updated_at on insert
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.alter_column('movies', 'updated_at', server_default=None)
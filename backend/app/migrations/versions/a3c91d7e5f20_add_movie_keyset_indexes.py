@@ -0,0 +1,27 @@
+"""add movie keyset pagination indexes
+
+Revision ID: a3c91d7e5f20
+Revises: 6b0f65269604
+Create Date: 2026-10-18 09:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c91d7e5f20'
+down_revision: Union[str, None] = '6b0f65269604'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade():
+    # (sort key, id) pairs let cursor pages seek straight to their start row
+    op.create_index('ix_movies_title_id', 'movies', ['title', 'id'], unique=False)
+    op.create_index('ix_movies_release_year_id', 'movies', ['release_year', 'id'], unique=False)
+
+def downgrade():
+    op.drop_index('ix_movies_release_year_id', table_name='movies')
+    op.drop_index('ix_movies_title_id', table_name='movies')
@@ -0,0 +1,77 @@
+"""add movies.version and movies.updated_at
+
+Revision ID: b7d2e94a1f36
+Revises: 0d9a3c6f4b21
+Create Date: 2026-10-18 21:17:40.318052
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d2e94a1f36'
+down_revision: Union[str, None] = '0d9a3c6f4b21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def movie_delta_sql(movie_id, sum_delta, count_delta, float_type, bump_version=True):
+    new_sum = f"COALESCE(ratings_sum, 0) + {sum_delta}"
+    new_count = f"COALESCE(ratings_count, 0) + {count_delta}"
+    version = ", version = version + 1, updated_at = CURRENT_TIMESTAMP" if bump_version else ""
+    return (
+        f"UPDATE movies SET ratings_sum = {new_sum}, ratings_count = {new_count}, "
+        f"ratings_avg = CASE WHEN {new_count} > 0 "
+        f"THEN CAST({new_sum} AS {float_type}) / ({new_count}) ELSE 0.0 END{version} "
+        f"WHERE id = {movie_id}"
+    )
+
+def create_triggers(dialect, bump_version):
+    if dialect == 'postgresql':
+        columns = "rating, review, movie_id" if bump_version else "rating, movie_id"
+        op.execute(
+            "CREATE OR REPLACE FUNCTION ratings_aggregate() RETURNS trigger AS $$ BEGIN "
+            "IF TG_OP IN ('UPDATE', 'DELETE') THEN "
+            + movie_delta_sql("OLD.movie_id", "-OLD.rating", "-1", "double precision", bump_version) + "; "
+            "END IF; "
+            "IF TG_OP IN ('INSERT', 'UPDATE') THEN "
+            + movie_delta_sql("NEW.movie_id", "NEW.rating", "1", "double precision", bump_version) + "; "
+            "END IF; "
+            "RETURN NULL; END $$ LANGUAGE plpgsql"
+        )
+        op.execute("DROP TRIGGER IF EXISTS ratings_aggregate ON ratings")
+        op.execute(
+            f"CREATE TRIGGER ratings_aggregate AFTER INSERT OR UPDATE OF {columns} OR DELETE ON ratings "
+            "FOR EACH ROW EXECUTE FUNCTION ratings_aggregate()"
+        )
+
+    elif dialect == 'sqlite':
+        columns = "rating, review" if bump_version else "rating"
+        for trigger in ('ratings_aggregate_insert', 'ratings_aggregate_update', 'ratings_aggregate_delete'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute(
+            "CREATE TRIGGER ratings_aggregate_insert AFTER INSERT ON ratings BEGIN "
+            + movie_delta_sql("new.movie_id", "new.rating", "1", "REAL", bump_version) + "; END"
+        )
+        op.execute(
+            f"CREATE TRIGGER ratings_aggregate_update AFTER UPDATE OF {columns} ON ratings BEGIN "
+            + movie_delta_sql("new.movie_id", "new.rating - old.rating", "0", "REAL", bump_version) + "; END"
+        )
+        op.execute(
+            "CREATE TRIGGER ratings_aggregate_delete AFTER DELETE ON ratings BEGIN "
+            + movie_delta_sql("old.movie_id", "-old.rating", "-1", "REAL", bump_version) + "; END"
+        )
+
+def upgrade():
+    op.add_column('movies', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    # SQLite cannot add a column with a non-constant default; backfill instead
+    op.add_column('movies', sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True))
+    op.execute("UPDATE movies SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP)")
+    create_triggers(op.get_bind().dialect.name, bump_version=True)
+
+def downgrade():
+    create_triggers(op.get_bind().dialect.name, bump_version=False)
+    op.drop_column('movies', 'updated_at')
+    op.drop_column('movies', 'version')
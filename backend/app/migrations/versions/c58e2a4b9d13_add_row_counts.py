@@ -0,0 +1,52 @@
+"""add row_counts table and sqlite counter triggers
+
+Revision ID: c58e2a4b9d13
+Revises: a3c91d7e5f20
+Create Date: 2026-10-18 10:04:27.552810
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c58e2a4b9d13'
+down_revision: Union[str, None] = 'a3c91d7e5f20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COUNTED_TABLES = ('movies', 'ratings')
+
+def upgrade():
+    op.create_table('row_counts',
+        sa.Column('table_name', sa.String(), nullable=False),
+        sa.Column('row_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('table_name')
+    )
+
+    # PostgreSQL estimates from pg_class statistics; only SQLite needs counters
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    for table in COUNTED_TABLES:
+        op.execute(
+            f"INSERT INTO row_counts (table_name, row_count) SELECT '{table}', COUNT(*) FROM {table}"
+        )
+        op.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_count_insert AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO row_counts (table_name, row_count) VALUES ('{table}', 1) "
+            f"ON CONFLICT (table_name) DO UPDATE SET row_count = row_count + 1; END"
+        )
+        op.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_count_delete AFTER DELETE ON {table} BEGIN "
+            f"UPDATE row_counts SET row_count = row_count - 1 WHERE table_name = '{table}'; END"
+        )
+
+def downgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        for table in COUNTED_TABLES:
+            op.execute(f"DROP TRIGGER IF EXISTS {table}_count_insert")
+            op.execute(f"DROP TRIGGER IF EXISTS {table}_count_delete")
+    op.drop_table('row_counts')
@@ -0,0 +1,92 @@
+"""add movies.ratings_1 .. ratings_5 star histogram
+
+Revision ID: d4a8c1f7e259
+Revises: b7d2e94a1f36
+Create Date: 2026-10-18 22:05:12.640981
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4a8c1f7e259'
+down_revision: Union[str, None] = 'b7d2e94a1f36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+STARS = (1, 2, 3, 4, 5)
+
+def star_delta_sql(added=None, removed=None):
+    clauses = []
+    for star in STARS:
+        delta = "".join(
+            f" {sign} CASE WHEN {rating} = {star} THEN 1 ELSE 0 END"
+            for sign, rating in (("+", added), ("-", removed)) if rating
+        )
+        clauses.append(f"ratings_{star} = COALESCE(ratings_{star}, 0){delta}")
+    return ", ".join(clauses)
+
+def movie_delta_sql(movie_id, sum_delta, count_delta, float_type, histogram, added=None, removed=None):
+    new_sum = f"COALESCE(ratings_sum, 0) + {sum_delta}"
+    new_count = f"COALESCE(ratings_count, 0) + {count_delta}"
+    stars = f"{star_delta_sql(added, removed)}, " if histogram else ""
+    return (
+        f"UPDATE movies SET ratings_sum = {new_sum}, ratings_count = {new_count}, "
+        f"ratings_avg = CASE WHEN {new_count} > 0 "
+        f"THEN CAST({new_sum} AS {float_type}) / ({new_count}) ELSE 0.0 END, "
+        f"{stars}version = version + 1, updated_at = CURRENT_TIMESTAMP "
+        f"WHERE id = {movie_id}"
+    )
+
+def create_triggers(dialect, histogram):
+    if dialect == 'postgresql':
+        op.execute(
+            "CREATE OR REPLACE FUNCTION ratings_aggregate() RETURNS trigger AS $$ BEGIN "
+            "IF TG_OP IN ('UPDATE', 'DELETE') THEN "
+            + movie_delta_sql("OLD.movie_id", "-OLD.rating", "-1", "double precision", histogram, removed="OLD.rating") + "; "
+            "END IF; "
+            "IF TG_OP IN ('INSERT', 'UPDATE') THEN "
+            + movie_delta_sql("NEW.movie_id", "NEW.rating", "1", "double precision", histogram, added="NEW.rating") + "; "
+            "END IF; "
+            "RETURN NULL; END $$ LANGUAGE plpgsql"
+        )
+
+    elif dialect == 'sqlite':
+        for trigger in ('ratings_aggregate_insert', 'ratings_aggregate_update', 'ratings_aggregate_delete'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute(
+            "CREATE TRIGGER ratings_aggregate_insert AFTER INSERT ON ratings BEGIN "
+            + movie_delta_sql("new.movie_id", "new.rating", "1", "REAL", histogram, added="new.rating") + "; END"
+        )
+        op.execute(
+            "CREATE TRIGGER ratings_aggregate_update AFTER UPDATE OF rating, review ON ratings BEGIN "
+            + movie_delta_sql(
+                "new.movie_id", "new.rating - old.rating", "0", "REAL", histogram,
+                added="new.rating", removed="old.rating"
+            ) + "; END"
+        )
+        op.execute(
+            "CREATE TRIGGER ratings_aggregate_delete AFTER DELETE ON ratings BEGIN "
+            + movie_delta_sql("old.movie_id", "-old.rating", "-1", "REAL", histogram, removed="old.rating") + "; END"
+        )
+
+def upgrade():
+    for star in STARS:
+        op.add_column('movies', sa.Column(f'ratings_{star}', sa.Integer(), server_default='0', nullable=True))
+    # Backfill from ratings before the triggers start moving the counters
+    op.execute(
+        "UPDATE movies SET " + ", ".join(
+            f"ratings_{star} = (SELECT COUNT(id) FROM ratings "
+            f"WHERE ratings.movie_id = movies.id AND ratings.rating = {star})"
+            for star in STARS
+        )
+    )
+    create_triggers(op.get_bind().dialect.name, histogram=True)
+
+def downgrade():
+    create_triggers(op.get_bind().dialect.name, histogram=False)
+    for star in STARS:
+        op.drop_column('movies', f'ratings_{star}')
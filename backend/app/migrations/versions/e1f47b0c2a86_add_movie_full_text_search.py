@@ -0,0 +1,66 @@
+"""add movie full-text search
+
+Revision ID: e1f47b0c2a86
+Revises: c58e2a4b9d13
+Create Date: 2026-10-18 11:26:03.907415
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1f47b0c2a86'
+down_revision: Union[str, None] = 'c58e2a4b9d13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        # A stored generated column is computed for existing rows on creation
+        op.execute(
+            "ALTER TABLE movies ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(description, '')), 'B')) STORED"
+        )
+        op.execute("CREATE INDEX ix_movies_search_vector ON movies USING gin (search_vector)")
+
+    elif dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE movies_fts USING fts5("
+            "title, description, content='movies', content_rowid='id', tokenize='porter unicode61')"
+        )
+        op.execute("INSERT INTO movies_fts (movies_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0)')")
+        op.execute(
+            "CREATE TRIGGER movies_fts_insert AFTER INSERT ON movies BEGIN "
+            "INSERT INTO movies_fts (rowid, title, description) VALUES (new.id, new.title, new.description); END"
+        )
+        op.execute(
+            "CREATE TRIGGER movies_fts_delete AFTER DELETE ON movies BEGIN "
+            "INSERT INTO movies_fts (movies_fts, rowid, title, description) "
+            "VALUES ('delete', old.id, old.title, old.description); END"
+        )
+        op.execute(
+            "CREATE TRIGGER movies_fts_update AFTER UPDATE OF title, description ON movies BEGIN "
+            "INSERT INTO movies_fts (movies_fts, rowid, title, description) "
+            "VALUES ('delete', old.id, old.title, old.description); "
+            "INSERT INTO movies_fts (rowid, title, description) VALUES (new.id, new.title, new.description); END"
+        )
+        # Backfill the index from the existing movies rows
+        op.execute("INSERT INTO movies_fts (movies_fts) VALUES ('rebuild')")
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_movies_search_vector")
+        op.execute("ALTER TABLE movies DROP COLUMN IF EXISTS search_vector")
+
+    elif dialect == 'sqlite':
+        for trigger in ('movies_fts_insert', 'movies_fts_delete', 'movies_fts_update'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS movies_fts")
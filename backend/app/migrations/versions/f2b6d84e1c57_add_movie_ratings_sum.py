@@ -0,0 +1,31 @@
+"""add movies.ratings_sum
+
+Revision ID: f2b6d84e1c57
+Revises: e1f47b0c2a86
+Create Date: 2026-10-18 12:40:15.021374
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b6d84e1c57'
+down_revision: Union[str, None] = 'e1f47b0c2a86'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade():
+    op.add_column('movies', sa.Column('ratings_sum', sa.Integer(), server_default='0', nullable=True))
+    # Backfill running totals and bring count/avg in line with them
+    op.execute(
+        "UPDATE movies SET "
+        "ratings_sum = COALESCE((SELECT SUM(rating) FROM ratings WHERE ratings.movie_id = movies.id), 0), "
+        "ratings_count = (SELECT COUNT(id) FROM ratings WHERE ratings.movie_id = movies.id), "
+        "ratings_avg = COALESCE((SELECT AVG(rating) FROM ratings WHERE ratings.movie_id = movies.id), 0.0)"
+    )
+
+def downgrade():
+    op.drop_column('movies', 'ratings_sum')
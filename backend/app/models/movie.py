@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Index, event
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -13,11 +13,33 @@ class Movie(Base):
     description = Column(String, nullable=True)
     created_by = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Bumped by every change to the movie or its ratings; backs ETags
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    # `default` too: databases migrated on SQLite have no server default for it
+    updated_at = Column(DateTime(timezone=True), default=func.now(), server_default=func.now(), onupdate=func.now())
     
     # Aggregated fields for performance
     ratings_count = Column(Integer, default=0)
     ratings_avg = Column(Float, default=0.0)
+    ratings_sum = Column(Integer, default=0)
+    # Star histogram: how many ratings gave 1..5 stars
+    ratings_1 = Column(Integer, default=0)
+    ratings_2 = Column(Integer, default=0)
+    ratings_3 = Column(Integer, default=0)
+    ratings_4 = Column(Integer, default=0)
+    ratings_5 = Column(Integer, default=0)
     
     # Relationships
     creator = relationship("User", back_populates="movies")
-    ratings = relationship("Rating", back_populates="movie")
\ No newline at end of file
+    ratings = relationship("Rating", back_populates="movie")
+    
+    # Composite (sort key, id) indexes back keyset pagination seeks
+    __table_args__ = (
+        Index("ix_movies_title_id", "title", "id"),
+        Index("ix_movies_release_year_id", "release_year", "id"),
+    )
+
+@event.listens_for(Movie, "before_update")
+def _bump_version(mapper, connection, target):
+    # Rating writes bump it from the aggregate triggers instead
+    target.version = Movie.version + 1
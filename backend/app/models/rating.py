@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, CheckConstraint
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, CheckConstraint, UniqueConstraint, DDL, event
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -21,8 +21,67 @@ class Rating(Base):
     # Ensure unique rating per user per movie
     __table_args__ = (
         CheckConstraint('rating >= 1 AND rating <= 5', name='rating_range'),
+        # Declared inline: appending to __table_args__ after the class is
+        # mapped never reaches the Table, so create_all() would skip it.
+        # It is also the conflict target of the rating upsert.
+        UniqueConstraint('movie_id', 'user_id', name='unique_user_movie_rating'),
     )
 
-# Add unique constraint separately to avoid issues with __table_args__
-from sqlalchemy import UniqueConstraint
-Rating.__table_args__ += (UniqueConstraint('movie_id', 'user_id', name='unique_user_movie_rating'),)
\ No newline at end of file
+# Keep movies' running rating aggregates in step with every rating write.
+# Triggers see OLD and NEW, so an upsert needs no extra read for the delta.
+# Every rating write also bumps the movie's version, which its ETags (and
+# those of its ratings pages) are derived from.
+STARS = (1, 2, 3, 4, 5)
+
+def star_delta_sql(added: str = None, removed: str = None) -> str:
+    """SET clauses moving the star histogram by one `added` and/or one `removed` rating"""
+    clauses = []
+    for star in STARS:
+        delta = "".join(
+            f" {sign} CASE WHEN {rating} = {star} THEN 1 ELSE 0 END"
+            for sign, rating in (("+", added), ("-", removed)) if rating
+        )
+        clauses.append(f"ratings_{star} = COALESCE(ratings_{star}, 0){delta}")
+    return ", ".join(clauses)
+
+def movie_delta_sql(
+    movie_id: str, sum_delta: str, count_delta: str, float_type: str, added: str = None, removed: str = None
+) -> str:
+    new_sum = f"COALESCE(ratings_sum, 0) + {sum_delta}"
+    new_count = f"COALESCE(ratings_count, 0) + {count_delta}"
+    return (
+        f"UPDATE movies SET ratings_sum = {new_sum}, ratings_count = {new_count}, "
+        f"ratings_avg = CASE WHEN {new_count} > 0 "
+        f"THEN CAST({new_sum} AS {float_type}) / ({new_count}) ELSE 0.0 END, "
+        f"{star_delta_sql(added, removed)}, "
+        f"version = version + 1, updated_at = CURRENT_TIMESTAMP "
+        f"WHERE id = {movie_id}"
+    )
+
+SQLITE_AGGREGATE_TRIGGERS = [
+    "CREATE TRIGGER IF NOT EXISTS ratings_aggregate_insert AFTER INSERT ON ratings BEGIN "
+    + movie_delta_sql("new.movie_id", "new.rating", "1", "REAL", added="new.rating") + "; END",
+    "CREATE TRIGGER IF NOT EXISTS ratings_aggregate_update AFTER UPDATE OF rating, review ON ratings BEGIN "
+    + movie_delta_sql("new.movie_id", "new.rating - old.rating", "0", "REAL", added="new.rating", removed="old.rating")
+    + "; END",
+    "CREATE TRIGGER IF NOT EXISTS ratings_aggregate_delete AFTER DELETE ON ratings BEGIN "
+    + movie_delta_sql("old.movie_id", "-old.rating", "-1", "REAL", removed="old.rating") + "; END",
+]
+
+POSTGRES_AGGREGATE_TRIGGERS = [
+    "CREATE OR REPLACE FUNCTION ratings_aggregate() RETURNS trigger AS $$ BEGIN "
+    "IF TG_OP IN ('UPDATE', 'DELETE') THEN "
+    + movie_delta_sql("OLD.movie_id", "-OLD.rating", "-1", "double precision", removed="OLD.rating") + "; "
+    "END IF; "
+    "IF TG_OP IN ('INSERT', 'UPDATE') THEN "
+    + movie_delta_sql("NEW.movie_id", "NEW.rating", "1", "double precision", added="NEW.rating") + "; "
+    "END IF; "
+    "RETURN NULL; END $$ LANGUAGE plpgsql",
+    "CREATE TRIGGER ratings_aggregate AFTER INSERT OR UPDATE OF rating, review, movie_id OR DELETE ON ratings "
+    "FOR EACH ROW EXECUTE FUNCTION ratings_aggregate()",
+]
+
+for statement in SQLITE_AGGREGATE_TRIGGERS:
+    event.listen(Rating.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+for statement in POSTGRES_AGGREGATE_TRIGGERS:
+    event.listen(Rating.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
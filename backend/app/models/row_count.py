@@ -0,0 +1,40 @@
+from sqlalchemy import Column, Integer, String, DDL, event
+from app.database import Base
+from app.models.movie import Movie
+from app.models.rating import Rating
+
+class RowCount(Base):
+    """Per-table row counters kept current by SQLite triggers"""
+    __tablename__ = "row_counts"
+
+    table_name = Column(String, primary_key=True)
+    row_count = Column(Integer, nullable=False, default=0)
+
+COUNTED_TABLES = ("movies", "ratings")
+
+def counter_triggers(table: str) -> list[DDL]:
+    return [
+        DDL(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_count_insert AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO row_counts (table_name, row_count) VALUES ('{table}', 1) "
+            f"ON CONFLICT (table_name) DO UPDATE SET row_count = row_count + 1; END"
+        ),
+        DDL(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_count_delete AFTER DELETE ON {table} BEGIN "
+            f"UPDATE row_counts SET row_count = row_count - 1 WHERE table_name = '{table}'; END"
+        ),
+    ]
+
+# Counters start at zero alongside freshly created (empty) tables
+event.listen(
+    RowCount.__table__,
+    "after_create",
+    DDL(
+        "INSERT OR IGNORE INTO row_counts (table_name, row_count) VALUES "
+        + ", ".join(f"('{table}', 0)" for table in COUNTED_TABLES)
+    ).execute_if(dialect="sqlite"),
+)
+
+for model in (Movie, Rating):
+    for trigger in counter_triggers(model.__tablename__):
+        event.listen(model.__table__, "after_create", trigger.execute_if(dialect="sqlite"))
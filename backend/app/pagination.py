@@ -0,0 +1,68 @@
+import base64
+import binascii
+import json
+import math
+
+from sqlalchemy import tuple_
+
+
+def count_pages(total: int, limit: int):
+    """Number of pages for a total, or None when the total was not counted"""
+    if total is None:
+        return None
+    return math.ceil(total / limit) if limit else 1
+
+
+# Sort keys clients may page by. Every key is NOT NULL so that the
+# (sort key, id) row-value comparison used for keyset paging is well defined.
+MOVIE_SORT_FIELDS = ("id", "title", "release_year")
+
+
+def parse_sort(sort: str) -> tuple[str, bool]:
+    """Split a sort spec like "-release_year" into (field, descending)"""
+    descending = sort.startswith("-")
+    field = sort[1:] if descending else sort
+    if field not in MOVIE_SORT_FIELDS:
+        raise ValueError(f"Unsupported sort field: {field}")
+    return field, descending
+
+
+def encode_cursor(sort: str, key, last_id: int) -> str:
+    """Build an opaque cursor pointing just after the given row"""
+    payload = json.dumps({"s": sort, "k": key, "i": last_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> tuple:
+    """Return (last sort key, last id) from a cursor issued for the same sort"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        key, last_id = payload["k"], int(payload["i"])
+        cursor_sort = payload["s"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor")
+    if isinstance(key, bool) or not isinstance(key, (str, int)):
+        raise ValueError("Invalid cursor")
+    if cursor_sort != sort:
+        raise ValueError("Cursor was issued for a different sort order")
+    return key, last_id
+
+
+def order_columns(columns: dict, sort: str):
+    """ORDER BY clauses for a sort spec, with id as the unique tie-breaker"""
+    field, descending = parse_sort(sort)
+    keys = [columns[field]] if field != "id" else []
+    keys.append(columns["id"])
+    return [key.desc() if descending else key.asc() for key in keys]
+
+
+def keyset_filter(columns: dict, sort: str, cursor: str):
+    """WHERE clause selecting rows strictly after the cursor position"""
+    field, descending = parse_sort(sort)
+    key, last_id = decode_cursor(cursor, sort)
+    if field == "id":
+        return columns["id"] < last_id if descending else columns["id"] > last_id
+    row = tuple_(columns[field], columns["id"])
+    position = tuple_(key, last_id)
+    return row < position if descending else row > position
@@ -0,0 +1,275 @@
+"""
+On-demand profiling of single live requests.
+
+A request sent with `X-Profile: cprofile|collapsed` (or `?_profile=...`) and a
+valid `X-Internal-Token` is profiled and answered as usual, with an
+`X-Profile-Id` header naming the artifact in the spool:
+
+- `cprofile`: deterministic cProfile of the event loop thread, merged with
+  the threadpool work done through run_db(), saved as a pstats file.
+- `collapsed`: wall-clock stack samples of the same threads in the
+  collapsed format flame graph tools read.
+
+Work of other requests interleaved on the event loop lands in the profile
+too, so profile a quiet instance when you need clean numbers. At most
+PROFILE_MAX_CONCURRENT requests are profiled at once and at most one every
+PROFILE_MIN_INTERVAL_SECONDS; requests over the limit run unprofiled.
+"""
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+from functools import wraps
+
+import anyio
+
+REQUEST_PROFILING = os.getenv("REQUEST_PROFILING", "false").lower() == "true"
+PROFILE_SPOOL_DIR = os.getenv("PROFILE_SPOOL_DIR", "./profiles")
+PROFILE_SPOOL_MAX_FILES = int(os.getenv("PROFILE_SPOOL_MAX_FILES", "50"))
+PROFILE_SPOOL_MAX_BYTES = int(os.getenv("PROFILE_SPOOL_MAX_BYTES", str(50 * 1024 * 1024)))
+PROFILE_MAX_CONCURRENT = int(os.getenv("PROFILE_MAX_CONCURRENT", "1"))
+PROFILE_MIN_INTERVAL_SECONDS = float(os.getenv("PROFILE_MIN_INTERVAL_SECONDS", "5"))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+# Sampling stops after this long even if the request is still running
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "30"))
+
+PROFILE_MODES = {"cprofile": ".prof", "collapsed": ".folded"}
+
+_active = ContextVar("request_profile", default=None)
+
+
+class RequestProfile:
+    """Profile of one request across the loop thread and its threadpool calls"""
+
+    def __init__(self, mode: str):
+        self.mode = mode
+        self.id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.threads = {threading.get_ident()}
+        self._profilers = []
+        self._samples = Counter()
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def start(self):
+        if self.mode == "cprofile":
+            profiler = cProfile.Profile()
+            self._profilers.append(profiler)
+            profiler.enable()
+        else:
+            self._sampler = threading.Thread(target=self._sample, name="request-profiler", daemon=True)
+            self._sampler.start()
+
+    def stop(self):
+        if self.mode == "cprofile":
+            self._profilers[0].disable()
+        else:
+            self._stop.set()
+            self._sampler.join()
+
+    def _sample(self):
+        interval = PROFILE_SAMPLE_INTERVAL_MS / 1000
+        deadline = time.monotonic() + PROFILE_MAX_SECONDS
+        while not self._stop.wait(interval) and time.monotonic() < deadline:
+            frames = sys._current_frames()
+            for ident in list(self.threads):
+                frame = frames.get(ident)
+                if frame is not None:
+                    self._samples[collapse(frame)] += 1
+
+    def run_in_thread(self, fn, *args, **kwargs):
+        """Run threadpool work under this profile"""
+        ident = threading.get_ident()
+        self.threads.add(ident)
+        try:
+            if self.mode != "cprofile":
+                return fn(*args, **kwargs)
+            profiler = cProfile.Profile()
+            self._profilers.append(profiler)
+            return profiler.runcall(fn, *args, **kwargs)
+        finally:
+            self.threads.discard(ident)
+
+    def save(self, spool_dir: str) -> str:
+        os.makedirs(spool_dir, exist_ok=True)
+        path = os.path.join(spool_dir, self.id + PROFILE_MODES[self.mode])
+        if self.mode == "cprofile":
+            stats = pstats.Stats(self._profilers[0])
+            for profiler in self._profilers[1:]:
+                stats.add(profiler)
+            stats.dump_stats(path)
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                for stack, count in self._samples.most_common():
+                    f.write(f"{stack} {count}\n")
+        return path
+
+
+def collapse(frame) -> str:
+    """Root-first `module:function` stack joined with semicolons"""
+    names = []
+    while frame is not None:
+        names.append(f'{frame.f_globals.get("__name__", "?")}:{frame.f_code.co_name}')
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+def profiled(fn):
+    """Wrap threadpool work so it is included in the current request's profile, if any"""
+    profile = _active.get()
+    if profile is None:
+        return fn
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        return profile.run_in_thread(fn, *args, **kwargs)
+    return wrapper
+
+
+class ProfileSpool:
+    """Directory of profile artifacts bounded by file count and total size"""
+
+    def __init__(self, directory: str = PROFILE_SPOOL_DIR, max_files: int = PROFILE_SPOOL_MAX_FILES,
+                 max_bytes: int = PROFILE_SPOOL_MAX_BYTES):
+        self.directory = directory
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+
+    def list(self) -> list[dict]:
+        if not os.path.isdir(self.directory):
+            return []
+        entries = []
+        for name in os.listdir(self.directory):
+            profile_id, ext = os.path.splitext(name)
+            if ext in PROFILE_MODES.values():
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append({"id": profile_id, "file": name, "bytes": stat.st_size, "mtime": stat.st_mtime})
+        return sorted(entries, key=lambda entry: entry["mtime"], reverse=True)
+
+    def path(self, profile_id: str):
+        """Artifact path for an id from list(), or None"""
+        for entry in self.list():
+            if entry["id"] == profile_id:
+                return os.path.join(self.directory, entry["file"])
+        return None
+
+    def store(self, profile: "RequestProfile") -> str:
+        """Save a finished profile, then prune; blocking file I/O"""
+        path = profile.save(self.directory)
+        self.prune()
+        return path
+
+    def prune(self):
+        entries = self.list()
+        total = sum(entry["bytes"] for entry in entries)
+        while entries and (len(entries) > self.max_files or total > self.max_bytes):
+            oldest = entries.pop()
+            total -= oldest["bytes"]
+            try:
+                os.remove(os.path.join(self.directory, oldest["file"]))
+            except FileNotFoundError:
+                pass
+
+
+profile_spool = ProfileSpool()
+
+
+class ProfileAdmission:
+    """Concurrency cap plus a minimum interval between profiles"""
+
+    def __init__(self, max_concurrent: int = PROFILE_MAX_CONCURRENT,
+                 min_interval: float = PROFILE_MIN_INTERVAL_SECONDS):
+        self.max_concurrent = max_concurrent
+        self.min_interval = min_interval
+        self._running = 0
+        self._last_start = None
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            if self._running >= self.max_concurrent:
+                return False
+            if self._last_start is not None and now - self._last_start < self.min_interval:
+                return False
+            self._running += 1
+            self._last_start = now
+            return True
+
+    def release(self):
+        with self._lock:
+            self._running -= 1
+
+    def reset(self):
+        with self._lock:
+            self._running = 0
+            self._last_start = None
+
+
+profile_admission = ProfileAdmission()
+
+
+def requested_mode(scope):
+    for name, value in scope.get("headers", []):
+        if name == b"x-profile":
+            return value.decode("latin-1").strip().lower()
+    for pair in scope.get("query_string", b"").decode("latin-1").split("&"):
+        if pair.startswith("_profile="):
+            return pair.split("=", 1)[1].lower()
+    return None
+
+
+def internal_token(scope):
+    for name, value in scope.get("headers", []):
+        if name == b"x-internal-token":
+            return value.decode("latin-1")
+    return None
+
+
+class ProfilingMiddleware:
+    """
+    Profiles requests that ask for it, within the admission limits.
+    `authorize(token)` decides whether an X-Internal-Token may profile; it
+    is the internal endpoints' guard, so profiling is refused when no token
+    is configured.
+    """
+
+    def __init__(self, app, authorize):
+        self.app = app
+        self.authorize = authorize
+
+    async def __call__(self, scope, receive, send):
+        mode = requested_mode(scope) if scope["type"] == "http" and REQUEST_PROFILING else None
+        if mode is None:
+            await self.app(scope, receive, send)
+            return
+        if mode not in PROFILE_MODES or not self.authorize(internal_token(scope)):
+            await self.app(scope, receive, send)
+            return
+        if not profile_admission.try_acquire():
+            await self.app(scope, receive, _with_header(send, b"x-profile", b"skipped"))
+            return
+
+        profile = RequestProfile(mode)
+        token = _active.set(profile)
+        profile.start()
+        try:
+            await self.app(scope, receive, _with_header(send, b"x-profile-id", profile.id.encode()))
+        finally:
+            profile.stop()
+            _active.reset(token)
+            profile_admission.release()
+            # Dumping stats and pruning the spool are file I/O; keep them off the event loop
+            await anyio.to_thread.run_sync(profile_spool.store, profile)
+
+
+def _with_header(send, name: bytes, value: bytes):
+    async def send_with_header(message):
+        if message["type"] == "http.response.start":
+            message = {**message, "headers": list(message.get("headers", [])) + [(name, value)]}
+        await send(message)
+    return send_with_header
@@ -0,0 +1,263 @@
+"""
+Read-through cache for movie detail and list responses.
+
+Entries are validated read models, keyed on the normalized request and
+tagged with what they were built from: a movie page carries
+("movie", id), a list page carries "movies" plus ("movie", id) for every
+row on it. Writes drop exactly the tags they touch:
+
+  - creating, changing or deleting a movie: every list page (filters and
+    offsets may shift), and that movie
+  - a rating: that movie and the list pages that show it
+
+ORM writes are picked up from session events at commit; Core statements
+(the rating upsert, the aggregate reconciliation) invalidate explicitly.
+The cache is per process, so READ_CACHE_TTL bounds how stale another
+worker's writes can look. Reads served by a replica are not stored for
+REPLICA_STICKY_SECONDS after an invalidation: the replica may still hold the
+rows the write replaced. READ_CACHE_BACKEND=none turns it off.
+"""
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.routing import REPLICA_STICKY_SECONDS
+from app.single_flight import single_flight
+
+READ_CACHE_BACKEND = os.getenv("READ_CACHE_BACKEND", "memory")
+READ_CACHE_SIZE = int(os.getenv("READ_CACHE_SIZE", "2048"))
+READ_CACHE_TTL = float(os.getenv("READ_CACHE_TTL", "30"))
+
+LIST_TAG = "movies"
+
+
+def movie_tag(movie_id: int) -> tuple:
+    return ("movie", movie_id)
+
+
+class CacheBackend(ABC):
+    """
+    Interface of a read cache. `generation()` is taken before loading and
+    passed to `set()`, which refuses the value if anything was invalidated
+    in between, so a slow read never re-caches data a write just replaced.
+    """
+
+    # time.monotonic() of the last invalidate() or clear()
+    invalidated_at = float("-inf")
+
+    @abstractmethod
+    def get(self, key):
+        ...
+
+    @abstractmethod
+    def set(self, key, value, tags=(), generation: int = None):
+        ...
+
+    @abstractmethod
+    def generation(self) -> int:
+        ...
+
+    @abstractmethod
+    def invalidate(self, *tags):
+        ...
+
+    @abstractmethod
+    def clear(self):
+        ...
+
+    @abstractmethod
+    def stats(self) -> dict:
+        ...
+
+
+class NullCache(CacheBackend):
+    """Caches nothing; every read goes to the database"""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, tags=(), generation: int = None):
+        pass
+
+    def generation(self) -> int:
+        return 0
+
+    def invalidate(self, *tags):
+        pass
+
+    def clear(self):
+        pass
+
+    def stats(self) -> dict:
+        return {"backend": "none"}
+
+
+class LRUCache(CacheBackend):
+    """Thread-safe in-process LRU with a TTL per entry and tag-based invalidation"""
+
+    def __init__(self, maxsize: int = READ_CACHE_SIZE, ttl: float = READ_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._keys_by_tag = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires, _ = entry
+            if expires < time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, tags=(), generation: int = None):
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            if key in self._entries:
+                self._remove(key)
+            tags = frozenset(tags)
+            self._entries[key] = (value, time.monotonic() + self.ttl, tags)
+            for tag in tags:
+                self._keys_by_tag.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def generation(self) -> int:
+        with self._lock:
+            return self._generation
+
+    def invalidate(self, *tags):
+        with self._lock:
+            self._generation += 1
+            self.invalidated_at = time.monotonic()
+            for tag in tags:
+                for key in self._keys_by_tag.pop(tag, set()):
+                    if key in self._entries:
+                        self._remove(key)
+                        self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self.invalidated_at = time.monotonic()
+            self._entries.clear()
+            self._keys_by_tag.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": "memory",
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+    def _remove(self, key):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+
+CACHE_BACKENDS = {
+    "memory": LRUCache,
+    "none": NullCache,
+}
+
+read_cache = CACHE_BACKENDS[READ_CACHE_BACKEND]()
+
+
+def replica_settled(lag: float = REPLICA_STICKY_SECONDS) -> bool:
+    """Whether replicas have had `lag` seconds to catch up with the last invalidation"""
+    return time.monotonic() - read_cache.invalidated_at >= lag
+
+
+async def cached(key, build, tags, bypass: bool = False, read_your_writes: bool = False,
+                 from_replica: bool = False):
+    """
+    Read-through: the cached value for `key`, or `await build()` cached under
+    `tags(value)`. None results are returned
+    but never cached. `bypass` skips the lookup but still refreshes the entry.
+    Concurrent misses on one key share a single build, except that a session
+    pinned to the primary after its own write (`read_your_writes`) never joins
+    a build that may be reading a lagging replica. A build served by a
+    replica (`from_replica`) is returned but not stored while replicas may
+    still be catching up with the last write.
+    """
+    value = None if bypass else read_cache.get(key)
+    if value is not None:
+        return value
+
+    async def build_and_store():
+        # Only the leader stores, with the generation from before its own read
+        generation = read_cache.generation()
+        value = await build()
+        if value is not None and (not from_replica or replica_settled()):
+            read_cache.set(key, value, tags(value), generation)
+        return value
+
+    return await single_flight.do(("cached", key, bypass, read_your_writes), build_and_store)
+
+
+def list_tags(movies) -> set:
+    return {LIST_TAG} | {movie_tag(movie.id) for movie in movies}
+
+
+def write_tags(instance) -> set:
+    """Cache tags a written Movie or Rating row can make stale"""
+    table = getattr(instance, "__tablename__", None)
+    if table == "movies":
+        return {movie_tag(instance.id), LIST_TAG}
+    if table == "ratings":
+        return {movie_tag(instance.movie_id)}
+    return set()
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_read_cache_invalidations(session, flush_context):
+    pending = session.info.setdefault("read_cache_invalidations", set())
+    for instance in list(session.new) + list(session.deleted) + list(session.dirty):
+        pending |= write_tags(instance)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_read_cache_invalidations(session):
+    tags = session.info.pop("read_cache_invalidations", None)
+    if tags:
+        read_cache.invalidate(*tags)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_read_cache_invalidations(session):
+    session.info.pop("read_cache_invalidations", None)
@@ -0,0 +1,67 @@
+"""
+Fast JSON responses for read endpoints.
+
+Returning a model from a route makes FastAPI validate it against the
+response_model and then encode it a second time. These helpers validate
+ORM rows once through a TypeAdapter built at import time and let
+pydantic-core write the JSON bytes directly; routes keep response_model so
+the OpenAPI schema is unchanged.
+
+Clients that send `Accept: application/msgpack` get the same document as
+MessagePack (when msgpack is installed).
+"""
+from fastapi import Response
+from pydantic import TypeAdapter
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+from app.compression import parse_qvalues
+
+from app.schemas.movie import MovieHistogramResponse, MovieListResponse, MovieResponse, TopMoviesResponse
+from app.schemas.rating import RatingListResponse, RatingResponse
+
+movie_adapter = TypeAdapter(MovieResponse)
+movie_list_adapter = TypeAdapter(MovieListResponse)
+histogram_adapter = TypeAdapter(MovieHistogramResponse)
+top_movies_adapter = TypeAdapter(TopMoviesResponse)
+rating_adapter = TypeAdapter(RatingResponse)
+rating_list_adapter = TypeAdapter(RatingListResponse)
+
+
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack")
+
+
+def wants_msgpack(accept: str) -> bool:
+    """True when Accept ranks MessagePack above JSON"""
+    if msgpack is None or not accept:
+        return False
+    offered = parse_qvalues(accept)
+    msgpack_q = max(offered.get(media_type, 0.0) for media_type in MSGPACK_TYPES)
+    return msgpack_q > 0 and msgpack_q >= offered.get("application/json", offered.get("*/*", 0.0))
+
+
+class ModelResponse(Response):
+    """JSON by default; re-encoded as MessagePack when the request asks for it"""
+
+    media_type = "application/json"
+
+    def __init__(self, adapter: TypeAdapter, model, status_code: int = 200, headers: dict = None):
+        self.adapter = adapter
+        self.model = model
+        super().__init__(adapter.dump_json(model), status_code=status_code, headers={**(headers or {}), "vary": "Accept"})
+
+    async def __call__(self, scope, receive, send):
+        accept = next((value.decode("latin-1") for key, value in scope.get("headers", []) if key == b"accept"), "")
+        if wants_msgpack(accept):
+            self.body = msgpack.packb(self.adapter.dump_python(self.model, mode="json"))
+            self.headers["content-type"] = "application/msgpack"
+            self.headers["content-length"] = str(len(self.body))
+        await super().__call__(scope, receive, send)
+
+
+def json_response(adapter: TypeAdapter, value, status_code: int = 200, headers: dict = None) -> Response:
+    """Serialize ORM objects, dicts or models straight to a JSON (or MessagePack) response"""
+    return ModelResponse(adapter, adapter.validate_python(value, from_attributes=True), status_code, headers)
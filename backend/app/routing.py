@@ -0,0 +1,161 @@
+"""
+Read/write splitting across a primary and optional read replicas.
+
+Sessions for GET/HEAD requests are pinned to one replica (round-robin over
+the healthy ones); everything else, and any flush or DML statement, goes to
+the primary. A client that has just written is kept on the primary for a
+short window so it reads its own writes despite replication lag.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
+
+# Comma-separated URLs of read replicas; empty disables splitting
+DB_REPLICA_URLS = [url.strip() for url in os.getenv("DB_REPLICA_URLS", "").split(",") if url.strip()]
+# How long a replica is skipped after a connection failure
+REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", "30"))
+# How long a client's reads stay on the primary after it writes
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+REPLICA_STICKY_CLIENTS = int(os.getenv("REPLICA_STICKY_CLIENTS", "10000"))
+
+READ_METHODS = ("GET", "HEAD")
+
+
+class ReplicaSet:
+    """Round-robin over replica engines, skipping ones that recently failed to connect"""
+
+    def __init__(self, engines: list, retry_after: float = REPLICA_RETRY_SECONDS):
+        self.engines = list(engines)
+        self.retry_after = retry_after
+        self._next = 0
+        self._ejected_until = {}
+        self._lock = threading.Lock()
+        self.routed = 0
+        self.fallbacks = 0
+        self.ejections = 0
+        for engine in self.engines:
+            event.listen(engine, "handle_error", self._on_error)
+
+    def pick(self):
+        """Next healthy replica, or None when all are ejected (read from the primary)"""
+        now = time.monotonic()
+        with self._lock:
+            for _ in range(len(self.engines)):
+                engine = self.engines[self._next % len(self.engines)]
+                self._next += 1
+                if self._ejected_until.get(engine, 0) <= now:
+                    self.routed += 1
+                    return engine
+            self.fallbacks += 1
+            return None
+
+    def eject(self, engine):
+        with self._lock:
+            self._ejected_until[engine] = time.monotonic() + self.retry_after
+            self.ejections += 1
+
+    def _on_error(self, context):
+        # No connection means the connect itself failed; is_disconnect covers dropped ones
+        if context.connection is None or context.is_disconnect:
+            self.eject(context.engine)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "replicas": [
+                    {
+                        "url": engine.url.render_as_string(hide_password=True),
+                        "healthy": self._ejected_until.get(engine, 0) <= now,
+                    }
+                    for engine in self.engines
+                ],
+                "routed": self.routed,
+                "fallbacks": self.fallbacks,
+                "ejections": self.ejections,
+            }
+
+
+class StickyClients:
+    """Clients that wrote recently, whose reads must stay on the primary"""
+
+    def __init__(self, window: float = REPLICA_STICKY_SECONDS, maxsize: int = REPLICA_STICKY_CLIENTS):
+        self.window = window
+        self.maxsize = maxsize
+        self._until = OrderedDict()
+        self._lock = threading.Lock()
+
+    def mark(self, key: str):
+        with self._lock:
+            self._until[key] = time.monotonic() + self.window
+            self._until.move_to_end(key)
+            while len(self._until) > self.maxsize:
+                self._until.popitem(last=False)
+
+    def active(self, key: str) -> bool:
+        with self._lock:
+            until = self._until.get(key)
+            if until is None:
+                return False
+            if until <= time.monotonic():
+                del self._until[key]
+                return False
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._until.clear()
+
+
+sticky_clients = StickyClients()
+
+
+def client_key(request) -> str:
+    """Identify a client for read-your-writes: its bearer token, else its address"""
+    authorization = request.headers.get("authorization")
+    if authorization:
+        return authorization
+    return request.client.host if request.client else ""
+
+
+def route_request(db, request, replicas: ReplicaSet = None, sticky: StickyClients = sticky_clients):
+    """Pin a request's session to a replica when it only reads and its client has not just written"""
+    key = client_key(request)
+    db.info["client_key"] = key
+    db.info["sticky_clients"] = sticky
+    # Caches filled from replicas may lag this client's own writes too
+    db.info["read_your_writes"] = replicas is not None and sticky.active(key)
+    if replicas is None or request.method not in READ_METHODS or db.info["read_your_writes"]:
+        return
+    replica = replicas.pick()
+    if replica is not None:
+        db.info["replica"] = replica
+
+
+class RoutingSession(Session):
+    """Session that reads from `info["replica"]` when set and writes to its own bind"""
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.info["wrote"] = True
+            return super().get_bind(mapper, clause=clause, **kw)
+        replica = self.info.get("replica")
+        if replica is not None:
+            return replica
+        return super().get_bind(mapper, clause=clause, **kw)
+
+
+@event.listens_for(Session, "after_commit")
+def _stick_writer_to_primary(session):
+    if session.info.pop("wrote", False) and "client_key" in session.info:
+        session.info["sticky_clients"].mark(session.info["client_key"])
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_write_flag(session):
+    session.info.pop("wrote", None)
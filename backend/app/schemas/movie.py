@@ -48,8 +48,13 @@ class MovieBase(BaseModel):
 class MovieCreate(MovieBase):
     pass
 
-class MovieResponse(MovieBase):
+class MovieResponse(BaseModel):
+    """Read model: stored rows were sanitized on the way in, so no validators run here"""
     id: int
+    title: str
+    genre: str
+    release_year: int
+    description: Optional[str] = None
     created_by: int
     created_at: datetime
     ratings_count: int
@@ -60,7 +65,44 @@ class MovieResponse(MovieBase):
 
 class MovieListResponse(BaseModel):
     movies: list[MovieResponse]
-    total: int
-    page: int
+    total: Optional[int] = None
+    page: Optional[int] = None
     limit: int
-    total_pages: int
\ No newline at end of file
+    total_pages: Optional[int] = None
+    next_cursor: Optional[str] = None
+    count_strategy: str = "exact"
+
+class MovieHistogramResponse(BaseModel):
+    movie_id: int
+    ratings_count: int
+    ratings_avg: float
+    histogram: dict[int, int]
+
+class TopMovie(BaseModel):
+    id: int
+    title: str
+    genre: str
+    release_year: int
+    ratings_count: int
+    ratings_avg: float
+    score: float
+
+class TopMoviesResponse(BaseModel):
+    genre: Optional[str] = None
+    movies: list[TopMovie]
+    mean_rating: float
+    prior_votes: float
+
+class BulkImportError(BaseModel):
+    row: int
+    errors: list[dict]
+
+class BulkImportResponse(BaseModel):
+    rows: int
+    inserted: int
+    failed: int
+    batches: int
+    errors: list[BulkImportError]
+    errors_truncated: bool
+    elapsed_seconds: float
+    rows_per_second: float
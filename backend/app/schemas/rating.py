@@ -19,8 +19,11 @@ class RatingBase(BaseModel):
 class RatingCreate(RatingBase):
     pass
 
-class RatingResponse(RatingBase):
+class RatingResponse(BaseModel):
+    """Read model: reviews were sanitized on the way in, so no validators run here"""
     id: int
+    rating: int
+    review: Optional[str] = None
     movie_id: int
     user_id: int
     created_at: datetime
@@ -32,7 +35,8 @@ class RatingResponse(RatingBase):
 
 class RatingListResponse(BaseModel):
     ratings: list[RatingResponse]
-    total: int
+    total: Optional[int] = None
     page: int
     limit: int
-    total_pages: int
\ No newline at end of file
+    total_pages: Optional[int] = None
+    count_strategy: str = "exact"
\ No newline at end of file
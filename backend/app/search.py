@@ -0,0 +1,107 @@
+"""
+Full-text search over movie titles and descriptions.
+
+PostgreSQL gets a generated `search_vector` tsvector column with a GIN index;
+SQLite gets an external-content FTS5 table kept in sync by triggers. Both are
+created alongside the movies table and fall back to ILIKE elsewhere.
+"""
+import re
+
+from sqlalchemy import DDL, Column, Integer, MetaData, String, Table, event, func, literal_column, or_, text
+from app.models.movie import Movie
+
+SEARCH_CONFIG = "english"
+
+# Not part of Base.metadata: the virtual table is managed by the DDL below
+movies_fts = Table(
+    "movies_fts",
+    MetaData(),
+    Column("rowid", Integer),
+    Column("title", String),
+    Column("description", String),
+    Column("rank"),
+)
+
+search_vector = literal_column("movies.search_vector")
+
+POSTGRES_DDL = [
+    f"ALTER TABLE movies ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(description, '')), 'B')) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_movies_search_vector ON movies USING gin (search_vector)",
+]
+
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS movies_fts USING fts5("
+    "title, description, content='movies', content_rowid='id', tokenize='porter unicode61')",
+    # Weight title hits above description hits, like setweight() on PostgreSQL
+    "INSERT INTO movies_fts (movies_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0)')",
+    "CREATE TRIGGER IF NOT EXISTS movies_fts_insert AFTER INSERT ON movies BEGIN "
+    "INSERT INTO movies_fts (rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS movies_fts_delete AFTER DELETE ON movies BEGIN "
+    "INSERT INTO movies_fts (movies_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS movies_fts_update AFTER UPDATE OF title, description ON movies BEGIN "
+    "INSERT INTO movies_fts (movies_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO movies_fts (rowid, title, description) VALUES (new.id, new.title, new.description); END",
+]
+
+for statement in POSTGRES_DDL:
+    event.listen(Movie.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+for statement in SQLITE_DDL:
+    event.listen(Movie.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+# The FTS table outlives a dropped movies table otherwise, leaving stale rowids
+event.listen(
+    Movie.__table__,
+    "after_drop",
+    DDL("DROP TABLE IF EXISTS movies_fts").execute_if(dialect="sqlite"),
+)
+
+
+def search_terms(search: str) -> list[str]:
+    """Split user input into plain word tokens safe to splice into a query"""
+    return re.findall(r"\w+", search.lower())
+
+
+def to_tsquery(terms: list[str]):
+    return func.to_tsquery(SEARCH_CONFIG, " & ".join(f"{term}:*" for term in terms))
+
+
+def apply_search(query, dialect: str, search: str):
+    """
+    Filter a movies query to full-text matches. Every term must match and
+    is treated as a prefix so results update as the user types.
+    """
+    terms = search_terms(search)
+    if not terms:
+        return query
+
+    if dialect == "postgresql":
+        return query.filter(search_vector.op("@@")(to_tsquery(terms)))
+
+    if dialect == "sqlite":
+        match = " ".join(f'"{term}"*' for term in terms)
+        return query.join(movies_fts, movies_fts.c.rowid == Movie.id).filter(
+            text("movies_fts MATCH :fts_match").bindparams(fts_match=match)
+        )
+
+    return query.filter(
+        or_(
+            Movie.title.ilike(f"%{search}%"),
+            Movie.description.ilike(f"%{search}%")
+        )
+    )
+
+
+def search_ranking(dialect: str, search: str) -> list:
+    """ORDER BY clauses putting the best matches of an apply_search() query first"""
+    terms = search_terms(search)
+    if not terms:
+        return []
+    if dialect == "postgresql":
+        return [func.ts_rank(search_vector, to_tsquery(terms)).desc()]
+    if dialect == "sqlite":
+        # FTS5 rank is bm25(): more negative is more relevant
+        return [movies_fts.c.rank]
+    return []
@@ -2,6 +2,7 @@ from app.seeders.base_seeder import BaseSeeder
 from app.models.rating import Rating
 from app.models.movie import Movie
 from app.models.user import User
+from app.crud.rating import reconcile_movie_ratings_stats
 import random
 
 class RatingSeeder(BaseSeeder):
@@ -99,15 +100,4 @@ class RatingSeeder(BaseSeeder):
     
     def update_movie_stats(self, movies):
         """Update rating statistics for all movies"""
-        from sqlalchemy import func
-        
-        for movie in movies:
-            stats = self.db.query(
-                func.count(Rating.id).label('count'),
-                func.avg(Rating.rating).label('avg')
-            ).filter(Rating.movie_id == movie.id).first()
-            
-            movie.ratings_count = stats.count or 0
-            movie.ratings_avg = float(stats.avg or 0.0)
-        
-        self.commit()
\ No newline at end of file
+        reconcile_movie_ratings_stats(self.db)
\ No newline at end of file
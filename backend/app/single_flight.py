@@ -0,0 +1,79 @@
+"""
+Request coalescing for hot reads.
+
+Concurrent requests for the same key share one execution: the first
+(leader) runs the load, the rest (followers) await its result or its
+exception. It runs on the event loop around run_db(), so it covers both the
+threadpool and the AsyncSession paths. Loads return detached read models,
+never session-bound ORM rows, so one result can be handed to every waiter.
+
+A follower waits at most SINGLE_FLIGHT_TIMEOUT seconds and then runs the
+load itself; it does the same if the leader's request is cancelled.
+"""
+import asyncio
+import os
+
+SINGLE_FLIGHT = os.getenv("SINGLE_FLIGHT", "true").lower() == "true"
+SINGLE_FLIGHT_TIMEOUT = float(os.getenv("SINGLE_FLIGHT_TIMEOUT", "5"))
+
+
+class LeaderCancelled(Exception):
+    """The leading request went away before its load finished"""
+
+
+class SingleFlight:
+    def __init__(self, timeout: float = SINGLE_FLIGHT_TIMEOUT, enabled: bool = SINGLE_FLIGHT):
+        self.timeout = timeout
+        self.enabled = enabled
+        self._flights = {}
+        self.leaders = 0
+        self.followers = 0
+        self.timeouts = 0
+
+    async def do(self, key, load):
+        """Result of `await load()`, shared with every concurrent caller using `key`"""
+        if not self.enabled:
+            return await load()
+        loop = asyncio.get_running_loop()
+        # Futures belong to one event loop
+        flight_key = (loop, key)
+        future = self._flights.get(flight_key)
+        if future is not None:
+            self.followers += 1
+            try:
+                return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                return await load()
+            except LeaderCancelled:
+                return await load()
+
+        future = self._flights[flight_key] = loop.create_future()
+        self.leaders += 1
+        try:
+            result = await load()
+        except asyncio.CancelledError:
+            future.set_exception(LeaderCancelled())
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._flights[flight_key]
+            if future.done() and not future.cancelled():
+                # Mark the exception retrieved when no follower was waiting for it
+                future.exception()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._flights),
+            "leaders": self.leaders,
+            "coalesced": self.followers,
+            "timeouts": self.timeouts,
+        }
+
+
+single_flight = SingleFlight()
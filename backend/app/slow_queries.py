@@ -0,0 +1,239 @@
+"""
+Slow-query log.
+
+Statements slower than SLOW_QUERY_MS are kept in a bounded ring buffer with
+their parameters and the route that issued them. The query plan (`EXPLAIN`,
+or `EXPLAIN QUERY PLAN` on SQLite) is captured afterwards on a separate
+connection, so the request that ran the slow statement never waits for it.
+
+When the database slows down every statement turns slow, so plan capture
+is bounded: at most SLOW_QUERY_EXPLAIN_MAX_PENDING EXPLAINs are queued or
+running (further entries are marked "dropped"), and a statement whose plan
+was captured or requested in the last SLOW_QUERY_PLAN_REUSE_SECONDS points
+at that entry ("reused") instead of being explained again.
+"""
+import asyncio
+import contextvars
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait as wait_futures
+from datetime import datetime, timezone
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.instrumentation import current_route
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+SLOW_QUERY_BUFFER = int(os.getenv("SLOW_QUERY_BUFFER", "200"))
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "true").lower() == "true"
+SLOW_QUERY_EXPLAIN_MAX_PENDING = int(os.getenv("SLOW_QUERY_EXPLAIN_MAX_PENDING", "4"))
+SLOW_QUERY_PLAN_REUSE_SECONDS = float(os.getenv("SLOW_QUERY_PLAN_REUSE_SECONDS", "300"))
+# Written on shutdown when set; GET /internal/slow-queries?format=jsonl works any time
+SLOW_QUERY_DUMP_PATH = os.getenv("SLOW_QUERY_DUMP_PATH")
+
+EXPLAINABLE = re.compile(r"^\s*(SELECT|WITH|INSERT|UPDATE|DELETE)\b", re.IGNORECASE)
+# Never keep parameters of statements that carry credentials
+SENSITIVE = re.compile(r"password", re.IGNORECASE)
+MAX_PARAMETER_LENGTH = 200
+
+_explaining = contextvars.ContextVar("explaining_slow_query", default=False)
+
+
+def _safe_value(value):
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    text = str(value)
+    if len(text) > MAX_PARAMETER_LENGTH:
+        return text[:MAX_PARAMETER_LENGTH] + "..."
+    return text
+
+
+def safe_parameters(statement: str, parameters):
+    if SENSITIVE.search(statement):
+        return "[redacted]"
+    if isinstance(parameters, dict):
+        return {key: _safe_value(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_safe_value(value) for value in parameters]
+    return _safe_value(parameters)
+
+
+def explain_sql(dialect: str, statement: str) -> str:
+    if dialect == "sqlite":
+        return f"EXPLAIN QUERY PLAN {statement}"
+    if dialect == "postgresql":
+        # Plain EXPLAIN never executes the statement, so DML is safe to explain
+        return f"EXPLAIN (FORMAT JSON) {statement}"
+    return f"EXPLAIN {statement}"
+
+
+def plan_rows(rows) -> list:
+    return [list(row) if len(row) > 1 else row[0] for row in rows]
+
+
+class SlowQueryLog:
+    """Ring buffer of slow statements; plans are filled in asynchronously"""
+
+    def __init__(self, threshold_ms: float = SLOW_QUERY_MS, maxlen: int = SLOW_QUERY_BUFFER,
+                 explain: bool = SLOW_QUERY_EXPLAIN, max_pending: int = SLOW_QUERY_EXPLAIN_MAX_PENDING,
+                 reuse_seconds: float = SLOW_QUERY_PLAN_REUSE_SECONDS):
+        self.threshold_ms = threshold_ms
+        self.explain = explain
+        self.max_pending = max_pending
+        self.reuse_seconds = reuse_seconds
+        self._entries = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+        self._next_id = 1
+        self._executor = None
+        self._pending = set()
+        # Statement text -> (entry holding its plan, when the plan was requested)
+        self._plans = OrderedDict()
+
+    def record(self, conn, statement: str, parameters, duration_ms: float, executemany: bool = False):
+        with self._lock:
+            entry = {
+                "id": self._next_id,
+                "at": datetime.now(timezone.utc).isoformat(),
+                "duration_ms": round(duration_ms, 3),
+                "route": current_route(),
+                "statement": statement,
+                "parameters": safe_parameters(statement, parameters),
+                "plan": None,
+                "plan_status": self._plan_status(statement, executemany),
+            }
+            self._next_id += 1
+            self._entries.append(entry)
+            if entry["plan_status"] == "reused":
+                source = self._plans[statement][0]
+                entry["plan"], entry["plan_from"] = source["plan"], source["id"]
+            elif entry["plan_status"] == "pending":
+                self._plans[statement] = (entry, time.monotonic())
+                self._plans.move_to_end(statement)
+                while len(self._plans) > self._entries.maxlen:
+                    self._plans.popitem(last=False)
+        if entry["plan_status"] == "pending":
+            self._schedule_explain(entry, conn, statement, parameters)
+
+    def _plan_status(self, statement: str, executemany: bool) -> str:
+        # Called with the lock held
+        if not self.explain or executemany or not EXPLAINABLE.match(statement):
+            return "skipped"
+        recent = self._plans.get(statement)
+        if recent is not None and time.monotonic() - recent[1] < self.reuse_seconds:
+            return "reused"
+        if len(self._pending) >= self.max_pending:
+            return "dropped"
+        return "pending"
+
+    def _schedule_explain(self, entry, conn, statement, parameters):
+        sql = explain_sql(conn.dialect.name, statement)
+        if conn.dialect.is_async:
+            # We are on the event loop (inside the greenlet bridge): explain on a
+            # fresh connection in a task with a clean context, after this request moves on
+            from sqlalchemy.ext.asyncio import AsyncEngine
+            engine = AsyncEngine(conn.engine)
+            task = asyncio.get_running_loop().create_task(
+                self._explain_async(entry, engine, sql, parameters), context=contextvars.Context()
+            )
+        else:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-explain")
+            task = self._executor.submit(self._explain_sync, entry, conn.engine, sql, parameters)
+        with self._lock:
+            self._pending.add(task)
+        task.add_done_callback(self._explain_done)
+
+    def _explain_done(self, task):
+        with self._lock:
+            self._pending.discard(task)
+
+    def _explain_failed(self, entry, error: Exception):
+        entry["plan_status"] = f"failed: {error.__class__.__name__}"
+        with self._lock:
+            # Let the next occurrence try again
+            if self._plans.get(entry["statement"], (None,))[0] is entry:
+                del self._plans[entry["statement"]]
+
+    def _explain_sync(self, entry, engine, sql, parameters):
+        _explaining.set(True)
+        try:
+            with engine.connect() as connection:
+                entry["plan"] = plan_rows(connection.exec_driver_sql(sql, parameters).fetchall())
+            entry["plan_status"] = "captured"
+        except Exception as e:
+            self._explain_failed(entry, e)
+
+    async def _explain_async(self, entry, engine, sql, parameters):
+        _explaining.set(True)
+        try:
+            async with engine.connect() as connection:
+                result = await connection.exec_driver_sql(sql, parameters)
+                entry["plan"] = plan_rows(result.fetchall())
+            entry["plan_status"] = "captured"
+        except Exception as e:
+            self._explain_failed(entry, e)
+
+    def wait(self, timeout: float = 5):
+        """Block until scheduled thread-based plan captures finish (tests, dumps)"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                pending = [task for task in self._pending if isinstance(task, Future) and not task.done()]
+            if not pending:
+                return
+            wait_futures(pending, timeout=max(0, deadline - time.monotonic()))
+
+    def entries(self, limit: int = None) -> list[dict]:
+        with self._lock:
+            by_id = {entry["id"]: entry for entry in self._entries}
+            entries = [dict(entry) for entry in reversed(self._entries)]
+        for entry in entries:
+            # A reused plan may have landed after the entry was recorded
+            if entry["plan"] is None and entry.get("plan_from") in by_id:
+                entry["plan"] = by_id[entry["plan_from"]]["plan"]
+        return entries[:limit] if limit else entries
+
+    def to_jsonl(self) -> str:
+        return "".join(json.dumps(entry, default=str) + "\n" for entry in reversed(self.entries()))
+
+    def dump(self, path: str) -> int:
+        """Append the buffer to a JSONL file; returns the number of entries written"""
+        lines = self.to_jsonl()
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(lines)
+        return lines.count("\n")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._plans.clear()
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+slow_query_log = SlowQueryLog()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_slow_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info["slow_query_start"] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _record_slow_query(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info.pop("slow_query_start", None)
+    if start is None or _explaining.get():
+        return
+    duration_ms = (time.perf_counter() - start) * 1000
+    if duration_ms >= slow_query_log.threshold_ms:
+        slow_query_log.record(conn, statement, parameters, duration_ms, executemany)
@@ -0,0 +1,162 @@
+"""
+Production profile for file-backed SQLite.
+
+Every connection gets WAL journaling, relaxed fsyncs, a memory map, a larger
+page cache and a busy timeout. WAL lets readers run alongside a writer, but
+SQLite still allows one writer at a time, so write transactions from this
+process queue on a gate instead of racing each other into "database is
+locked" errors.
+"""
+import asyncio
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.util import await_only
+
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+# Negative values are KiB, so -65536 is a 64 MiB page cache per connection
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+# Queue write transactions on a process-wide gate (reads are never queued)
+SQLITE_SERIALIZE_WRITES = os.getenv("SQLITE_SERIALIZE_WRITES", "true").lower() == "true"
+
+# The unit of work writing on this context (app.database.run_db sets one per
+# call); outside of it the gate falls back to the thread or event-loop task
+write_owner: ContextVar = ContextVar("sqlite_write_owner", default=None)
+
+WRITE_STATEMENT = re.compile(r"^\s*(INSERT|UPDATE|DELETE|REPLACE|CREATE|DROP|ALTER)\b", re.IGNORECASE)
+
+
+def sqlite_pragmas() -> list[str]:
+    return [
+        f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}",
+        f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}",
+        f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}",
+        f"PRAGMA cache_size={SQLITE_CACHE_SIZE}",
+        f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}",
+    ]
+
+
+class WriteGate:
+    """
+    One write transaction at a time per database. A connection takes the
+    gate before its first write statement and returns it when it goes back
+    to the pool, i.e. once the transaction has committed or rolled back.
+    Threads wait on a lock; event-loop connections (aiosqlite) wait on an
+    asyncio lock so they never block the loop.
+
+    The gate remembers its holder: the `write_owner` of the run_db call
+    that took it, else the thread or task. A second connection writing for
+    the same holder could only be let in by itself, so it fails at once
+    instead of waiting out the timeout. Pooled threads serve many requests,
+    so the thread alone does not identify a holder inside a request.
+    """
+
+    def __init__(self, timeout: float = SQLITE_BUSY_TIMEOUT_MS / 1000):
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._async_lock = None
+        self._owner = None
+        self._stats_lock = threading.Lock()
+        self.acquired = 0
+        self.timeouts = 0
+        self.self_deadlocks = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    @staticmethod
+    def caller(is_async: bool):
+        owner = write_owner.get()
+        if owner is not None:
+            return owner
+        return asyncio.current_task() if is_async else threading.get_ident()
+
+    def acquire(self, is_async: bool) -> bool:
+        caller = self.caller(is_async)
+        if caller is not None and self._owner == caller:
+            with self._stats_lock:
+                self.self_deadlocks += 1
+            return False
+        start = time.perf_counter()
+        if is_async:
+            if self._async_lock is None:
+                self._async_lock = asyncio.Lock()
+            try:
+                await_only(asyncio.wait_for(self._async_lock.acquire(), self.timeout))
+                got = True
+            except asyncio.TimeoutError:
+                got = False
+        else:
+            got = self._lock.acquire(timeout=self.timeout)
+        if got:
+            self._owner = caller
+        elapsed = time.perf_counter() - start
+        with self._stats_lock:
+            self._wait_total += elapsed
+            self._wait_max = max(self._wait_max, elapsed)
+            if got:
+                self.acquired += 1
+            else:
+                self.timeouts += 1
+        return got
+
+    def release(self, is_async: bool):
+        self._owner = None
+        if is_async:
+            self._async_lock.release()
+        else:
+            self._lock.release()
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "acquired": self.acquired,
+                "timeouts": self.timeouts,
+                "self_deadlocks": self.self_deadlocks,
+                "wait_avg_ms": self._wait_total / (self.acquired + self.timeouts) * 1000
+                if self.acquired + self.timeouts else 0.0,
+                "wait_max_ms": self._wait_max * 1000,
+            }
+
+
+def configure_sqlite(engine, serialize_writes: bool = SQLITE_SERIALIZE_WRITES):
+    """Apply the production pragmas to every new connection; returns the write gate, if any"""
+
+    @event.listens_for(engine, "connect")
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in sqlite_pragmas():
+            cursor.execute(pragma)
+        cursor.close()
+
+    if not serialize_writes:
+        return None
+    gate = WriteGate()
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _enter_write_gate(conn, cursor, statement, parameters, context, executemany):
+        record_info = conn.connection.info
+        if "write_gate" in record_info or not WRITE_STATEMENT.match(statement):
+            return
+        is_async = conn.dialect.is_async
+        if not gate.acquire(is_async):
+            raise OperationalError(statement, parameters, sqlite3.OperationalError("database is locked"))
+        record_info["write_gate"] = is_async
+
+    def _leave_write_gate(dbapi_connection, connection_record, *args):
+        if "write_gate" in connection_record.info:
+            gate.release(connection_record.info.pop("write_gate"))
+
+    event.listen(engine, "checkin", _leave_write_gate)
+    # Invalidation wipes the record's info before checkin, so release first
+    event.listen(engine, "invalidate", _leave_write_gate)
+
+    return gate
@@ -0,0 +1,140 @@
+"""
+Throughput of the sync (threadpool) and async (USE_ASYNC_DB) request paths.
+
+Starts the API once per mode under uvicorn, then keeps `--concurrency`
+requests in flight against the read endpoints for `--duration` seconds.
+
+    python benchmarks/async_db.py --concurrency 200 --duration 15
+
+Runs against a throwaway seeded SQLite file by default; pass --postgres to
+use the DB_* settings from the environment instead (seed it first).
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def seed(workdir: str, movies: int):
+    """Create ./movie_platform.db inside workdir, like USE_SQLITE=true does"""
+    code = f"""
+from app.database import engine, Base
+from app.models import user, movie, rating, row_count
+from app.models.user import User
+from app.models.movie import Movie
+Base.metadata.create_all(bind=engine)
+with engine.begin() as connection:
+    connection.execute(User.__table__.insert().values(id=1, username="bench", email="bench@example.com", password_hash="x"))
+    connection.execute(Movie.__table__.insert(), [
+        {{"title": f"Movie {{i}}", "genre": "Drama", "release_year": 1950 + i % 70,
+          "description": f"Benchmark movie number {{i}}", "created_by": 1}}
+        for i in range({movies})
+    ])
+"""
+    env = {**os.environ, "USE_SQLITE": "true", "PYTHONPATH": BACKEND_DIR}
+    subprocess.run([sys.executable, "-c", code], cwd=workdir, env=env, check=True)
+
+
+async def wait_until_up(client: httpx.AsyncClient, timeout: float = 20):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+async def load(base_url: str, concurrency: int, duration: float, movies: int) -> dict:
+    latencies = []
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        await wait_until_up(client)
+        deadline = time.monotonic() + duration
+
+        async def worker():
+            nonlocal errors
+            while time.monotonic() < deadline:
+                if random.random() < 0.5:
+                    url = f"/api/movies/?limit=20&page={random.randint(1, max(1, movies // 20))}"
+                else:
+                    url = f"/api/movies/{random.randint(1, movies)}"
+                start = time.perf_counter()
+                try:
+                    response = await client.get(url)
+                    if response.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        started = time.monotonic()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.monotonic() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+def run_mode(use_async: bool, args, workdir: str, port: int) -> dict:
+    env = {
+        **os.environ,
+        "PYTHONPATH": BACKEND_DIR,
+        "USE_ASYNC_DB": "true" if use_async else "false",
+        "DB_POOL_SIZE": str(args.pool_size),
+        "DB_MAX_OVERFLOW": "0",
+    }
+    if not args.postgres:
+        env["USE_SQLITE"] = "true"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=workdir,
+        env=env,
+    )
+    try:
+        return asyncio.run(load(f"http://127.0.0.1:{port}", args.concurrency, args.duration, args.movies))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--movies", type=int, default=5000)
+    parser.add_argument("--pool-size", type=int, default=20)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--postgres", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        if not args.postgres:
+            seed(workdir, args.movies)
+        print(f"{'mode':<6} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9}")
+        for name, use_async in (("sync", False), ("async", True)):
+            result = run_mode(use_async, args, workdir, args.port)
+            print(f"{name:<6} {result['requests']:>9} {result['errors']:>7} {result['rps']:>9.1f} "
+                  f"{result['p50_ms']:>9.1f} {result['p99_ms']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Movie import throughput: one create_movie() per row (what POST /api/movies/
+does) against the streaming bulk path (app/bulk_import.py plus batched
+create_movies()).
+
+    PYTHONPATH=. python benchmarks/bulk_import.py --rows 20000 --batch-sizes 100 1000 5000
+
+Runs against a throwaway SQLite file, so the numbers include the FTS and
+row-count triggers but not network round trips; on PostgreSQL the
+per-row path also pays one round trip per statement.
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.bulk_import import import_movies
+from app.crud.movie import create_movie, create_movies
+from app.models import user, movie, rating, row_count
+from app.models.user import User
+from app.schemas.movie import MovieCreate
+
+
+def make_body(rows: int) -> bytes:
+    genres = ("Drama", "Comedy", "Sci-Fi", "Horror", "Western")
+    return "".join(
+        json.dumps({
+            "title": f"Imported movie {i}", "genre": genres[i % len(genres)], "release_year": 1950 + i % 70,
+            "description": f"Plot summary {i}: a stranger arrives in town.",
+        }) + "\n"
+        for i in range(rows)
+    ).encode()
+
+
+async def chunks(body: bytes, size: int = 64 * 1024):
+    for i in range(0, len(body), size):
+        yield body[i:i + size]
+
+
+def fresh_session(path: str):
+    if os.path.exists(path):
+        os.remove(path)
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.add(User(id=1, username="bench", email="bench@example.com", password_hash="x"))
+    db.commit()
+    return engine, db
+
+
+def per_row(path: str, body: bytes) -> float:
+    engine, db = fresh_session(path)
+    start = time.perf_counter()
+    for line in body.splitlines():
+        create_movie(db, MovieCreate.model_validate_json(line), user_id=1)
+    elapsed = time.perf_counter() - start
+    db.close()
+    engine.dispose()
+    return elapsed
+
+
+def bulk(path: str, body: bytes, batch_size: int) -> float:
+    engine, db = fresh_session(path)
+
+    async def write(batch):
+        return create_movies(db, batch, user_id=1)
+
+    start = time.perf_counter()
+    asyncio.run(import_movies(chunks(body), "ndjson", write, batch_size=batch_size))
+    elapsed = time.perf_counter() - start
+    db.close()
+    engine.dispose()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--per-row-rows", type=int, default=2000, help="rows for the (slow) per-row baseline")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[100, 1000, 5000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "import.db")
+        print(f"{'path':<18} {'rows':>8} {'seconds':>8} {'rows/s':>10}")
+        elapsed = per_row(path, make_body(args.per_row_rows))
+        print(f"{'per-row':<18} {args.per_row_rows:>8} {elapsed:>8.2f} {args.per_row_rows / elapsed:>10.0f}")
+        body = make_body(args.rows)
+        for batch_size in args.batch_sizes:
+            elapsed = bulk(path, body, batch_size)
+            print(f"{f'bulk batch={batch_size}':<18} {args.rows:>8} {elapsed:>8.2f} {args.rows / elapsed:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Bytes on the wire and encoding CPU per movie page, for each response
+representation the API can negotiate.
+
+    PYTHONPATH=. python benchmarks/compression.py --page-sizes 10 50 100
+
+JSON and MessagePack bodies come from the real serialization path
+(app/responses.py); gzip and brotli use the middleware's encoder at its
+configured level/quality. "us" is the encoding cost alone, best of
+--repeat runs.
+"""
+import argparse
+import time
+from datetime import datetime, timezone
+
+import msgpack
+
+from app.compression import encode
+from app.models import user, movie, rating, row_count
+from app.models.movie import Movie
+from app.responses import json_response, movie_list_adapter
+
+
+def make_rows(n: int) -> list[Movie]:
+    now = datetime.now(timezone.utc)
+    genres = ("Drama", "Comedy", "Sci-Fi", "Horror", "Western")
+    return [
+        Movie(
+            id=i, title=f"Movie title number {i}", genre=genres[i % len(genres)], release_year=1950 + i % 70,
+            description=f"Plot summary {i}: " + "a stranger arrives in town and nothing is the same. " * 4,
+            created_by=1 + i % 20, created_at=now, ratings_count=i % 50, ratings_avg=round(1 + i % 40 / 10, 2),
+        )
+        for i in range(1, n + 1)
+    ]
+
+
+def best_time(fn, iterations: int, repeat: int) -> float:
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        runs.append(time.perf_counter() - start)
+    return min(runs) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-sizes", type=int, nargs="+", default=[10, 50, 100])
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'page':>5} {'representation':<16} {'bytes':>8} {'ratio':>6} {'us':>8}")
+    for size in args.page_sizes:
+        response = json_response(movie_list_adapter, {"movies": make_rows(size), "limit": size})
+        body = response.body
+        packed = msgpack.packb(response.adapter.dump_python(response.model, mode="json"))
+        variants = [
+            ("json", body, None),
+            ("json+gzip", body, "gzip"),
+            ("json+br", body, "br"),
+            ("msgpack", packed, None),
+            ("msgpack+gzip", packed, "gzip"),
+            ("msgpack+br", packed, "br"),
+        ]
+        for name, data, encoding in variants:
+            if encoding is None:
+                wire, cost = data, 0.0
+            else:
+                wire = encode(encoding, data)
+                cost = best_time(lambda: encode(encoding, data), args.iterations, args.repeat)
+            print(f"{size:>5} {name:<16} {len(wire):>8} {len(body) / len(wire):>5.1f}x {cost:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
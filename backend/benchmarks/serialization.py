@@ -0,0 +1,110 @@
+"""
+Per-page serialization cost of the movie list response.
+
+    python benchmarks/serialization.py --page-size 100 --iterations 2000
+
+"validated" is the old path: a response model inheriting the input
+validators, built in the route and then re-validated and encoded by
+FastAPI's response_model handling. "orjson" builds the read model once and
+dumps it with orjson. "adapter" is what the read endpoints do now
+(app/responses.py): one TypeAdapter pass from ORM rows to JSON bytes.
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+import orjson
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from pydantic import BaseModel
+
+from app.models import user, movie, rating, row_count
+from app.models.movie import Movie
+from app.responses import json_response, movie_list_adapter
+from app.schemas.movie import MovieBase, MovieListResponse
+
+
+class ValidatedMovieResponse(MovieBase):
+    """The response model as it was: every input validator runs on output"""
+    id: int
+    created_by: int
+    created_at: datetime
+    ratings_count: int
+    ratings_avg: float
+
+    class Config:
+        from_attributes = True
+
+
+class ValidatedMovieListResponse(BaseModel):
+    movies: list[ValidatedMovieResponse]
+    total: Optional[int] = None
+    page: Optional[int] = None
+    limit: int
+    total_pages: Optional[int] = None
+    next_cursor: Optional[str] = None
+    count_strategy: str = "exact"
+
+
+def make_rows(n: int) -> list[Movie]:
+    now = datetime.now(timezone.utc)
+    return [
+        Movie(
+            id=i, title=f"Movie &amp; Sequel {i}", genre="Sci-Fi", release_year=1990 + i % 30,
+            description="A long description of the plot. " * 10, created_by=1, created_at=now,
+            ratings_count=i % 50, ratings_avg=3.5,
+        )
+        for i in range(1, n + 1)
+    ]
+
+
+def page(rows):
+    return {"movies": rows, "total": 1000, "page": 1, "limit": len(rows), "total_pages": 10}
+
+
+loop = asyncio.new_event_loop()
+
+
+def validated(rows, field):
+    content = ValidatedMovieListResponse(**page(rows))
+    encoded = loop.run_until_complete(serialize_response(field=field, response_content=content, is_coroutine=True))
+    return json.dumps(encoded).encode()
+
+
+def orjson_dump(rows, field):
+    return orjson.dumps(MovieListResponse.model_validate(page(rows), from_attributes=True).model_dump(mode="json"))
+
+
+def adapter(rows, field):
+    return json_response(movie_list_adapter, page(rows)).body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5, help="Report the best of this many runs")
+    args = parser.parse_args()
+
+    rows = make_rows(args.page_size)
+    field = create_model_field(name="Response", type_=ValidatedMovieListResponse, mode="serialization")
+    baseline = None
+    print(f"{'path':<10} {'us/page':>10} {'speedup':>8}")
+    for name, fn in (("validated", validated), ("orjson", orjson_dump), ("adapter", adapter)):
+        fn(rows, field)
+        runs = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            for _ in range(args.iterations):
+                fn(rows, field)
+            runs.append(time.perf_counter() - start)
+        per_page = min(runs) / args.iterations * 1e6
+        baseline = baseline or per_page
+        print(f"{name:<10} {per_page:>10.1f} {baseline / per_page:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Concurrent readers and writers against one SQLite file, with the stock
+connection settings and with the production profile from app/sqlite.py.
+
+    python benchmarks/sqlite_writers.py --threads 16 --duration 10
+
+Each thread mixes movie list reads with rating upserts, the same work the
+API threadpool does when several users rate at once. "locked" counts
+"database is locked" errors; the profile should keep it at zero.
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import user, movie, rating, row_count
+from app.models.user import User
+from app.models.movie import Movie
+from app.crud.movie import get_movies
+from app.crud.rating import create_or_update_rating
+from app.schemas.rating import RatingCreate
+from app.sqlite import configure_sqlite
+
+
+def seed(engine, users: int, movies: int):
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        connection.execute(User.__table__.insert(), [
+            {"id": i, "username": f"user{i}", "email": f"user{i}@example.com", "password_hash": "x"}
+            for i in range(1, users + 1)
+        ])
+        connection.execute(Movie.__table__.insert(), [
+            {"id": i, "title": f"Movie {i}", "genre": "Drama", "release_year": 1950 + i % 70, "created_by": 1}
+            for i in range(1, movies + 1)
+        ])
+
+
+def run(engine, args) -> dict:
+    Session = sessionmaker(autoflush=False, bind=engine)
+    counts = {"reads": 0, "writes": 0, "locked": 0, "other_errors": 0}
+    lock = threading.Lock()
+    deadline = time.monotonic() + args.duration
+
+    def worker():
+        local = dict.fromkeys(counts, 0)
+        while time.monotonic() < deadline:
+            db = Session()
+            try:
+                if random.random() < args.write_ratio:
+                    create_or_update_rating(
+                        db,
+                        RatingCreate(rating=random.randint(1, 5)),
+                        movie_id=random.randint(1, args.movies),
+                        user_id=random.randint(1, args.users),
+                    )
+                    local["writes"] += 1
+                else:
+                    get_movies(db, skip=random.randint(0, args.movies - 20), limit=20, include_total=False)
+                    local["reads"] += 1
+            except OperationalError as e:
+                db.rollback()
+                local["locked" if "locked" in str(e.orig) else "other_errors"] += 1
+            finally:
+                db.close()
+        with lock:
+            for key, value in local.items():
+                counts[key] += value
+
+    threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    counts["ops_per_s"] = (counts["reads"] + counts["writes"]) / args.duration
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--write-ratio", type=float, default=0.3)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--movies", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'profile':<10} {'reads':>8} {'writes':>8} {'locked':>7} {'other':>6} {'ops/s':>9}")
+    for name, tuned in (("default", False), ("tuned", True)):
+        with tempfile.TemporaryDirectory() as workdir:
+            engine = create_engine(
+                f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+                connect_args={"check_same_thread": False},
+                pool_size=args.threads,
+            )
+            if tuned:
+                configure_sqlite(engine)
+            seed(engine, args.users, args.movies)
+            result = run(engine, args)
+            engine.dispose()
+        print(f"{name:<10} {result['reads']:>8} {result['writes']:>8} {result['locked']:>7} "
+              f"{result['other_errors']:>6} {result['ops_per_s']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
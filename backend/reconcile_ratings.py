@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+"""
+Recompute movie rating aggregates (count, sum, average, star histogram) from the ratings table
+"""
+
+from app.database import SessionLocal
+from app.crud.rating import reconcile_movie_ratings_stats
+import app.main  # noqa: F401  (registers all models)
+
+def main():
+    db = SessionLocal()
+    try:
+        updated = reconcile_movie_ratings_stats(db)
+        print(f"Reconciled rating aggregates for {updated} movies")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
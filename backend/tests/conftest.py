@@ -10,6 +10,10 @@ from app.auth.jwt import create_access_token, get_password_hash
 from app.models.user import User
 from app.models.movie import Movie
 from app.models.rating import Rating
+from app.counting import count_cache
+from app.auth.cache import principal_cache
+from app.read_cache import read_cache
+from app.leaderboard import leaderboard
 
 # Test database setup
 SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
@@ -22,10 +26,19 @@ engine = create_engine(
 
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+@pytest.fixture(autouse=True)
+def internal_endpoints_open(monkeypatch):
+    # Tests run like a development setup; guard tests close this again
+    monkeypatch.setattr("app.auth.dependencies.INTERNAL_ENDPOINTS_OPEN", True)
+
 @pytest.fixture(scope="function")
 def db_session():
     # Create the tables
     Base.metadata.create_all(bind=engine)
+    count_cache.clear()
+    principal_cache.clear()
+    read_cache.clear()
+    leaderboard.reset()
     
     db = TestingSessionLocal()
     try:
@@ -0,0 +1,136 @@
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.main import app
+from app.database import Base, get_db
+from app.auth.jwt import create_access_token, get_password_hash
+from app.models.user import User
+from app.counting import count_cache
+from app.auth.cache import principal_cache
+from app.read_cache import read_cache
+from app.leaderboard import leaderboard
+
+pytest.importorskip("aiosqlite")
+
+
+@pytest.fixture
+def async_client(tmp_path):
+    """Client whose requests get an AsyncSession on aiosqlite, as with USE_ASYNC_DB=true"""
+    url = f"sqlite:///{tmp_path / 'async.db'}"
+    sync_engine = create_engine(url)
+    Base.metadata.create_all(bind=sync_engine)
+    with sync_engine.begin() as connection:
+        connection.execute(User.__table__.insert().values(
+            username="asyncuser",
+            email="async@example.com",
+            password_hash=get_password_hash("testpassword"),
+        ))
+    count_cache.clear()
+    principal_cache.clear()
+    read_cache.clear()
+    leaderboard.reset()
+
+    async_engine = create_async_engine(url.replace("sqlite://", "sqlite+aiosqlite://"), poolclass=NullPool)
+    AsyncTestingSession = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    async def override_get_db():
+        async with AsyncTestingSession() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    with TestClient(app) as client:
+        yield client
+    app.dependency_overrides.clear()
+    sync_engine.dispose()
+
+
+class TestAsyncSessionPath:
+    def test_movie_and_rating_flow(self, async_client):
+        """Test the endpoints work end to end on an AsyncSession"""
+        headers = {"Authorization": f"Bearer {create_access_token(data={'sub': 'asyncuser'})}"}
+        response = async_client.post("/api/movies/", json={
+            "title": "Async Movie",
+            "genre": "Drama",
+            "release_year": 2021,
+            "description": "Served without the threadpool"
+        }, headers=headers)
+        assert response.status_code == status.HTTP_200_OK
+        movie_id = response.json()["id"]
+
+        response = async_client.post(f"/api/movies/{movie_id}/ratings", json={"rating": 4}, headers=headers)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["username"] == "asyncuser"
+
+        response = async_client.get("/api/movies/", params={"search": "async"})
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["total"] == 1
+        assert data["movies"][0]["ratings_avg"] == 4.0
+
+        response = async_client.get(f"/api/movies/{movie_id}/ratings")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["ratings"][0]["rating"] == 4
+
+    def test_delete_movie(self, async_client):
+        """Test ownership check and delete run on the async session"""
+        headers = {"Authorization": f"Bearer {create_access_token(data={'sub': 'asyncuser'})}"}
+        response = async_client.post("/api/movies/", json={
+            "title": "Short Lived",
+            "genre": "Drama",
+            "release_year": 2021
+        }, headers=headers)
+        movie_id = response.json()["id"]
+
+        response = async_client.delete(f"/api/movies/{movie_id}", headers=headers)
+        assert response.status_code == status.HTTP_200_OK
+        assert async_client.get(f"/api/movies/{movie_id}").status_code == status.HTTP_404_NOT_FOUND
+
+    def test_missing_movie_rating(self, async_client):
+        """Test a rating for an unknown movie is a 404 on the async path too"""
+        headers = {"Authorization": f"Bearer {create_access_token(data={'sub': 'asyncuser'})}"}
+        response = async_client.post("/api/movies/999/ratings", json={"rating": 4}, headers=headers)
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    @pytest.mark.asyncio
+    async def test_concurrent_reads_coalesce(self, async_client, monkeypatch):
+        """Test identical concurrent reads share one run_sync() execution on the async path"""
+        import asyncio
+        import httpx
+        from app.api.endpoints import movies
+
+        headers = {"Authorization": f"Bearer {create_access_token(data={'sub': 'asyncuser'})}"}
+        movie_id = async_client.post("/api/movies/", json={
+            "title": "Popular", "genre": "Drama", "release_year": 2021
+        }, headers=headers).json()["id"]
+        calls = 0
+        real = movies.get_ratings_by_movie
+
+        def counting(*args, **kwargs):
+            nonlocal calls
+            calls += 1
+            return real(*args, **kwargs)
+        monkeypatch.setattr(movies, "get_ratings_by_movie", counting)
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            responses = await asyncio.gather(*(http.get(f"/api/movies/{movie_id}/ratings") for _ in range(10)))
+
+        assert all(response.status_code == status.HTTP_200_OK for response in responses)
+        assert calls == 1
+
+    def test_streaming_export(self, async_client):
+        """Test exports stream from an AsyncSession"""
+        headers = {"Authorization": f"Bearer {create_access_token(data={'sub': 'asyncuser'})}"}
+        for title in ("One", "Two", "Three"):
+            async_client.post("/api/movies/", json={"title": title, "genre": "Drama", "release_year": 2021}, headers=headers)
+
+        response = async_client.get("/api/export/movies", params={"format": "csv"})
+
+        assert response.status_code == status.HTTP_200_OK
+        lines = response.text.splitlines()
+        assert lines[0].startswith("id,title,")
+        assert [line.split(",")[1] for line in lines[1:]] == ["One", "Two", "Three"]
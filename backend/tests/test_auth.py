@@ -149,4 +149,89 @@ class TestAuthenticationFlow:
             "description": "A test movie"
         }, headers=auth_headers)
         
-        assert response.status_code == status.HTTP_200_OK
\ No newline at end of file
+        assert response.status_code == status.HTTP_200_OK
+
+class TestPrincipalCache:
+    def test_repeat_requests_hit_cache(self, client, auth_headers):
+        """Test the second request with a token skips verification and lookup"""
+        from app.auth.cache import principal_cache
+
+        movie = {"title": "Cached", "genre": "Drama", "release_year": 2020}
+        client.post("/api/movies/", json=movie, headers=auth_headers)
+        before = principal_cache.stats()
+        response = client.post("/api/movies/", json=movie, headers=auth_headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        after = principal_cache.stats()
+        assert after["hits"] == before["hits"] + 1
+        assert after["misses"] == before["misses"]
+
+    def test_deleted_user_is_evicted(self, client, auth_headers, db_session, test_user):
+        """Test deleting a user invalidates their cached principal"""
+        url = f"/api/users/{test_user.id}/ratings"
+        assert client.get(url, headers=auth_headers).status_code == status.HTTP_200_OK
+
+        db_session.delete(test_user)
+        db_session.commit()
+
+        response = client.get(url, headers=auth_headers)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+class TestPasswordHashing:
+    def test_login_verifies_on_hash_pool(self, client, test_user):
+        """Test login verifies the password on the hashing executor"""
+        from app.auth.hashing import password_hasher
+
+        before = password_hasher.stats()["completed"]
+        response = client.post("/api/auth/login", json={
+            "email": "test@example.com",
+            "password": "testpassword"
+        })
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["user"]["username"] == "testuser"
+        stats = password_hasher.stats()
+        assert stats["completed"] == before + 1
+        assert stats["in_flight"] == 0
+
+    def test_register_hashes_on_hash_pool(self, client):
+        """Test registration stores a hash produced by the hashing executor"""
+        response = client.post("/api/auth/register", json={
+            "username": "pooleduser",
+            "email": "pooled@example.com",
+            "password": "StrongPass123!"
+        })
+
+        assert response.status_code == status.HTTP_200_OK
+        login = client.post("/api/auth/login", json={
+            "email": "pooled@example.com",
+            "password": "StrongPass123!"
+        })
+        assert login.status_code == status.HTTP_200_OK
+
+    def test_process_workers_are_spawned(self):
+        """Test the process executor spawns its workers instead of forking the threaded server"""
+        import asyncio
+        from app.auth.hashing import PasswordHasher
+
+        hasher = PasswordHasher(mode="process", workers=1)
+        executor = hasher._get_executor()
+        try:
+            assert executor._mp_context.get_start_method() == "spawn"
+            assert asyncio.run(hasher.verify("secret", asyncio.run(hasher.hash("secret"))))
+        finally:
+            executor.shutdown()
+
+    def test_saturated_hash_pool_fails_fast(self, client, test_user, monkeypatch):
+        """Test login sheds load with 503 when the hashing pool is full"""
+        from app.auth.hashing import password_hasher
+
+        monkeypatch.setattr(password_hasher, "workers", 0)
+        monkeypatch.setattr(password_hasher, "queue_size", 0)
+        response = client.post("/api/auth/login", json={
+            "email": "test@example.com",
+            "password": "testpassword"
+        })
+
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response.headers["Retry-After"] == "1"
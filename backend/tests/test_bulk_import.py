@@ -0,0 +1,169 @@
+import asyncio
+import json
+
+from fastapi import status
+
+from app.bulk_import import csv_records, import_movies, lines, ndjson_records
+from app.models.movie import Movie
+
+
+def ndjson(*rows) -> str:
+    return "\n".join(row if isinstance(row, str) else json.dumps(row) for row in rows) + "\n"
+
+
+async def chunked(data: bytes, size: int):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+async def collect(agen) -> list:
+    return [item async for item in agen]
+
+
+class TestBulkImportEndpoint:
+    def test_ndjson_import(self, client, auth_headers, db_session, test_user):
+        """Test valid NDJSON rows are inserted and reported with throughput"""
+        body = ndjson(
+            {"title": "First", "genre": "Drama", "release_year": 2001},
+            {"title": "Second", "genre": "Comedy", "release_year": 2002, "description": "Funny"},
+        )
+        response = client.post(
+            "/api/movies/bulk", content=body,
+            headers={**auth_headers, "Content-Type": "application/x-ndjson"}
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        report = response.json()
+        assert report["inserted"] == 2
+        assert report["failed"] == 0
+        assert report["rows_per_second"] > 0
+        movies = db_session.query(Movie).order_by(Movie.id).all()
+        assert [m.title for m in movies] == ["First", "Second"]
+        assert all(m.created_by == test_user.id and m.version == 1 for m in movies)
+
+    def test_invalid_rows_are_reported(self, client, auth_headers, db_session):
+        """Test invalid rows are skipped and reported by row number"""
+        body = ndjson(
+            {"title": "Good", "genre": "Drama", "release_year": 2001},
+            {"title": "", "genre": "Drama", "release_year": 2001},
+            "not json",
+            "",
+            {"title": "Old", "genre": "Drama", "release_year": 1500},
+            [1, 2],
+        )
+        report = client.post(
+            "/api/movies/bulk", content=body,
+            headers={**auth_headers, "Content-Type": "application/x-ndjson"}
+        ).json()
+
+        assert report["rows"] == 5
+        assert report["inserted"] == 1
+        assert [error["row"] for error in report["errors"]] == [2, 3, 4, 5]
+        assert report["errors"][2]["errors"][0]["loc"] == ["release_year"]
+        assert db_session.query(Movie).count() == 1
+
+    def test_csv_import(self, client, auth_headers, db_session):
+        """Test CSV bodies with quoted, multi-line and empty values"""
+        body = (
+            "title,genre,release_year,description\r\n"
+            'Heat,Crime,1995,"Cops, robbers\nand coffee"\r\n'
+            "Alien,Horror,1979,\r\n"
+            "Broken,Drama\r\n"
+        )
+        report = client.post(
+            "/api/movies/bulk", content=body.encode(),
+            headers={**auth_headers, "Content-Type": "text/csv"}
+        ).json()
+
+        assert report["inserted"] == 2
+        assert [error["row"] for error in report["errors"]] == [3]
+        heat, alien = db_session.query(Movie).order_by(Movie.id).all()
+        assert heat.description == "Cops, robbers\nand coffee"
+        assert alien.description is None
+
+    def test_csv_missing_columns(self, client, auth_headers):
+        """Test a CSV header without the required columns is rejected"""
+        response = client.post(
+            "/api/movies/bulk", content=b"title,genre\nHeat,Crime\n",
+            headers={**auth_headers, "Content-Type": "text/csv"}
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "release_year" in response.json()["detail"]
+
+    def test_unsupported_content_type(self, client, auth_headers):
+        """Test bodies other than NDJSON or CSV are refused"""
+        response = client.post("/api/movies/bulk", json=[], headers=auth_headers)
+        assert response.status_code == status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+
+    def test_requires_authentication(self, client):
+        """Test anonymous imports are rejected"""
+        response = client.post("/api/movies/bulk", content=b"", headers={"Content-Type": "text/csv"})
+        assert response.status_code in (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN)
+
+    def test_import_invalidates_lists(self, client, auth_headers):
+        """Test cached list pages and counts see imported movies"""
+        assert client.get("/api/movies/").json()["total"] == 0
+
+        client.post(
+            "/api/movies/bulk", content=ndjson({"title": "New", "genre": "Drama", "release_year": 2001}),
+            headers={**auth_headers, "Content-Type": "application/x-ndjson"}
+        )
+
+        data = client.get("/api/movies/").json()
+        assert data["total"] == 1
+        assert data["movies"][0]["title"] == "New"
+
+
+class TestStreamingParser:
+    def test_lines_across_chunks(self):
+        """Test lines split across chunk boundaries, CRLF and multi-byte characters"""
+        data = "﻿Amélie\r\nSecond line\nlast".encode()
+        assert asyncio.run(collect(lines(chunked(data, 3)))) == ["Amélie", "Second line", "last"]
+
+    def test_batches_are_bounded(self):
+        """Test rows are written in batches of at most batch_size"""
+        batches = []
+
+        async def write(batch):
+            batches.append(len(batch))
+            return len(batch)
+
+        body = ndjson(*({"title": f"M{i}", "genre": "Drama", "release_year": 2000} for i in range(25))).encode()
+        report = asyncio.run(import_movies(chunked(body, 64), "ndjson", write, batch_size=10))
+
+        assert batches == [10, 10, 5]
+        assert report.inserted == 25
+        assert report.batches == 3
+
+    def test_unterminated_quote(self):
+        """Test a quoted value left open at the end of the body is a row error"""
+        records = asyncio.run(collect(csv_records(lines(chunked(b'title,genre,release_year\n"Open,Drama,2000\n', 8)))))
+        assert len(records) == 1
+        assert records[0].errors[0]["type"] == "csv_quote"
+
+    def test_literal_quote_in_unquoted_value(self):
+        """Test a quote inside an unquoted value is literal and does not swallow later rows"""
+        body = (
+            'title,genre,release_year\n'
+            'The 12" Single,Drama,2001\n'
+            '"Quoted ""twice""",Drama,2002\n'
+            'After,Drama,2003\n'
+        ).encode()
+        records = asyncio.run(collect(csv_records(lines(chunked(body, 5)))))
+        assert [record["title"] for record in records] == ['The 12" Single', 'Quoted "twice"', "After"]
+
+    def test_long_lines_are_reported_not_buffered(self):
+        """Test a line or quoted value past the length cap becomes a row error and parsing resumes"""
+        body = b"".join([
+            b"title,genre,release_year\n",
+            b"x" * 200 + b",Drama,2000\n",
+            b'"Open' + b"\nmore text" * 20 + b'",Drama,2001\n',
+            b"Kept,Drama,2002",
+        ])
+        records = asyncio.run(collect(csv_records(lines(chunked(body, 16), max_length=64), max_length=64)))
+        assert [record.errors[0]["type"] for record in records[:2]] == ["line_too_long", "line_too_long"]
+        assert records[2]["title"] == "Kept"
+
+        records = asyncio.run(collect(ndjson_records(lines(chunked(b"{" + b" " * 200 + b"}\n{}", 16), max_length=64))))
+        assert records[0].errors[0]["type"] == "line_too_long"
+        assert records[1] == {}
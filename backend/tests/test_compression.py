@@ -0,0 +1,96 @@
+import gzip
+
+import brotli
+import msgpack
+import pytest
+from fastapi import status
+
+
+@pytest.fixture
+def movies(client, auth_headers):
+    for i in range(30):
+        client.post(
+            "/api/movies/",
+            json={"title": f"Movie {i}", "genre": "Drama", "release_year": 2000, "description": "A plot. " * 20},
+            headers=auth_headers,
+        )
+
+
+class TestResponseCompression:
+    def test_brotli_preferred(self, client, movies):
+        """Test large pages are brotli-encoded when the client accepts it"""
+        response = client.get("/api/movies/", params={"limit": 30}, headers={"Accept-Encoding": "gzip, br"})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-encoding"] == "br"
+        assert "Accept-Encoding" in response.headers["vary"]
+        assert len(response.json()["movies"]) == 30
+
+    def test_gzip_by_qvalue(self, client, movies):
+        """Test q-values decide between codings and q=0 refuses one"""
+        response = client.get("/api/movies/", params={"limit": 30}, headers={"Accept-Encoding": "br;q=0, gzip"})
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert int(response.headers["content-length"]) < len(response.content)
+
+    def test_small_responses_not_compressed(self, client):
+        """Test bodies under the threshold go out as they are"""
+        response = client.get("/health", headers={"Accept-Encoding": "gzip, br"})
+
+        assert "content-encoding" not in response.headers
+        assert response.json()["status"] == "healthy"
+
+    def test_no_accept_encoding(self, client, movies):
+        """Test clients that do not ask for compression get identity"""
+        response = client.get("/api/movies/", params={"limit": 30}, headers={"Accept-Encoding": "identity"})
+
+        assert "content-encoding" not in response.headers
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("encoding,decode", [("gzip", gzip.decompress), ("br", brotli.decompress)])
+    async def test_streaming_bodies_are_flushed_per_chunk(self, encoding, decode):
+        """Test streamed responses are encoded incrementally, one decodable stream"""
+        from app.compression import CompressionMiddleware
+
+        chunks = [b'{"n": %d}\n' % i * 50 for i in range(3)]
+
+        async def app(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200,
+                        "headers": [(b"content-type", b"application/x-ndjson")]})
+            for chunk in chunks:
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "headers": [(b"accept-encoding", encoding.encode())]}
+        await CompressionMiddleware(app)(scope, None, send)
+
+        headers = dict(sent[0]["headers"])
+        assert headers[b"content-encoding"] == encoding.encode()
+        assert b"content-length" not in headers
+        bodies = [message["body"] for message in sent[1:]]
+        assert all(bodies[:3])  # every chunk produced output immediately
+        assert decode(b"".join(bodies)) == b"".join(chunks)
+
+
+class TestMessagePack:
+    def test_msgpack_negotiated(self, client, test_movie):
+        """Test Accept: application/msgpack returns the same document as MessagePack"""
+        json_body = client.get(f"/api/movies/{test_movie.id}").json()
+        response = client.get(f"/api/movies/{test_movie.id}", headers={"Accept": "application/msgpack"})
+
+        assert response.headers["content-type"] == "application/msgpack"
+        assert "Accept" in response.headers["vary"]
+        assert msgpack.unpackb(response.content) == json_body
+
+    def test_json_preferred_when_ranked_higher(self, client, test_movie):
+        """Test JSON stays the default unless MessagePack is ranked at least as high"""
+        response = client.get(
+            f"/api/movies/{test_movie.id}", headers={"Accept": "application/json, application/msgpack;q=0.5"}
+        )
+
+        assert response.headers["content-type"] == "application/json"
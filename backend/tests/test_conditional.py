@@ -0,0 +1,250 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+from fastapi import status
+
+from app.api.endpoints import movies as movie_endpoints
+from app.compression import strip_etag_suffixes, suffix_etag
+from app.conditional import CACHE_CONTROL_MOVIE, CACHE_CONTROL_MOVIE_LIST, etag_matches
+from app.models.movie import Movie
+from app.models.rating import Rating
+from app.read_cache import read_cache
+
+
+class TestVersionStamps:
+    def test_rating_writes_bump_movie_version(self, test_movie, test_user2, db_session):
+        """Test inserting, updating and deleting a rating each bump the movie's version"""
+        assert test_movie.version == 1
+
+        rating = Rating(movie_id=test_movie.id, user_id=test_user2.id, rating=3)
+        db_session.add(rating)
+        db_session.commit()
+        db_session.refresh(test_movie)
+        assert test_movie.version == 2
+
+        rating.review = "Better on a second viewing"
+        db_session.commit()
+        db_session.refresh(test_movie)
+        assert test_movie.version == 3
+
+        db_session.delete(rating)
+        db_session.commit()
+        db_session.refresh(test_movie)
+        assert test_movie.version == 4
+
+    def test_orm_update_bumps_version(self, test_movie, db_session):
+        """Test changing a movie through the ORM bumps its version"""
+        test_movie.title = "Renamed"
+        db_session.commit()
+        db_session.refresh(test_movie)
+
+        assert test_movie.version == 2
+        assert test_movie.updated_at is not None
+
+
+class TestMovieDetailValidators:
+    def test_etag_and_cache_headers(self, client, test_movie):
+        """Test a movie carries a strong ETag, Last-Modified and its Cache-Control"""
+        response = client.get(f"/api/movies/{test_movie.id}")
+
+        assert response.headers["etag"].startswith('"')
+        assert "last-modified" in response.headers
+        assert response.headers["cache-control"] == CACHE_CONTROL_MOVIE
+
+    def test_if_none_match_returns_304(self, client, test_movie):
+        """Test revalidating an unchanged movie returns 304 with no body"""
+        etag = client.get(f"/api/movies/{test_movie.id}").headers["etag"]
+
+        response = client.get(f"/api/movies/{test_movie.id}", headers={"If-None-Match": etag})
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+        assert response.headers["cache-control"] == CACHE_CONTROL_MOVIE
+
+    def test_304_without_loading_the_row(self, client, test_movie, monkeypatch):
+        """Test a revalidation that misses the read cache is answered from the version probe"""
+        etag = client.get(f"/api/movies/{test_movie.id}").headers["etag"]
+        read_cache.clear()
+
+        def fail(*args, **kwargs):
+            raise AssertionError("full row loaded")
+        monkeypatch.setattr(movie_endpoints, "get_movie_by_id", fail)
+
+        response = client.get(f"/api/movies/{test_movie.id}", headers={"If-None-Match": etag})
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_rating_changes_etag(self, client, test_movie, auth_headers_user2):
+        """Test a rating makes the old ETag stale"""
+        etag = client.get(f"/api/movies/{test_movie.id}").headers["etag"]
+
+        client.post(f"/api/movies/{test_movie.id}/ratings", json={"rating": 5}, headers=auth_headers_user2)
+        response = client.get(f"/api/movies/{test_movie.id}", headers={"If-None-Match": etag})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["ratings_count"] == 1
+        assert response.headers["etag"] != etag
+
+    def test_etag_differs_per_representation(self, client, test_movie):
+        """Test field selections and MessagePack get their own ETags"""
+        full = client.get(f"/api/movies/{test_movie.id}").headers["etag"]
+        narrowed = client.get(f"/api/movies/{test_movie.id}", params={"fields": "title"}).headers["etag"]
+        packed = client.get(f"/api/movies/{test_movie.id}", headers={"Accept": "application/msgpack"}).headers["etag"]
+
+        assert len({full, narrowed, packed}) == 3
+
+    def test_if_modified_since(self, client, test_movie):
+        """Test If-Modified-Since is honored when no If-None-Match is sent"""
+        later = format_datetime(datetime.now(timezone.utc) + timedelta(minutes=5), usegmt=True)
+        earlier = format_datetime(datetime.now(timezone.utc) - timedelta(days=1), usegmt=True)
+
+        assert client.get(f"/api/movies/{test_movie.id}", headers={"If-Modified-Since": later}).status_code == 304
+        assert client.get(f"/api/movies/{test_movie.id}", headers={"If-Modified-Since": earlier}).status_code == 200
+        assert client.get(
+            f"/api/movies/{test_movie.id}", headers={"If-Modified-Since": later, "If-None-Match": '"other"'}
+        ).status_code == 200
+
+    def test_missing_movie_is_404(self, client):
+        """Test revalidating a movie that does not exist is still a 404"""
+        response = client.get("/api/movies/999", headers={"If-None-Match": '"anything"'})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+class TestListValidators:
+    def test_list_revalidation(self, client, test_movie):
+        """Test an unchanged page returns 304, also after the cache is dropped"""
+        response = client.get("/api/movies/", params={"limit": 5})
+        etag = response.headers["etag"]
+        assert response.headers["cache-control"] == CACHE_CONTROL_MOVIE_LIST
+
+        assert client.get("/api/movies/", params={"limit": 5}, headers={"If-None-Match": etag}).status_code == 304
+        read_cache.clear()
+        assert client.get("/api/movies/", params={"limit": 5}, headers={"If-None-Match": etag}).status_code == 304
+
+    def test_probe_loads_ids_only(self, client, test_movie, monkeypatch):
+        """Test a revalidation miss queries only ids and versions"""
+        etag = client.get("/api/movies/").headers["etag"]
+        read_cache.clear()
+        calls = []
+        get_movies = movie_endpoints.get_movies
+
+        def recording(*args, **kwargs):
+            calls.append(kwargs["fields"])
+            return get_movies(*args, **kwargs)
+        monkeypatch.setattr(movie_endpoints, "get_movies", recording)
+
+        assert client.get("/api/movies/", headers={"If-None-Match": etag}).status_code == 304
+        assert calls == [("id",)]
+
+    def test_new_movie_changes_list_etag(self, client, test_movie, auth_headers):
+        """Test a movie joining the page changes its ETag"""
+        etag = client.get("/api/movies/").headers["etag"]
+
+        client.post("/api/movies/", json={"title": "Another", "genre": "Drama", "release_year": 2001}, headers=auth_headers)
+        response = client.get("/api/movies/", headers={"If-None-Match": etag})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.json()["movies"]) == 2
+
+    def test_rating_changes_list_etag(self, client, test_movie, auth_headers_user2):
+        """Test a rating on a movie shown on the page changes the page's ETag"""
+        etag = client.get("/api/movies/").headers["etag"]
+        read_cache.clear()
+
+        client.post(f"/api/movies/{test_movie.id}/ratings", json={"rating": 2}, headers=auth_headers_user2)
+
+        assert client.get("/api/movies/", headers={"If-None-Match": etag}).status_code == status.HTTP_200_OK
+
+    def test_cache_hit_sends_the_same_bytes(self, client, test_movie):
+        """Test a cached page is byte-identical to the response that filled the cache"""
+        first = client.get("/api/movies/", params={"genre": "Drama"})
+        second = client.get("/api/movies/", params={"genre": "Drama"})
+
+        assert (first.headers["x-cache"], second.headers["x-cache"]) == ("miss", "hit")
+        assert first.headers["etag"] == second.headers["etag"]
+        assert first.content == second.content
+        response = client.get("/api/movies/", params={"genre": "Drama"}, headers={"If-None-Match": first.headers["etag"]})
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_list_ignores_if_modified_since(self, client, db_session, test_user, auth_headers):
+        """Test pages send no Last-Modified, so a deletion shifting the page is never a 304"""
+        from app.models.movie import Movie
+
+        movies = [Movie(title=f"Movie {i}", genre="Drama", release_year=2000, created_by=test_user.id) for i in range(3)]
+        db_session.add_all(movies)
+        db_session.commit()
+        response = client.get("/api/movies/", params={"limit": 2})
+        assert "last-modified" not in response.headers
+
+        client.delete(f"/api/movies/{movies[0].id}", headers=auth_headers)
+        later = "Fri, 01 Jan 2100 00:00:00 GMT"
+        response = client.get("/api/movies/", params={"limit": 2}, headers={"If-Modified-Since": later})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [movie["title"] for movie in response.json()["movies"]] == ["Movie 1", "Movie 2"]
+
+    def test_cursor_pages(self, client, test_movie):
+        """Test cursor pages revalidate too"""
+        etag = client.get("/api/movies/", params={"cursor": ""}).headers["etag"]
+        response = client.get("/api/movies/", params={"cursor": ""}, headers={"If-None-Match": etag})
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+
+class TestRatingsValidators:
+    def test_review_edit_changes_etag(self, client, test_movie, auth_headers_user2):
+        """Test editing only a review makes the ratings page stale"""
+        client.post(f"/api/movies/{test_movie.id}/ratings", json={"rating": 4, "review": "Good"}, headers=auth_headers_user2)
+        etag = client.get(f"/api/movies/{test_movie.id}/ratings").headers["etag"]
+        assert client.get(f"/api/movies/{test_movie.id}/ratings", headers={"If-None-Match": etag}).status_code == 304
+
+        client.post(f"/api/movies/{test_movie.id}/ratings", json={"rating": 4, "review": "Great"}, headers=auth_headers_user2)
+        response = client.get(f"/api/movies/{test_movie.id}/ratings", headers={"If-None-Match": etag})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["ratings"][0]["review"] == "Great"
+
+    def test_count_strategy_is_in_the_etag(self, client, test_movie):
+        """Test bodies that differ only in count strategy get different ETags, and both revalidate"""
+        counted = client.get(f"/api/movies/{test_movie.id}/ratings")
+        reused = client.get(f"/api/movies/{test_movie.id}/ratings")
+
+        assert (counted.json()["count_strategy"], reused.json()["count_strategy"]) == ("exact", "cached")
+        assert counted.headers["etag"] != reused.headers["etag"]
+        for etag in (counted.headers["etag"], reused.headers["etag"]):
+            response = client.get(f"/api/movies/{test_movie.id}/ratings", headers={"If-None-Match": etag})
+            assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_user_ratings_are_private(self, client, test_user, auth_headers):
+        """Test a user's own ratings are not stored by shared caches"""
+        response = client.get(f"/api/users/{test_user.id}/ratings", headers=auth_headers)
+        assert response.headers["cache-control"].startswith("private")
+
+
+class TestCompressedValidators:
+    def test_compressed_etag_is_suffixed(self, client, test_user, db_session):
+        """Test a compressed page gets a coding-specific ETag that still revalidates"""
+        db_session.add_all([
+            Movie(title=f"Movie {i}", genre="Drama", release_year=2000, description="x" * 200, created_by=test_user.id)
+            for i in range(20)
+        ])
+        db_session.commit()
+
+        response = client.get("/api/movies/", params={"limit": 20}, headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["etag"].endswith('-gzip"')
+
+        revalidated = client.get(
+            "/api/movies/", params={"limit": 20},
+            headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["etag"]}
+        )
+        assert revalidated.status_code == status.HTTP_304_NOT_MODIFIED
+        assert revalidated.headers["etag"] == response.headers["etag"]
+
+    def test_etag_helpers(self):
+        """Test suffixing, stripping and weak comparison of entity tags"""
+        assert suffix_etag('"abc"', "br") == '"abc-br"'
+        assert suffix_etag('W/"abc"', "br") == 'W/"abc"'
+        assert strip_etag_suffixes('"abc-br", "def"') == ('"abc", "def"', {"br"})
+        assert etag_matches('W/"abc", "def"', '"abc"')
+        assert etag_matches("*", '"abc"')
+        assert not etag_matches('"abcd"', '"abc"')
@@ -0,0 +1,96 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta, timezone
+
+from fastapi import status
+
+from app import export
+from app.crud.movie import export_movies_query
+from app.models.movie import Movie
+from app.models.rating import Rating
+
+
+def add_movies(db_session, user, count: int):
+    db_session.add_all([
+        Movie(title=f"Movie {i}", genre="Drama", release_year=2000 + i, created_by=user.id) for i in range(count)
+    ])
+    db_session.commit()
+
+
+class TestMovieExport:
+    def test_ndjson_export(self, client, test_movie):
+        """Test movies stream as one JSON object per line"""
+        response = client.get("/api/export/movies")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        assert 'filename="movies.ndjson"' in response.headers["content-disposition"]
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert len(rows) == 1
+        assert rows[0]["title"] == "Test Movie"
+        assert rows[0]["ratings_count"] == 0
+        assert datetime.fromisoformat(rows[0]["created_at"])
+
+    def test_csv_export(self, client, db_session, test_user):
+        """Test the CSV export has a header row and one row per movie in id order"""
+        add_movies(db_session, test_user, 3)
+
+        response = client.get("/api/export/movies", params={"format": "csv"})
+
+        assert response.headers["content-type"].startswith("text/csv")
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert [row["title"] for row in rows] == ["Movie 0", "Movie 1", "Movie 2"]
+        assert rows[0]["description"] == ""
+
+    def test_since_filter(self, client, test_movie, db_session):
+        """Test `since` keeps only movies created or updated after it"""
+        future = (datetime.now(timezone.utc) + timedelta(hours=1)).isoformat()
+        past = (datetime.now(timezone.utc) - timedelta(days=1)).isoformat()
+
+        assert client.get("/api/export/movies", params={"since": future}).text == ""
+        assert len(client.get("/api/export/movies", params={"since": past}).text.splitlines()) == 1
+
+    def test_unknown_format(self, client):
+        """Test formats other than ndjson and csv are rejected"""
+        response = client.get("/api/export/movies", params={"format": "xml"})
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    def test_rows_are_encoded_in_batches(self, db_session, test_user, monkeypatch):
+        """Test the export yields one chunk per batch instead of buffering the table"""
+        add_movies(db_session, test_user, 5)
+        monkeypatch.setattr(export, "EXPORT_BATCH_SIZE", 2)
+
+        chunks = list(export.sync_chunks(db_session, export_movies_query(), "csv"))
+
+        # Header, then batches of 2, 2 and 1 rows
+        assert [chunk.count(b"\n") for chunk in chunks] == [1, 2, 2, 1]
+
+
+class TestRatingExport:
+    def test_ratings_export(self, client, test_movie, test_user2, db_session):
+        """Test ratings stream with their review and timestamps, without usernames"""
+        db_session.add(Rating(movie_id=test_movie.id, user_id=test_user2.id, rating=4, review="Solid"))
+        db_session.commit()
+
+        rows = [json.loads(line) for line in client.get("/api/export/ratings").text.splitlines()]
+
+        assert rows == [{
+            "id": rows[0]["id"], "movie_id": test_movie.id, "user_id": test_user2.id, "rating": 4,
+            "review": "Solid", "created_at": rows[0]["created_at"], "updated_at": None,
+        }]
+
+    def test_requires_internal_token(self, client, monkeypatch):
+        """Test exports are guarded like the internal endpoints"""
+        monkeypatch.setattr("app.auth.dependencies.INTERNAL_API_TOKEN", "secret")
+
+        assert client.get("/api/export/ratings").status_code == status.HTTP_403_FORBIDDEN
+        assert client.get("/api/export/ratings", headers={"X-Internal-Token": "secret"}).status_code == status.HTTP_200_OK
+
+    def test_rejected_without_configured_token(self, client, test_movie, monkeypatch):
+        """Test exports are refused when no internal token is configured"""
+        monkeypatch.setattr("app.auth.dependencies.INTERNAL_API_TOKEN", None)
+        monkeypatch.setattr("app.auth.dependencies.INTERNAL_ENDPOINTS_OPEN", False)
+
+        assert client.get("/api/export/ratings").status_code == status.HTTP_403_FORBIDDEN
+        assert client.get("/api/export/movies", params={"format": "csv"}).status_code == status.HTTP_403_FORBIDDEN
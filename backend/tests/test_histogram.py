@@ -0,0 +1,76 @@
+from fastapi import status
+from sqlalchemy import update
+
+from app.crud.rating import reconcile_movie_ratings_stats
+from app.models.movie import Movie
+from app.models.rating import Rating
+
+
+def histogram(client, movie_id: int) -> dict:
+    return client.get(f"/api/movies/{movie_id}/histogram").json()["histogram"]
+
+
+class TestStarHistogram:
+    def test_empty_histogram(self, client, test_movie):
+        """Test an unrated movie has all-zero counts"""
+        response = client.get(f"/api/movies/{test_movie.id}/histogram")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {
+            "movie_id": test_movie.id,
+            "ratings_count": 0,
+            "ratings_avg": 0.0,
+            "histogram": {"1": 0, "2": 0, "3": 0, "4": 0, "5": 0},
+        }
+
+    def test_rating_writes_move_counts(self, client, test_movie, auth_headers, auth_headers_user2):
+        """Test new and changed ratings move the counts in the same request"""
+        client.post(f"/api/movies/{test_movie.id}/ratings", json={"rating": 5}, headers=auth_headers)
+        client.post(f"/api/movies/{test_movie.id}/ratings", json={"rating": 3}, headers=auth_headers_user2)
+        assert histogram(client, test_movie.id) == {"1": 0, "2": 0, "3": 1, "4": 0, "5": 1}
+
+        client.post(f"/api/movies/{test_movie.id}/ratings", json={"rating": 1}, headers=auth_headers_user2)
+        data = client.get(f"/api/movies/{test_movie.id}/histogram").json()
+        assert data["histogram"] == {"1": 1, "2": 0, "3": 0, "4": 0, "5": 1}
+        assert data["ratings_count"] == 2
+        assert data["ratings_avg"] == 3.0
+
+    def test_orm_delete_moves_counts(self, client, test_movie, test_user2, db_session):
+        """Test deleting a rating outside the API is reflected too"""
+        rating = Rating(movie_id=test_movie.id, user_id=test_user2.id, rating=4)
+        db_session.add(rating)
+        db_session.commit()
+        assert histogram(client, test_movie.id)["4"] == 1
+
+        db_session.delete(rating)
+        db_session.commit()
+        assert histogram(client, test_movie.id)["4"] == 0
+
+    def test_revalidation(self, client, test_movie, auth_headers):
+        """Test the histogram shares the movie's version for 304s"""
+        etag = client.get(f"/api/movies/{test_movie.id}/histogram").headers["etag"]
+        headers = {"If-None-Match": etag}
+        assert client.get(f"/api/movies/{test_movie.id}/histogram", headers=headers).status_code == 304
+
+        client.post(f"/api/movies/{test_movie.id}/ratings", json={"rating": 2}, headers=auth_headers)
+        response = client.get(f"/api/movies/{test_movie.id}/histogram", headers=headers)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["histogram"]["2"] == 1
+
+    def test_missing_movie(self, client):
+        """Test an unknown movie is a 404"""
+        assert client.get("/api/movies/999/histogram").status_code == status.HTTP_404_NOT_FOUND
+
+    def test_reconcile_backfills_histogram(self, client, test_movie, test_user, test_user2, db_session):
+        """Test the set-based reconciliation rebuilds drifted counts from ratings"""
+        db_session.add_all([
+            Rating(movie_id=test_movie.id, user_id=test_user.id, rating=5),
+            Rating(movie_id=test_movie.id, user_id=test_user2.id, rating=5),
+        ])
+        db_session.commit()
+        db_session.execute(update(Movie).values(ratings_1=7, ratings_5=0))
+        db_session.commit()
+
+        reconcile_movie_ratings_stats(db_session)
+
+        assert histogram(client, test_movie.id) == {"1": 0, "2": 0, "3": 0, "4": 0, "5": 2}
@@ -0,0 +1,58 @@
+import logging
+
+from fastapi import status
+
+from app.models.movie import Movie
+from app.models.rating import Rating
+from app.instrumentation import RequestSQLStats, fingerprint
+
+
+class TestSQLInstrumentation:
+    def test_server_timing_header(self, client, test_movie):
+        """Test responses report the request's query count and SQL time"""
+        response = client.get("/api/movies/")
+
+        assert response.status_code == status.HTTP_200_OK
+        timing = response.headers["server-timing"]
+        assert timing.startswith("db;dur=")
+        assert "queries" in timing
+        assert "app;dur=" in timing
+
+    def test_fingerprint_collapses_literals(self):
+        """Test repeats of one statement with different values share a fingerprint"""
+        assert fingerprint("SELECT * FROM users WHERE id = 1") == fingerprint("SELECT *  FROM users WHERE id = 22")
+        assert fingerprint("SELECT * FROM movies WHERE id IN (?, ?, ?)") == "SELECT * FROM movies WHERE id IN (?)"
+
+        stats = RequestSQLStats()
+        for user_id in range(3):
+            stats.record(f"SELECT * FROM users WHERE id = {user_id}", 0.001)
+        assert stats.repeated(threshold=3) == [("SELECT * FROM users WHERE id = ?", 3)]
+
+    def test_query_budget_warning(self, client, test_movie, monkeypatch, caplog):
+        """Test requests over the query budget are logged"""
+        monkeypatch.setattr("app.instrumentation.SQL_WARN_QUERY_COUNT", 0)
+        with caplog.at_level(logging.WARNING, logger="app.sql"):
+            client.get(f"/api/movies/{test_movie.id}")
+
+        assert any("issued" in record.message for record in caplog.records)
+
+    def test_user_ratings_load_usernames_without_n_plus_one(
+        self, client, auth_headers, test_user, db_session, caplog
+    ):
+        """Test listing a user's ratings does not lazy-load the user per row"""
+        for i in range(6):
+            movie = Movie(title=f"Movie {i}", genre="Drama", release_year=2000 + i, created_by=test_user.id)
+            db_session.add(movie)
+            db_session.flush()
+            db_session.add(Rating(movie_id=movie.id, user_id=test_user.id, rating=4))
+        db_session.commit()
+        db_session.expire_all()
+
+        with caplog.at_level(logging.WARNING, logger="app.sql"):
+            response = client.get(f"/api/users/{test_user.id}/ratings", headers=auth_headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        ratings = response.json()["ratings"]
+        assert len(ratings) == 6
+        assert all(r["username"] == test_user.username for r in ratings)
+        assert not any("N+1" in record.message for record in caplog.records)
@@ -0,0 +1,272 @@
+import pytest
+from fastapi import status
+from sqlalchemy import text
+
+
+class TestPoolEndpoint:
+    def test_pool_status(self, client):
+        """Test the pool endpoint reports live pool state and counters"""
+        response = client.get("/internal/pool")
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        for key in ("checked_out", "overflow", "size", "checkouts", "timeouts", "wait_avg_ms", "wait_max_ms"):
+            assert key in data
+
+    def test_pool_status_requires_token_when_configured(self, client, monkeypatch):
+        """Test internal endpoints are locked behind INTERNAL_API_TOKEN"""
+        monkeypatch.setattr("app.auth.dependencies.INTERNAL_API_TOKEN", "s3cret")
+
+        assert client.get("/internal/pool").status_code == status.HTTP_403_FORBIDDEN
+        response = client.get("/internal/pool", headers={"X-Internal-Token": "s3cret"})
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_internal_endpoints_closed_without_token(self, client, monkeypatch):
+        """Test internal endpoints and metrics fail closed when no token is configured"""
+        monkeypatch.setattr("app.auth.dependencies.INTERNAL_API_TOKEN", None)
+        monkeypatch.setattr("app.auth.dependencies.INTERNAL_ENDPOINTS_OPEN", False)
+
+        for path in ("/internal/pool", "/internal/slow-queries", "/internal/cache", "/metrics"):
+            assert client.get(path).status_code == status.HTTP_403_FORBIDDEN
+            assert client.get(path, headers={"X-Internal-Token": ""}).status_code == status.HTTP_403_FORBIDDEN
+
+
+class TestStatementTimeout:
+    def test_statement_timeout_interrupts_query(self, db_session):
+        """Test a runaway statement is cancelled once it exceeds the timeout"""
+        from sqlalchemy.exc import OperationalError
+        from app.database import set_statement_timeout, is_statement_timeout
+
+        set_statement_timeout(db_session, 50)
+        with pytest.raises(OperationalError) as excinfo:
+            db_session.execute(text(
+                "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT count(*) FROM c"
+            )).scalar()
+        assert is_statement_timeout(excinfo.value)
+        db_session.rollback()
+
+        set_statement_timeout(db_session, 0)
+        assert db_session.execute(text("SELECT 1")).scalar() == 1
+
+
+class TestMetricsEndpoint:
+    def test_request_metrics_use_route_template(self, client, test_movie):
+        """Test request counters and latency histograms are labelled by route template"""
+        from app.metrics import registry
+        registry.clear()
+
+        client.get(f"/api/movies/{test_movie.id}")
+        client.get("/api/movies/999999")
+        response = client.get("/metrics")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        body = response.text
+        assert 'http_requests_total{method="GET",route="/api/movies/{movie_id}",status="200"} 1' in body
+        assert 'http_requests_total{method="GET",route="/api/movies/{movie_id}",status="404"} 1' in body
+        assert 'http_request_duration_seconds_bucket{method="GET",route="/api/movies/{movie_id}",le="+Inf"} 2' in body
+        assert 'http_request_duration_seconds_count{method="GET",route="/api/movies/{movie_id}"} 2' in body
+        # The scrape itself is in flight while rendering
+        assert 'http_requests_in_progress{method="GET"} 1' in body
+        for name in ("db_pool_checkouts_total", "password_hash_queue_depth", "principal_cache_hits_total"):
+            assert f"\n{name} " in body
+
+    def test_unmatched_paths_share_a_label(self, client):
+        """Test unknown paths cannot create unbounded label values"""
+        from app.metrics import registry
+        registry.clear()
+
+        client.get("/no/such/path")
+        client.get("/another/missing/path")
+        body = client.get("/metrics").text
+
+        assert 'http_requests_total{method="GET",route="unmatched",status="404"} 2' in body
+
+    def test_shards_are_summed_across_threads(self):
+        """Test counters written from several threads are all collected"""
+        import threading
+        from app.metrics import MetricsRegistry
+
+        registry = MetricsRegistry()
+
+        def work():
+            for _ in range(1000):
+                registry.inc("hits")
+                registry.observe("latency", (), 0.02)
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        counters, _, histograms = registry.collect()
+        assert counters[("hits", ())] == 4000
+        assert sum(histograms[("latency", ())][:-1]) == 4000
+
+
+class TestSlowQueryLog:
+    def test_slow_query_plan_captured(self, tmp_path, monkeypatch):
+        """Test slow statements are recorded with parameters and an out-of-band query plan"""
+        from sqlalchemy import create_engine
+        from app.database import Base
+        from app.slow_queries import slow_query_log
+
+        engine = create_engine(f"sqlite:///{tmp_path / 'slow.db'}")
+        Base.metadata.create_all(bind=engine)
+        monkeypatch.setattr(slow_query_log, "threshold_ms", 0)
+        monkeypatch.setattr(slow_query_log, "explain", True)
+        slow_query_log.clear()
+
+        with engine.connect() as connection:
+            connection.execute(text("SELECT id FROM ratings WHERE user_id = :user_id"), {"user_id": 7})
+        slow_query_log.wait()
+
+        entry = next(e for e in slow_query_log.entries() if "FROM ratings" in e["statement"])
+        assert entry["parameters"] == [7]
+        assert entry["plan_status"] == "captured"
+        assert any("ratings" in str(step) for step in entry["plan"])
+        engine.dispose()
+
+    def test_explains_are_bounded_and_reused(self, tmp_path, monkeypatch):
+        """Test repeated statements reuse one plan and explains past the pending cap are dropped"""
+        import threading
+        from sqlalchemy import create_engine
+        from app.database import Base
+        from app.slow_queries import slow_query_log
+
+        engine = create_engine(f"sqlite:///{tmp_path / 'slow.db'}")
+        Base.metadata.create_all(bind=engine)
+        monkeypatch.setattr(slow_query_log, "threshold_ms", 0)
+        monkeypatch.setattr(slow_query_log, "explain", True)
+        monkeypatch.setattr(slow_query_log, "max_pending", 1)
+        slow_query_log.clear()
+        release = threading.Event()
+        explain_sync = slow_query_log._explain_sync
+
+        def blocked(*args):
+            release.wait(5)
+            explain_sync(*args)
+        monkeypatch.setattr(slow_query_log, "_explain_sync", blocked)
+
+        with engine.connect() as connection:
+            for user_id in (1, 2):
+                connection.execute(text("SELECT id FROM ratings WHERE user_id = :user_id"), {"user_id": user_id})
+            connection.execute(text("SELECT id FROM movies WHERE genre = :genre"), {"genre": "Drama"})
+        release.set()
+        slow_query_log.wait()
+
+        first, repeat, other = [
+            next(e for e in reversed(slow_query_log.entries()) if e["parameters"] == [value])
+            for value in (1, 2, "Drama")
+        ]
+        assert first["plan_status"] == "captured"
+        assert (repeat["plan_status"], repeat["plan_from"], repeat["plan"]) == ("reused", first["id"], first["plan"])
+        assert other["plan_status"] == "dropped"
+        engine.dispose()
+
+    def test_credentials_are_not_logged(self):
+        """Test parameters of statements touching passwords are redacted"""
+        from app.slow_queries import safe_parameters
+
+        assert safe_parameters("INSERT INTO users (username, password_hash) VALUES (?, ?)", ("a", "b")) == "[redacted]"
+        assert safe_parameters("SELECT * FROM movies WHERE id = ?", (1,)) == [1]
+
+    def test_slow_query_endpoint(self, client, test_movie, monkeypatch):
+        """Test the buffer is served with the originating route, as JSON and JSONL"""
+        import json
+        from app.slow_queries import slow_query_log
+
+        monkeypatch.setattr(slow_query_log, "threshold_ms", 0)
+        monkeypatch.setattr(slow_query_log, "explain", False)
+        slow_query_log.clear()
+
+        client.get(f"/api/movies/{test_movie.id}")
+        response = client.get("/internal/slow-queries")
+
+        assert response.status_code == status.HTTP_200_OK
+        routes = {entry["route"] for entry in response.json()["queries"]}
+        assert "GET /api/movies/{movie_id}" in routes
+
+        response = client.get("/internal/slow-queries", params={"format": "jsonl"})
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [entry["id"] for entry in lines] == sorted(entry["id"] for entry in lines)
+
+
+class TestRequestProfiling:
+    @pytest.fixture
+    def profiling(self, tmp_path, monkeypatch):
+        from app.profiling import profile_admission, profile_spool
+        monkeypatch.setattr("app.profiling.REQUEST_PROFILING", True)
+        monkeypatch.setattr(profile_spool, "directory", str(tmp_path))
+        profile_admission.reset()
+        yield profile_spool
+        profile_admission.reset()
+
+    def test_cprofile_artifact_is_spooled(self, client, test_movie, profiling):
+        """Test a profiled request answers normally and leaves a pstats file covering run_db work"""
+        import pstats
+
+        response = client.get(f"/api/movies/{test_movie.id}", headers={"X-Profile": "cprofile"})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["id"] == test_movie.id
+        profile_id = response.headers["x-profile-id"]
+        stats = pstats.Stats(profiling.path(profile_id))
+        assert any(func[2] == "get_movie_by_id" for func in stats.stats)
+
+        listing = client.get("/internal/profiles").json()["profiles"]
+        assert listing[0]["id"] == profile_id
+        assert client.get(f"/internal/profiles/{profile_id}").status_code == status.HTTP_200_OK
+        assert client.get("/internal/profiles/missing").status_code == status.HTTP_404_NOT_FOUND
+
+    def test_collapsed_stacks(self, client, test_movie, profiling, monkeypatch):
+        """Test the sampling mode writes collapsed stacks with counts"""
+        monkeypatch.setattr("app.profiling.PROFILE_SAMPLE_INTERVAL_MS", 0.5)
+
+        response = client.get("/api/movies/", params={"_profile": "collapsed"})
+
+        with open(profiling.path(response.headers["x-profile-id"])) as f:
+            lines = f.read().splitlines()
+        assert lines
+        stack, count = lines[0].rsplit(" ", 1)
+        assert ";" in stack and int(count) >= 1
+
+    def test_profiling_refused_without_configured_token(self, client, profiling, monkeypatch):
+        """Test no request is profiled when no internal token is configured"""
+        monkeypatch.setattr("app.auth.dependencies.INTERNAL_API_TOKEN", None)
+        monkeypatch.setattr("app.auth.dependencies.INTERNAL_ENDPOINTS_OPEN", False)
+
+        response = client.get("/health", headers={"X-Profile": "cprofile", "X-Internal-Token": "anything"})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert "x-profile-id" not in response.headers
+        assert profiling.list() == []
+
+    def test_profiling_needs_token_and_respects_rate_limit(self, client, profiling, monkeypatch):
+        """Test unauthenticated and over-limit requests run unprofiled"""
+        monkeypatch.setattr("app.auth.dependencies.INTERNAL_API_TOKEN", "s3cret")
+
+        response = client.get("/health", headers={"X-Profile": "cprofile"})
+        assert "x-profile-id" not in response.headers
+
+        headers = {"X-Profile": "cprofile", "X-Internal-Token": "s3cret"}
+        assert "x-profile-id" in client.get("/health", headers=headers).headers
+        response = client.get("/health", headers=headers)
+        assert response.headers["x-profile"] == "skipped"
+        assert len(profiling.list()) == 1
+
+    def test_spool_is_bounded(self, tmp_path):
+        """Test the oldest artifacts are pruned past the file limit"""
+        import os
+        from app.profiling import ProfileSpool
+
+        for i in range(5):
+            path = tmp_path / f"p{i}.prof"
+            path.write_bytes(b"x")
+            os.utime(path, (i, i))
+        spool = ProfileSpool(str(tmp_path), max_files=3)
+        spool.prune()
+
+        assert [entry["id"] for entry in spool.list()] == ["p4", "p3", "p2"]
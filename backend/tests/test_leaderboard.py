@@ -0,0 +1,181 @@
+from fastapi import status
+
+from app.auth.jwt import create_access_token
+from app.leaderboard import Board, Leaderboard, leaderboard
+from app.models.movie import Movie
+from app.models.rating import Rating
+from app.models.user import User
+
+
+def add_movie(db_session, user, title: str, genre: str, stars: list) -> Movie:
+    """A movie rated once per entry of `stars`, each by a different user"""
+    movie = Movie(title=title, genre=genre, release_year=2000, created_by=user.id)
+    db_session.add(movie)
+    db_session.flush()
+    for i, star in enumerate(stars):
+        voter = User(username=f"{title}-voter-{i}", email=f"{title}-{i}@example.com", password_hash="x")
+        db_session.add(voter)
+        db_session.flush()
+        db_session.add(Rating(movie_id=movie.id, user_id=voter.id, rating=star))
+    db_session.commit()
+    return movie
+
+
+def titles(response) -> list:
+    return [movie["title"] for movie in response.json()["movies"]]
+
+
+class TestBayesianRanking:
+    def test_few_ratings_do_not_win(self, client, db_session, test_user):
+        """Test one 5-star rating ranks below many high ratings"""
+        add_movie(db_session, test_user, "One Hit", "Drama", [5])
+        add_movie(db_session, test_user, "Classic", "Drama", [5, 5, 4] * 10)
+        add_movie(db_session, test_user, "Dud", "Drama", [1, 2] * 10)
+
+        response = client.get("/api/movies/top")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert titles(response) == ["Classic", "One Hit", "Dud"]
+        data = response.json()
+        assert data["movies"][1]["ratings_avg"] == 5.0
+        assert data["movies"][1]["score"] < data["movies"][0]["score"]
+        assert 1 < data["mean_rating"] < 5
+
+    def test_genre_boards(self, client, db_session, test_user):
+        """Test per-genre boards, matched case-insensitively"""
+        add_movie(db_session, test_user, "Laughs", "Comedy", [4, 4])
+        add_movie(db_session, test_user, "Tears", "Drama", [5, 5])
+
+        assert titles(client.get("/api/movies/top", params={"genre": "comedy"})) == ["Laughs"]
+        assert titles(client.get("/api/movies/top", params={"genre": "Drama"})) == ["Tears"]
+        assert titles(client.get("/api/movies/top", params={"genre": "Western"})) == []
+        assert titles(client.get("/api/movies/top")) == ["Tears", "Laughs"]
+
+    def test_unrated_movies_are_not_ranked(self, client, test_movie):
+        """Test movies without ratings stay off the board"""
+        assert client.get("/api/movies/top").json()["movies"] == []
+
+    def test_limit(self, client, db_session, test_user):
+        """Test limit trims the board and is capped at its size"""
+        for i in range(3):
+            add_movie(db_session, test_user, f"Movie {i}", "Drama", [3 + i % 3])
+
+        assert len(client.get("/api/movies/top", params={"limit": 2}).json()["movies"]) == 2
+        response = client.get("/api/movies/top", params={"limit": leaderboard.size + 1})
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+class TestIncrementalRefresh:
+    def test_api_ratings_update_in_place(self, client, db_session, test_user, test_user2, auth_headers_user2):
+        """Test a rating re-scores its movie without a rebuild or a query on the next read"""
+        add_movie(db_session, test_user, "Leader", "Drama", [4, 4])
+        challenger = add_movie(db_session, test_user, "Challenger", "Drama", [3])
+        assert titles(client.get("/api/movies/top")) == ["Leader", "Challenger"]
+        rebuilds = leaderboard.rebuilds
+
+        client.post(f"/api/movies/{challenger.id}/ratings", json={"rating": 5}, headers=auth_headers_user2)
+        client.post(
+            f"/api/movies/{challenger.id}/ratings", json={"rating": 5},
+            headers={"Authorization": f"Bearer {create_access_token(data={'sub': test_user.username})}"}
+        )
+        response = client.get("/api/movies/top")
+
+        assert titles(response) == ["Challenger", "Leader"]
+        assert response.json()["movies"][0]["ratings_count"] == 3
+        assert leaderboard.rebuilds == rebuilds
+        assert leaderboard.updates == 2
+        assert 'desc="0 queries"' in response.headers["server-timing"]
+
+    def test_orm_writes_trigger_rebuild(self, client, db_session, test_user):
+        """Test ratings written outside the API are picked up by a rebuild"""
+        assert client.get("/api/movies/top").json()["movies"] == []
+        rebuilds = leaderboard.rebuilds
+
+        add_movie(db_session, test_user, "Late Entry", "Drama", [4])
+
+        assert titles(client.get("/api/movies/top")) == ["Late Entry"]
+        assert leaderboard.rebuilds == rebuilds + 1
+
+    def test_deleted_movie_leaves_the_board(self, client, db_session, test_user, auth_headers):
+        """Test deleting a ranked movie drops it"""
+        movie = add_movie(db_session, test_user, "Doomed", "Drama", [5])
+        assert titles(client.get("/api/movies/top")) == ["Doomed"]
+
+        db_session.query(Rating).filter(Rating.movie_id == movie.id).delete()
+        db_session.commit()
+        client.delete(f"/api/movies/{movie.id}", headers=auth_headers)
+
+        assert client.get("/api/movies/top").json()["movies"] == []
+
+
+class TestBoard:
+    def entry(self, movie_id: int, score: float) -> dict:
+        return {"id": movie_id, "score": score, "ratings_count": 1}
+
+    def test_runners_up_replace_a_falling_leader(self):
+        """Test the board keeps runners-up so a leader that drops is replaced without a rebuild"""
+        board = Board(size=2)
+        board.load([self.entry(1, 4.0), self.entry(2, 3.0), self.entry(3, 2.0)])
+        assert [entry["id"] for entry in board.ranked] == [1, 2]
+
+        board.put(self.entry(1, 1.0))
+
+        assert [entry["id"] for entry in board.ranked] == [2, 3]
+
+    def test_capacity(self):
+        """Test a full board only admits entries that beat its lowest one"""
+        board = Board(size=1)
+        board.load([self.entry(1, 4.0), self.entry(2, 3.0)])
+
+        assert not board.put(self.entry(3, 2.0))
+        assert board.put(self.entry(4, 5.0))
+        assert set(board.entries) == {1, 4}
+
+    def test_updates_during_rebuild_are_replayed(self, db_session, test_user):
+        """Test a rating reported while a rebuild streams is applied to the new boards"""
+        board = Leaderboard(size=5)
+        movie = add_movie(db_session, test_user, "Racing", "Drama", [2])
+        original_execute = db_session.execute
+        calls = []
+
+        def execute(*args, **kwargs):
+            calls.append(args)
+            if len(calls) == 2:
+                # A rating lands between the mean and the streamed pass
+                board.update((movie.id, "Racing", "Drama", 2000, 2, 7, 99))
+            return original_execute(*args, **kwargs)
+        db_session.execute = execute
+
+        board.rebuild(db_session)
+
+        assert board.top()[0]["ratings_count"] == 2
+
+    def test_stale_mark_during_rebuild_survives(self, db_session, test_user):
+        """Test a write the streamed pass may have missed still forces the next rebuild"""
+        board = Leaderboard(size=5)
+        add_movie(db_session, test_user, "Deleted Meanwhile", "Drama", [4])
+        original_execute = db_session.execute
+
+        def execute(*args, **kwargs):
+            board.mark_stale()
+            return original_execute(*args, **kwargs)
+        db_session.execute = execute
+
+        board.rebuild(db_session)
+
+        assert board.needs_rebuild()
+        db_session.execute = original_execute
+        board.rebuild(db_session)
+        assert not board.needs_rebuild()
+
+    def test_older_rows_are_dropped(self, db_session, test_user):
+        """Test an update carrying an older movie version does not overwrite a newer score"""
+        board = Leaderboard(size=5)
+        movie = add_movie(db_session, test_user, "Contested", "Drama", [3])
+        board.rebuild(db_session)
+
+        board.update((movie.id, "Contested", "Drama", 2000, 3, 13, 50))
+        board.update((movie.id, "Contested", "Drama", 2000, 2, 8, 49))
+
+        assert board.top()[0]["ratings_count"] == 3
+        assert board.updates == 1
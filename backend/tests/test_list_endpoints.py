@@ -107,6 +107,32 @@ class TestMovieListEndpoint:
         assert data["total"] == 1
         assert "Inception" in data["movies"][0]["title"]
 
+    def test_list_movies_search_ranked_by_relevance(self, client, auth_headers):
+        """Test full-text search ranks title matches above description matches"""
+        movies = [
+            {"title": "Ocean Drift", "genre": "Drama", "release_year": 2001, "description": "A story about a space station"},
+            {"title": "Space Odyssey", "genre": "Sci-Fi", "release_year": 1968, "description": "Monolith mystery"},
+            {"title": "Quiet Farm", "genre": "Drama", "release_year": 1999, "description": "No match here"},
+        ]
+        for movie in movies:
+            client.post("/api/movies/", json=movie, headers=auth_headers)
+
+        data = client.get("/api/movies/?search=spac").json()
+        assert data["total"] == 2
+        assert [m["title"] for m in data["movies"]] == ["Space Odyssey", "Ocean Drift"]
+
+    def test_list_movies_search_index_follows_deletes(self, client, auth_headers):
+        """Test deleted movies drop out of the search index"""
+        created = client.post("/api/movies/", json={
+            "title": "Vanishing Act", "genre": "Mystery", "release_year": 2015
+        }, headers=auth_headers).json()
+        assert client.get("/api/movies/?search=vanishing").json()["total"] == 1
+
+        client.delete(f"/api/movies/{created['id']}", headers=auth_headers)
+        data = client.get("/api/movies/?search=vanishing").json()
+        assert data["total"] == 0
+        assert data["movies"] == []
+
     def test_list_movies_invalid_pagination(self, client):
         """Test list movies with invalid pagination parameters"""
         response = client.get("/api/movies/?page=0&limit=5")  # page should be >= 1
@@ -132,6 +158,94 @@ class TestMovieListEndpoint:
         assert data["total"] == 1
         assert data["movies"][0]["title"] == "Action 2020"
 
+    def test_list_movies_cursor_pagination(self, client, auth_headers):
+        """Test walking the catalogue with keyset cursors"""
+        for i in range(15):
+            client.post("/api/movies/", json={
+                "title": f"Movie {i}",
+                "genre": "Drama",
+                "release_year": 2000 + i % 5
+            }, headers=auth_headers)
+
+        seen = []
+        cursor = ""
+        while cursor is not None:
+            response = client.get("/api/movies/", params={"cursor": cursor, "limit": 4, "sort": "-release_year"})
+            assert response.status_code == status.HTTP_200_OK
+            data = response.json()
+            assert data["total"] is None
+            seen.extend(data["movies"])
+            cursor = data["next_cursor"]
+
+        assert len(seen) == 15
+        assert len({movie["id"] for movie in seen}) == 15
+        keys = [(movie["release_year"], movie["id"]) for movie in seen]
+        assert keys == sorted(keys, reverse=True)
+
+    def test_list_movies_cursor_with_filters(self, client, auth_headers):
+        """Test cursor pagination honours the list filters"""
+        for i in range(6):
+            client.post("/api/movies/", json={
+                "title": f"Film {i}",
+                "genre": "Action" if i % 2 else "Comedy",
+                "release_year": 2010
+            }, headers=auth_headers)
+
+        response = client.get("/api/movies/?genre=Action&cursor=&limit=2&sort=title")
+        data = response.json()
+        assert [m["title"] for m in data["movies"]] == ["Film 1", "Film 3"]
+
+        response = client.get(f"/api/movies/?genre=Action&cursor={data['next_cursor']}&limit=2&sort=title")
+        data = response.json()
+        assert [m["title"] for m in data["movies"]] == ["Film 5"]
+        assert data["next_cursor"] is None
+
+    def test_list_movies_invalid_cursor(self, client, auth_headers):
+        """Test malformed or mismatched cursors are rejected"""
+        for i in range(3):
+            client.post("/api/movies/", json={
+                "title": f"Movie {i}",
+                "genre": "Drama",
+                "release_year": 2000
+            }, headers=auth_headers)
+
+        response = client.get("/api/movies/?cursor=not-a-cursor")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+        next_cursor = client.get("/api/movies/?cursor=&limit=1&sort=title").json()["next_cursor"]
+        response = client.get(f"/api/movies/?cursor={next_cursor}&sort=release_year")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_list_movies_count_strategies(self, client, auth_headers):
+        """Test totals are estimated, cached or skipped as appropriate"""
+        for genre in ["Action", "Drama", "Drama"]:
+            client.post("/api/movies/", json={"title": "Movie", "genre": genre, "release_year": 2020}, headers=auth_headers)
+
+        data = client.get("/api/movies/").json()
+        assert data["count_strategy"] == "estimated"
+        assert data["total"] == 3
+
+        data = client.get("/api/movies/?genre=Drama").json()
+        assert (data["count_strategy"], data["total"]) == ("exact", 2)
+        # Another page of the same filter reuses the count
+        data = client.get("/api/movies/?genre=drama &limit=5").json()
+        assert (data["count_strategy"], data["total"]) == ("cached", 2)
+
+        data = client.get("/api/movies/?genre=Drama&include_total=false").json()
+        assert data["count_strategy"] == "none"
+        assert data["total"] is None
+        assert data["total_pages"] is None
+        assert len(data["movies"]) == 2
+
+    def test_list_movies_count_cache_invalidated_on_write(self, client, auth_headers):
+        """Test cached counts are dropped when a movie is added"""
+        client.post("/api/movies/", json={"title": "First", "genre": "Drama", "release_year": 2020}, headers=auth_headers)
+        client.get("/api/movies/?genre=Drama")
+
+        client.post("/api/movies/", json={"title": "Second", "genre": "Drama", "release_year": 2021}, headers=auth_headers)
+        data = client.get("/api/movies/?genre=Drama").json()
+        assert (data["count_strategy"], data["total"]) == ("exact", 2)
+
 class TestRatingListEndpoint:
     def test_list_ratings_for_movie(self, client, test_movie, auth_headers_user2, db_session):
         """Test listing ratings for a specific movie"""
@@ -161,4 +275,79 @@ class TestRatingListEndpoint:
         """Test listing ratings for non-existent movie"""
         response = client.get("/api/movies/9999/ratings")
         
-        assert response.status_code == status.HTTP_404_NOT_FOUND
\ No newline at end of file
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_list_ratings_count_cache_scoped_to_movie(self, client, test_movie, auth_headers_user2):
+        """Test a new rating invalidates the cached count for its own movie"""
+        client.get(f"/api/movies/{test_movie.id}/ratings")
+        data = client.get(f"/api/movies/{test_movie.id}/ratings").json()
+        assert (data["count_strategy"], data["total"]) == ("cached", 0)
+
+        client.post(f"/api/movies/{test_movie.id}/ratings", json={"rating": 5}, headers=auth_headers_user2)
+        data = client.get(f"/api/movies/{test_movie.id}/ratings").json()
+        assert (data["count_strategy"], data["total"]) == ("exact", 1)
+
+
+class TestSparseFieldsets:
+    @pytest.fixture
+    def statements(self):
+        from sqlalchemy import event
+        from tests.conftest import engine
+
+        captured = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            captured.append(statement)
+        event.listen(engine, "before_cursor_execute", capture)
+        yield captured
+        event.remove(engine, "before_cursor_execute", capture)
+
+    def test_list_movies_fields(self, client, test_movie, statements):
+        """Test only the selected fields are returned and read from the database"""
+        response = client.get("/api/movies/", params={"fields": "title, genre"})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["movies"] == [{"id": test_movie.id, "title": "Test Movie", "genre": "Drama"}]
+        page_query = [sql for sql in statements if "LIMIT" in sql][-1]
+        assert "movies.title" in page_query and "movies.description" not in page_query
+
+    def test_cursor_pagination_with_fields(self, client, auth_headers):
+        """Test the sort key is loaded for the cursor even when not selected"""
+        for title in ("A", "B", "C"):
+            client.post("/api/movies/", json={"title": title, "genre": "Drama", "release_year": 2000}, headers=auth_headers)
+
+        first = client.get("/api/movies/", params={"cursor": "", "limit": 2, "sort": "title", "fields": "genre"}).json()
+        second = client.get("/api/movies/", params={"cursor": first["next_cursor"], "limit": 2, "sort": "title", "fields": "genre"}).json()
+
+        assert set(first["movies"][0]) == {"id", "genre"}
+        assert len(first["movies"]) + len(second["movies"]) == 3
+
+    def test_movie_detail_fields(self, client, test_movie):
+        """Test the detail endpoint narrows its response"""
+        response = client.get(f"/api/movies/{test_movie.id}", params={"fields": "ratings_avg"})
+
+        assert response.json() == {"id": test_movie.id, "ratings_avg": 0.0}
+
+    def test_rating_fields_skip_user_join(self, client, test_movie, auth_headers_user2, statements):
+        """Test username is joined only when selected"""
+        client.post(f"/api/movies/{test_movie.id}/ratings", json={"rating": 4, "review": "Good"}, headers=auth_headers_user2)
+        statements.clear()
+
+        data = client.get(f"/api/movies/{test_movie.id}/ratings", params={"fields": "rating"}).json()
+        assert data["ratings"] == [{"id": data["ratings"][0]["id"], "rating": 4}]
+        assert not any("users" in sql for sql in statements)
+
+        data = client.get(f"/api/movies/{test_movie.id}/ratings", params={"fields": "username"}).json()
+        assert data["ratings"][0]["username"] == "testuser2"
+
+    def test_unknown_fields_rejected(self, client):
+        """Test unknown or empty selections are a 400"""
+        assert client.get("/api/movies/", params={"fields": "title,password"}).status_code == status.HTTP_400_BAD_REQUEST
+        assert client.get("/api/movies/", params={"fields": ","}).status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_field_sets_are_cached(self):
+        """Test every spelling of a selection shares one compiled field set"""
+        from app.fields import parse_fields
+        from app.schemas.movie import MovieResponse
+
+        assert parse_fields(MovieResponse, "genre,title") is parse_fields(MovieResponse, " title,genre,id ")
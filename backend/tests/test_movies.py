@@ -100,4 +100,26 @@ class TestMovieCreation:
         data = response.json()
         # The HTML should be escaped
         assert "<script>" not in data["title"]
-        assert "<img" not in data["description"]
\ No newline at end of file
+        assert "<img" not in data["description"]
+
+class TestMovieReadModel:
+    def test_stored_text_is_not_escaped_again(self, client, auth_headers):
+        """Test text escaped on create comes back escaped once, not twice"""
+        movie_data = {"title": "Tom & Jerry", "genre": "animation", "release_year": 1940}
+
+        created = client.post("/api/movies/", json=movie_data, headers=auth_headers).json()
+        fetched = client.get(f"/api/movies/{created['id']}").json()
+
+        assert created["title"] == fetched["title"] == "Tom &amp; Jerry"
+        assert fetched["genre"] == "Animation"
+
+    def test_read_schema_runs_no_input_validators(self, test_movie):
+        """Test the read model accepts stored rows as they are"""
+        from app.responses import movie_adapter
+
+        test_movie.genre = "x"  # would fail validate_genre on the input schema
+        test_movie.title = "<b>"
+        movie = movie_adapter.validate_python(test_movie, from_attributes=True)
+
+        assert movie.genre == "x"
+        assert movie.title == "<b>"
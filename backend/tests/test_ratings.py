@@ -57,7 +57,7 @@ class TestRatingLogic:
         data = response.json()
         
         assert data["rating"] == updated_rating_data["rating"]
-        assert html.unescape(data["review"]) == html.escape(updated_rating_data["review"])
+        assert data["review"] == html.escape(updated_rating_data["review"])
         
         # Verify only one rating exists for this user+movie combination
         ratings_count = db_session.query(Rating).filter_by(
@@ -185,4 +185,52 @@ class TestRatingLogic:
         # Refresh movie from database again
         db_session.refresh(test_movie)
         assert test_movie.ratings_count == 2
-        assert test_movie.ratings_avg == 4.5  # (4 + 5) / 2
\ No newline at end of file
+        assert test_movie.ratings_avg == 4.5  # (4 + 5) / 2
+
+    def test_rating_update_applies_delta(self, client, auth_headers_user2, test_movie, db_session):
+        """Test re-rating a movie moves the aggregates by the difference only"""
+        url = f"/api/movies/{test_movie.id}/ratings"
+        client.post(url, json={"rating": 2}, headers=auth_headers_user2)
+        client.post(url, json={"rating": 5}, headers=auth_headers_user2)
+
+        db_session.refresh(test_movie)
+        assert test_movie.ratings_count == 1
+        assert test_movie.ratings_sum == 5
+        assert test_movie.ratings_avg == 5.0
+
+    def test_reconcile_ratings_stats_fixes_drift(self, db_session, test_movie, test_user, test_user2):
+        """Test reconciliation recomputes aggregates from the ratings table"""
+        from app.models.movie import Movie
+        from app.models.rating import Rating
+        from app.crud.rating import reconcile_movie_ratings_stats
+
+        unrated = Movie(title="Unrated", genre="Drama", release_year=2000, created_by=test_user.id,
+                        ratings_count=3, ratings_sum=9, ratings_avg=3.0)
+        db_session.add(unrated)
+        db_session.add_all([
+            Rating(movie_id=test_movie.id, user_id=test_user.id, rating=2),
+            Rating(movie_id=test_movie.id, user_id=test_user2.id, rating=5),
+        ])
+        db_session.commit()
+
+        assert reconcile_movie_ratings_stats(db_session) == 2
+
+        db_session.refresh(test_movie)
+        db_session.refresh(unrated)
+        assert (test_movie.ratings_count, test_movie.ratings_sum, test_movie.ratings_avg) == (2, 7, 3.5)
+        assert (unrated.ratings_count, unrated.ratings_sum, unrated.ratings_avg) == (0, 0, 0.0)
+
+    def test_rating_delete_updates_stats(self, db_session, test_movie, test_user, test_user2):
+        """Test rating aggregates follow writes made outside the API too"""
+        from app.models.rating import Rating
+
+        first = Rating(movie_id=test_movie.id, user_id=test_user.id, rating=1)
+        second = Rating(movie_id=test_movie.id, user_id=test_user2.id, rating=4)
+        db_session.add_all([first, second])
+        db_session.commit()
+
+        db_session.delete(first)
+        db_session.commit()
+
+        db_session.refresh(test_movie)
+        assert (test_movie.ratings_count, test_movie.ratings_sum, test_movie.ratings_avg) == (1, 4, 4.0)
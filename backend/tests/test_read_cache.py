@@ -0,0 +1,137 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import status
+
+from app.models.rating import Rating
+from app.read_cache import CacheBackend, LRUCache, NullCache, cached, read_cache
+
+
+class TestReadThroughCache:
+    def test_detail_served_from_cache(self, client, test_movie, db_session):
+        """Test a second read is a hit and needs no SQL"""
+        client.get(f"/api/movies/{test_movie.id}")
+        hits = read_cache.stats()["hits"]
+
+        response = client.get(f"/api/movies/{test_movie.id}")
+
+        assert response.json()["title"] == "Test Movie"
+        assert read_cache.stats()["hits"] == hits + 1
+        assert 'desc="0 queries"' in response.headers["server-timing"]
+
+    def test_rating_invalidates_movie_and_its_pages(self, client, test_movie, auth_headers, auth_headers_user2):
+        """Test a rating drops the movie's detail and the list pages showing it, nothing else"""
+        other = client.post("/api/movies/", json={"title": "Other", "genre": "Drama", "release_year": 2001}, headers=auth_headers).json()
+        client.get(f"/api/movies/{test_movie.id}")
+        client.get(f"/api/movies/{other['id']}")
+        client.get("/api/movies/", params={"limit": 1, "sort": "id"})
+        client.get("/api/movies/", params={"limit": 1, "sort": "-id"})
+
+        client.post(f"/api/movies/{test_movie.id}/ratings", json={"rating": 4}, headers=auth_headers_user2)
+
+        assert client.get(f"/api/movies/{test_movie.id}").json()["ratings_count"] == 1
+        assert client.get("/api/movies/", params={"limit": 1, "sort": "id"}).json()["movies"][0]["ratings_count"] == 1
+        hits = read_cache.stats()["hits"]
+        client.get(f"/api/movies/{other['id']}")
+        client.get("/api/movies/", params={"limit": 1, "sort": "-id"})
+        assert read_cache.stats()["hits"] == hits + 2
+
+    def test_create_and_delete_invalidate_lists(self, client, auth_headers):
+        """Test list pages reflect new and deleted movies straight away"""
+        assert client.get("/api/movies/").json()["movies"] == []
+
+        movie = client.post("/api/movies/", json={"title": "New", "genre": "Drama", "release_year": 2001}, headers=auth_headers).json()
+        assert [m["id"] for m in client.get("/api/movies/").json()["movies"]] == [movie["id"]]
+        client.get(f"/api/movies/{movie['id']}")
+
+        client.delete(f"/api/movies/{movie['id']}", headers=auth_headers)
+        assert client.get("/api/movies/").json()["movies"] == []
+        assert client.get(f"/api/movies/{movie['id']}").status_code == status.HTTP_404_NOT_FOUND
+
+    def test_orm_rating_writes_invalidate(self, client, test_movie, test_user2, db_session):
+        """Test ratings written through the ORM drop the movie's entries on commit"""
+        client.get(f"/api/movies/{test_movie.id}")
+
+        db_session.add(Rating(movie_id=test_movie.id, user_id=test_user2.id, rating=5))
+        db_session.commit()
+
+        assert client.get(f"/api/movies/{test_movie.id}").json()["ratings_count"] == 1
+
+    def test_filters_are_normalized(self, client, test_movie):
+        """Test equivalent filters share an entry"""
+        client.get("/api/movies/", params={"genre": "Drama"})
+        hits = read_cache.stats()["hits"]
+
+        client.get("/api/movies/", params={"genre": " drama"})
+
+        assert read_cache.stats()["hits"] == hits + 1
+
+    def test_cache_stats_endpoint(self, client, test_movie):
+        """Test hit ratio and counters are exposed under /internal and /metrics"""
+        client.get(f"/api/movies/{test_movie.id}")
+        client.get(f"/api/movies/{test_movie.id}")
+
+        stats = client.get("/internal/cache").json()
+        assert stats["backend"] == "memory"
+        assert stats["hits"] >= 1 and 0 < stats["hit_ratio"] <= 1
+        assert "read_cache_hits_total" in client.get("/metrics").text
+
+
+    @pytest.mark.asyncio
+    async def test_read_your_writes_does_not_join_replica_flight(self):
+        """Test a session pinned to the primary runs its own build instead of sharing one in flight"""
+        reads = []
+
+        def build(source):
+            async def load():
+                reads.append(source)
+                await asyncio.sleep(0.05)
+                return source
+            return load
+
+        results = await asyncio.gather(
+            cached("ryw-key", build("replica"), lambda value: set(), bypass=True),
+            cached("ryw-key", build("primary"), lambda value: set(), bypass=True, read_your_writes=True),
+        )
+
+        assert results == ["replica", "primary"]
+        assert reads == ["replica", "primary"]
+
+
+class TestLRUCache:
+    def test_eviction_and_ttl(self, monkeypatch):
+        """Test the oldest entry is evicted at capacity and expired entries miss"""
+        cache = LRUCache(maxsize=2, ttl=10)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.stats()["evictions"] == 1
+
+        now = time.monotonic()
+        monkeypatch.setattr("app.read_cache.time.monotonic", lambda: now + 11)
+        assert cache.get("a") is None
+        assert cache.stats()["expirations"] == 1
+
+    def test_stale_generation_not_cached(self):
+        """Test a value loaded before an invalidation is not stored after it"""
+        cache = LRUCache()
+        generation = cache.generation()
+        cache.invalidate(("movie", 1))
+        cache.set("k", "stale", {("movie", 1)}, generation)
+
+        assert cache.get("k") is None
+
+    def test_partial_backend_fails_on_instantiation(self):
+        """Test a backend missing interface methods cannot be constructed"""
+        class GetOnly(CacheBackend):
+            def get(self, key):
+                return None
+
+        with pytest.raises(TypeError):
+            GetOnly()
+        assert isinstance(NullCache(), CacheBackend)
@@ -0,0 +1,128 @@
+import pytest
+from fastapi import Request, status
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.main import app
+from app.database import Base, get_db
+from app.auth.jwt import create_access_token, get_password_hash
+from app.models.user import User
+from app.models.movie import Movie
+from app.counting import count_cache
+from app.auth.cache import principal_cache
+from app.read_cache import read_cache
+from app.routing import REPLICA_STICKY_SECONDS, ReplicaSet, RoutingSession, StickyClients, route_request
+
+
+def seed(engine, title):
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        connection.execute(User.__table__.insert().values(
+            id=1, username="reader", email="reader@example.com", password_hash=get_password_hash("testpassword")
+        ))
+        connection.execute(Movie.__table__.insert().values(
+            id=1, title=title, genre="Drama", release_year=2020, created_by=1
+        ))
+
+
+@pytest.fixture
+def cluster(tmp_path):
+    """A primary and a lagging replica as two SQLite files holding different movie titles"""
+    primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}", connect_args={"check_same_thread": False})
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}", connect_args={"check_same_thread": False})
+    seed(primary, "Primary Copy")
+    seed(replica, "Replica Copy")
+    count_cache.clear()
+    principal_cache.clear()
+    read_cache.clear()
+
+    replicas = ReplicaSet([replica])
+    sticky = StickyClients(window=60)
+    PrimarySession = sessionmaker(autoflush=False, bind=primary, class_=RoutingSession)
+
+    def override_get_db(request: Request):
+        db = PrimarySession()
+        route_request(db, request, replicas, sticky)
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    yield TestClient(app), replicas, primary
+    app.dependency_overrides.clear()
+    primary.dispose()
+    replica.dispose()
+
+
+class TestReadReplicaRouting:
+    def test_reads_go_to_replica(self, cluster):
+        """Test GET handlers are served from the replica"""
+        client, replicas, _ = cluster
+        response = client.get("/api/movies/1")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["title"] == "Replica Copy"
+        assert replicas.stats()["routed"] == 1
+
+    def test_writer_sticks_to_primary(self, cluster):
+        """Test a client reads its own write from the primary while others still use the replica"""
+        client, _, primary = cluster
+        headers = {"Authorization": f"Bearer {create_access_token(data={'sub': 'reader'})}"}
+
+        response = client.post("/api/movies/1/ratings", json={"rating": 5}, headers=headers)
+        assert response.status_code == status.HTTP_200_OK
+        with primary.connect() as connection:
+            assert connection.execute(text("SELECT count(*) FROM ratings")).scalar() == 1
+
+        response = client.get("/api/movies/1", headers=headers)
+        assert response.json()["title"] == "Primary Copy"
+        assert response.json()["ratings_count"] == 1
+
+        # The primary copy the writer just read is now in the read cache
+        read_cache.clear()
+        response = client.get("/api/movies/1")
+        assert response.json()["title"] == "Replica Copy"
+
+    def test_writer_bypasses_read_cache(self, cluster):
+        """Test a replica copy cached by another client is not served to a client that just wrote"""
+        client, _, _ = cluster
+        headers = {"Authorization": f"Bearer {create_access_token(data={'sub': 'reader'})}"}
+
+        client.post("/api/movies/1/ratings", json={"rating": 5}, headers=headers)
+        assert client.get("/api/movies/1").json()["title"] == "Replica Copy"
+
+        assert client.get("/api/movies/1", headers=headers).json()["title"] == "Primary Copy"
+
+    def test_replica_reads_not_cached_right_after_a_write(self, cluster, monkeypatch):
+        """Test a replica copy read while replicas may lag a write is served but not cached"""
+        client, _, _ = cluster
+        headers = {"Authorization": f"Bearer {create_access_token(data={'sub': 'reader'})}"}
+        client.post("/api/movies/1/ratings", json={"rating": 5}, headers=headers)
+
+        assert client.get("/api/movies/1").json()["title"] == "Replica Copy"
+        assert read_cache.stats()["size"] == 0
+
+        monkeypatch.setattr(read_cache, "invalidated_at", read_cache.invalidated_at - REPLICA_STICKY_SECONDS)
+        client.get("/api/movies/1")
+        assert read_cache.stats()["size"] == 1
+
+    def test_failed_replica_is_ejected(self, cluster, tmp_path):
+        """Test a replica that cannot connect is skipped and reads fall back to the primary"""
+        client, _, primary = cluster
+        broken = create_engine(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+        replicas = ReplicaSet([broken], retry_after=60)
+
+        db = sessionmaker(bind=primary, class_=RoutingSession)()
+        db.info["replica"] = replicas.pick()
+        with pytest.raises(OperationalError):
+            db.execute(text("SELECT 1"))
+        db.close()
+
+        assert replicas.pick() is None
+        stats = replicas.stats()
+        assert stats["ejections"] == 1
+        assert stats["fallbacks"] == 1
+        assert stats["replicas"][0]["healthy"] is False
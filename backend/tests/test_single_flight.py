@@ -0,0 +1,111 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi import status
+
+from app.main import app
+from app.single_flight import SingleFlight
+
+
+class TestSingleFlight:
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_load(self):
+        """Test identical in-flight loads run once and fan the result out"""
+        flight = SingleFlight()
+        calls = 0
+
+        async def load():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return {"id": 1}
+
+        results = await asyncio.gather(*(flight.do("movie:1", load) for _ in range(50)))
+
+        assert calls == 1
+        assert all(result is results[0] for result in results)
+        assert flight.stats() == {"in_flight": 0, "leaders": 1, "coalesced": 49, "timeouts": 0}
+
+    @pytest.mark.asyncio
+    async def test_errors_propagate_to_followers(self):
+        """Test every waiter sees the leader's exception and the next call retries"""
+        flight = SingleFlight()
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(*(flight.do("k", failing) for _ in range(5)), return_exceptions=True)
+        assert all(isinstance(result, ValueError) for result in results)
+
+        async def ok():
+            return "fresh"
+        assert await flight.do("k", ok) == "fresh"
+
+    @pytest.mark.asyncio
+    async def test_follower_timeout_runs_its_own_load(self):
+        """Test a follower stops waiting on a stuck leader after the timeout"""
+        flight = SingleFlight(timeout=0.01)
+        release = asyncio.Event()
+
+        async def slow():
+            await release.wait()
+            return "leader"
+
+        async def fast():
+            return "follower"
+
+        leader = asyncio.create_task(flight.do("k", slow))
+        await asyncio.sleep(0)
+        assert await flight.do("k", fast) == "follower"
+        assert flight.timeouts == 1
+        release.set()
+        assert await leader == "leader"
+
+    @pytest.mark.asyncio
+    async def test_cancelled_leader_does_not_strand_followers(self):
+        """Test followers load themselves when the leading request is cancelled"""
+        flight = SingleFlight()
+
+        async def never():
+            await asyncio.Event().wait()
+
+        async def fallback():
+            return "own"
+
+        leader = asyncio.create_task(flight.do("k", never))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do("k", fallback))
+        await asyncio.sleep(0)
+        leader.cancel()
+
+        assert await follower == "own"
+
+
+class TestCoalescedEndpoints:
+    @pytest.mark.asyncio
+    async def test_concurrent_rating_pages_share_one_query(self, client, test_movie, monkeypatch):
+        """Test concurrent identical requests on the threadpool path run the page query once"""
+        from app.api.endpoints import movies
+        calls = 0
+        real = movies.get_ratings_by_movie
+
+        def counting(*args, **kwargs):
+            nonlocal calls
+            calls += 1
+            time.sleep(0.05)
+            return real(*args, **kwargs)
+        monkeypatch.setattr(movies, "get_ratings_by_movie", counting)
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            responses = await asyncio.gather(
+                *(http.get(f"/api/movies/{test_movie.id}/ratings") for _ in range(10))
+            )
+            missing = await asyncio.gather(*(http.get("/api/movies/9999/ratings") for _ in range(3)))
+
+        assert all(response.status_code == status.HTTP_200_OK for response in responses)
+        assert calls == 1
+        assert all(response.status_code == status.HTTP_404_NOT_FOUND for response in missing)
@@ -0,0 +1,126 @@
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models.user import User
+from app.models.movie import Movie
+from app.crud.rating import create_or_update_rating
+from app.schemas.rating import RatingCreate
+from app.sqlite import configure_sqlite, write_owner
+
+
+def tuned_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'tuned.db'}", connect_args={"check_same_thread": False})
+    gate = configure_sqlite(engine)
+    Base.metadata.create_all(bind=engine)
+    return engine, gate
+
+
+class TestSQLiteProfile:
+    def test_pragmas_applied_on_connect(self, tmp_path):
+        """Test every connection comes up in WAL mode with the tuned settings"""
+        engine, _ = tuned_engine(tmp_path)
+        with engine.connect() as connection:
+            assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            assert connection.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+            assert connection.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+            assert connection.execute(text("PRAGMA cache_size")).scalar() == -65536
+        engine.dispose()
+
+    def test_concurrent_writers_are_serialized(self, tmp_path):
+        """Test concurrent rating writers queue on the gate instead of failing with locks"""
+        engine, gate = tuned_engine(tmp_path)
+        with engine.begin() as connection:
+            connection.execute(User.__table__.insert(), [
+                {"id": i, "username": f"user{i}", "email": f"user{i}@example.com", "password_hash": "x"}
+                for i in range(1, 9)
+            ])
+            connection.execute(Movie.__table__.insert().values(
+                id=1, title="Contested", genre="Drama", release_year=2020, created_by=1
+            ))
+        Session = sessionmaker(autoflush=False, bind=engine)
+        errors = []
+
+        def rate(user_id):
+            for score in range(1, 6):
+                db = Session()
+                try:
+                    create_or_update_rating(db, RatingCreate(rating=score), movie_id=1, user_id=user_id)
+                except Exception as e:
+                    errors.append(e)
+                finally:
+                    db.close()
+
+        threads = [threading.Thread(target=rate, args=(user_id,)) for user_id in range(1, 9)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        with engine.connect() as connection:
+            count, avg = connection.execute(text("SELECT ratings_count, ratings_avg FROM movies")).one()
+        assert count == 8
+        assert avg == 5.0
+        assert gate.stats()["timeouts"] == 0
+        engine.dispose()
+
+    def test_second_writer_on_holding_thread_fails_fast(self, tmp_path):
+        """Test a thread that already holds the gate gets an immediate lock error, not the full timeout"""
+        engine, gate = tuned_engine(tmp_path)
+        Session = sessionmaker(autoflush=False, bind=engine)
+        first, second = Session(), Session()
+        first.add(User(username="first", email="first@example.com", password_hash="x"))
+        first.flush()
+
+        start = time.perf_counter()
+        second.add(User(username="second", email="second@example.com", password_hash="x"))
+        with pytest.raises(OperationalError, match="database is locked"):
+            second.flush()
+        assert time.perf_counter() - start < gate.timeout / 2
+        assert gate.stats()["self_deadlocks"] == 1
+
+        second.rollback()
+        first.commit()
+        first.close()
+        second.add(User(username="second", email="second@example.com", password_hash="x"))
+        second.commit()
+        second.close()
+        engine.dispose()
+
+    def test_other_request_on_holding_thread_waits(self, tmp_path):
+        """Test a second unit of work landing on the holder's pooled thread queues instead of failing fast"""
+        engine, gate = tuned_engine(tmp_path)
+        Session = sessionmaker(autoflush=False, bind=engine)
+        first, second = Session(), Session()
+
+        def write(session, username):
+            # What run_db does around each call
+            write_owner.set(object())
+            session.add(User(username=username, email=f"{username}@example.com", password_hash="x"))
+            session.flush()
+
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            pool.submit(contextvars.copy_context().run, write, first, "first").result()
+            waiting = pool.submit(contextvars.copy_context().run, write, second, "second")
+            time.sleep(0.1)
+            assert not waiting.done()
+
+            first.commit()
+            first.close()
+            waiting.result(timeout=gate.timeout)
+        second.commit()
+        second.close()
+
+        assert gate.stats()["self_deadlocks"] == 0
+        with engine.connect() as connection:
+            assert connection.execute(text("SELECT COUNT(*) FROM users")).scalar() == 2
+        engine.dispose()